@@ -20,14 +20,17 @@ def create_app():
     Migrate(app, db)
     
     # Import models to ensure they're registered with SQLAlchemy
-    from models.user import User
+    from models.user import User, Photo
     from models.user_preferences import UserPreferences
     from models.supplements import Supplement, SupplementPhoto, UserSupplement
-    from models.hydration import HydrationLog
+    from models.hydration import HydrationLog, HydrationDailyRollup
     from models.shoe_type import ShoeType
-    from models.spark_points import SparkLedger
+    from models.spark_points import SparkLedger, SparkBalance
     from models.injuries import InjuryReport
     from models.activity import Activity
+    from models.activity_rollup import ActivityRollup
+    from models.activity_stream import ActivityStream
+    from models.training_load import TrainingLoadDay, TrainingLoadState
     from models.geocoding import GeocodingResult
     
     # Import and register blueprints
@@ -41,6 +44,7 @@ def create_app():
     from routes.spark_points import bp as spark_points_bp
     from routes.health import bp as health_bp
     from routes.user import bp as user_bp
+    from routes.photos import bp as photos_bp
     
     # Register blueprints
     app.register_blueprint(auth_bp)
@@ -52,6 +56,7 @@ def create_app():
     app.register_blueprint(activity_bp)
     app.register_blueprint(spark_points_bp)
     app.register_blueprint(health_bp)
+    app.register_blueprint(photos_bp)
     app.register_blueprint(user_bp, url_prefix='/user')  # Changed from '/users' to '/user'
     
     return app  # Add this line to return the app instance
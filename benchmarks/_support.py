@@ -0,0 +1,67 @@
+"""Shared setup for the benchmark scripts.
+
+Benchmarks run against whatever DATABASE_URL points at (use a throwaway
+database, e.g. DATABASE_URL=sqlite:///bench.db for a quick local run) and
+clean up the rows they create.
+"""
+import secrets
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import jwt
+from sqlalchemy import event
+
+from app import create_app
+from extensions import db
+from models.user import User
+from utils.metrics import percentile  # re-exported for the benchmark scripts
+
+
+def bench_app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def create_bench_user():
+    name = f'bench_{secrets.token_hex(6)}'
+    user = User(username=name, email=f'{name}@example.com')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def auth_header(app, user_sk):
+    token = jwt.encode({
+        'user_sk': user_sk,
+        'exp': datetime.utcnow() + timedelta(hours=1)
+    }, app.config['SECRET_KEY'])
+    return {'Authorization': f'Bearer {token}'}
+
+
+class QueryCounter:
+    """Counts round trips (an executemany counts once) on the app's engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+    def __enter__(self):
+        self.count = 0
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+
+
+@contextmanager
+def timed(label, results):
+    started = time.perf_counter()
+    yield
+    results[label] = (time.perf_counter() - started) * 1000
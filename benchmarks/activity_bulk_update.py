@@ -0,0 +1,56 @@
+"""Query count and latency of PUT /activities/update by payload size.
+
+    DATABASE_URL=sqlite:///bench.db python -m benchmarks.activity_bulk_update
+"""
+import argparse
+import time
+
+from sqlalchemy import insert
+
+from benchmarks._support import bench_app, create_bench_user, auth_header, QueryCounter
+from extensions import db
+from models.activity import Activity
+from models.user import User
+
+
+def run(sizes):
+    app = bench_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user = create_bench_user()
+        user_sk = user.user_sk
+        headers = auth_header(app, user_sk)
+        db.session.execute(insert(Activity), [
+            {'athlete_id': user_sk, 'name': f'Run {i}', 'distance': 5000.0, 'type': 'Run'}
+            for i in range(max(sizes))
+        ])
+        db.session.commit()
+        activity_ids = [row.activity_id for row in Activity.query.filter_by(athlete_id=user_sk)]
+
+        # Warm the identity cache so only the update itself is counted
+        client.get('/activities?limit=1', headers=headers)
+
+        print(f"{'items':>6} {'queries':>8} {'ms':>9}")
+        try:
+            for size in sizes:
+                payload = [
+                    {'activity_id': activity_id, 'name': f'Renamed {activity_id}', 'distance': 5100.0}
+                    for activity_id in activity_ids[:size]
+                ]
+                with QueryCounter(db.engine) as counter:
+                    started = time.perf_counter()
+                    response = client.put('/activities/update', json=payload, headers=headers)
+                    elapsed = (time.perf_counter() - started) * 1000
+                assert response.status_code == 200, response.get_json()
+                print(f'{size:>6} {counter.count:>8} {elapsed:>9.1f}')
+        finally:
+            Activity.query.filter_by(athlete_id=user_sk).delete()
+            User.query.filter_by(user_sk=user_sk).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    run(parser.parse_args().sizes)
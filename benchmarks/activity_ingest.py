@@ -0,0 +1,68 @@
+"""Rows per second through POST /activities/bulk on a single worker.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.activity_ingest --rows 200000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks._support import bench_app, create_bench_user, auth_header
+from extensions import db
+from models.activity import Activity
+from models.user import User
+
+
+def ndjson_body(rows):
+    start = datetime(2020, 1, 1)
+    lines = []
+    for i in range(rows):
+        lines.append(json.dumps({
+            'name': f'Run {i}',
+            'distance': round(random.uniform(2000, 42000), 1),
+            'moving_time': random.randint(600, 14400),
+            'elapsed_time': random.randint(600, 15000),
+            'total_elevation_gain': round(random.uniform(0, 800), 1),
+            'type': random.choice(['Run', 'Ride', 'Walk']),
+            'start_date': (start + timedelta(hours=i)).isoformat(),
+            'calories': round(random.uniform(100, 3000), 1)
+        }))
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+def run(rows, chunk_size):
+    app = bench_app()
+    app.config['MAX_CONTENT_LENGTH'] = None
+    client = app.test_client()
+
+    with app.app_context():
+        user = create_bench_user()
+        user_sk = user.user_sk
+        headers = auth_header(app, user_sk)
+        body = ndjson_body(rows)
+
+        try:
+            started = time.perf_counter()
+            response = client.post(
+                f'/activities/bulk?chunk_size={chunk_size}',
+                data=body,
+                headers=dict(headers, **{'Content-Type': 'application/x-ndjson'})
+            )
+            elapsed = time.perf_counter() - started
+            result = response.get_json()
+            print(f"dialect: {db.engine.dialect.name}")
+            print(f"accepted {result['accepted']} rejected {result['rejected']} in {elapsed:.2f}s")
+            print(f"{result['accepted'] / elapsed:,.0f} activities/s")
+        finally:
+            Activity.query.filter_by(athlete_id=user_sk).delete()
+            User.query.filter_by(user_sk=user_sk).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    args = parser.parse_args()
+    run(args.rows, args.chunk_size)
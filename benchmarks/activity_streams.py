@@ -0,0 +1,70 @@
+"""Storage size, encode/decode time and downsampling time for activity streams.
+
+Synthetic 1 Hz recordings of a 1-hour and a 10-hour activity with time, lat,
+lng, altitude, heart rate and cadence channels. No database needed.
+
+    python -m benchmarks.activity_streams
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from utils.streams import encode_channel, decode_channel, downsample
+
+# Rough PostgreSQL footprint of one row per sample: 24 byte tuple header,
+# 4 byte line pointer, activity_id + offset + one float8 per channel
+ROW_PER_SAMPLE_BYTES = 24 + 4 + 4 + 4
+
+
+def synthetic_activity(seconds, seed=7):
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.05, seconds))
+    speed = 3.0 + rng.normal(0, 0.2, seconds)  # m/s
+    north = np.cumsum(speed * np.cos(heading))
+    east = np.cumsum(speed * np.sin(heading))
+    return {
+        'time': np.arange(seconds, dtype=np.float64),
+        'lat': 47.6 + north / 111_320,
+        'lng': -122.3 + east / (111_320 * np.cos(np.radians(47.6))),
+        'altitude': 50 + np.cumsum(rng.normal(0, 0.05, seconds)),
+        'heartrate': np.clip(140 + np.cumsum(rng.integers(-1, 2, seconds)), 90, 190).astype(np.float64),
+        'cadence': np.clip(85 + rng.integers(-2, 3, seconds), 70, 100).astype(np.float64),
+    }
+
+
+def timed_ms(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def run(hours, points):
+    print(f"{'activity':<9} {'samples':>8} {'rows est.':>10} {'json':>10} {'encoded':>9} "
+          f"{'encode ms':>10} {'decode ms':>10} {'downsample ms':>14}")
+    for h in hours:
+        streams = synthetic_activity(int(h * 3600))
+        samples = len(streams['time'])
+
+        encode_ms, blobs = timed_ms(lambda: {c: encode_channel(c, v) for c, v in streams.items()})
+        decode_ms, decoded = timed_ms(lambda: {c: decode_channel(c, b) for c, b in blobs.items()})
+        downsample_ms, reduced = timed_ms(lambda: downsample(decoded, points))
+
+        rows_bytes = samples * (ROW_PER_SAMPLE_BYTES + 8 * len(streams))
+        json_bytes = len(json.dumps({c: v.tolist() for c, v in streams.items()}))
+        encoded_bytes = sum(len(b) for b in blobs.values())
+        print(f'{h:>7}h {samples:>9} {rows_bytes / 1024:>9.0f}K {json_bytes / 1024:>9.0f}K '
+              f'{encoded_bytes / 1024:>8.0f}K {encode_ms:>10.2f} {decode_ms:>10.2f} {downsample_ms:>14.2f}'
+              f'  -> {len(reduced["time"])} points')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=float, nargs='+', default=[1, 10])
+    parser.add_argument('--points', type=int, default=500)
+    args = parser.parse_args()
+    run(args.hours, args.points)
@@ -0,0 +1,86 @@
+"""POST /geocode/batch against looping over POST /geocode, with an offline provider.
+
+Sends N addresses (with some repeats and spelling variants) as one batch
+and reports wall-clock time against the sum of provider latencies, then
+replays the batch warm; a sample is also geocoded one request at a time
+for comparison.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.geocoding_batch --addresses 500 --latency 0.1
+"""
+import argparse
+import random
+import secrets
+import time
+
+from benchmarks._support import bench_app, create_bench_user, auth_header
+from controllers.geocoding_controller import geocoding_cache
+from extensions import db
+from models.geocoding import GeocodingResult
+from models.user import User
+from utils.geocoding_providers import FakeGeocodingProvider, normalize_address
+
+
+def run(addresses, latency, workers, rate_limit, sequential):
+    app = bench_app()
+    app.config['TESTING'] = True
+    client = app.test_client()
+    provider = FakeGeocodingProvider(latency=latency, rate_limit=rate_limit)
+    geocoding_cache.provider = provider
+    geocoding_cache.clear()
+
+    prefix = secrets.token_hex(4)
+    venues = [f'{prefix} Venue {i}, Race Street {i % 97}' for i in range(addresses)]
+    batch = venues + [address.upper() for address in random.sample(venues, addresses // 10)]
+    random.shuffle(batch)
+
+    with app.app_context():
+        user_sk = create_bench_user().user_sk
+        headers = auth_header(app, user_sk)
+        try:
+            import controllers.geocoding_controller as controller
+            started = time.perf_counter()
+            body, _ = controller.geocode_batch(batch, workers=workers)
+            elapsed = time.perf_counter() - started
+            print(f"{len(batch)} addresses ({body['unique']} distinct), {workers} workers, "
+                  f"rate limit {rate_limit[0]}/{rate_limit[1]}s, provider latency {latency * 1000:.0f} ms")
+            print(f"cold batch: {elapsed:.2f}s wall-clock for {provider.calls} provider calls "
+                  f"({provider.calls * latency:.1f}s if made one after another); {body['sources']}")
+
+            started = time.perf_counter()
+            response = client.post('/geocode/batch', json={'addresses': batch}, headers=headers)
+            print(f"warm batch over HTTP: {(time.perf_counter() - started) * 1000:.1f} ms; "
+                  f"{response.get_json()['sources']}")
+
+            geocoding_cache.clear()
+            started = time.perf_counter()
+            body, _ = controller.geocode_batch(batch, workers=workers)
+            print(f"batch on a cold worker (database tier): {(time.perf_counter() - started) * 1000:.1f} ms; "
+                  f"{body['sources']}")
+
+            fresh = [f'{prefix} Club {i}, Track Lane' for i in range(sequential)]
+            started = time.perf_counter()
+            for address in fresh:
+                client.post('/geocode', json={'address': address})
+            elapsed = time.perf_counter() - started
+            print(f"{sequential} x POST /geocode one at a time: {elapsed:.2f}s "
+                  f"(~{elapsed / sequential * addresses:.1f}s for {addresses})")
+        finally:
+            keys = {normalize_address(address) for address in venues + fresh}
+            GeocodingResult.query.filter(GeocodingResult.normalized_address.in_(keys)).delete(
+                synchronize_session=False
+            )
+            User.query.filter_by(user_sk=user_sk).delete()
+            db.session.commit()
+            geocoding_cache.clear()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--addresses', type=int, default=500)
+    parser.add_argument('--latency', type=float, default=0.1, help='simulated provider latency (s)')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--rate-limit', default='50/1', help='provider budget, requests/seconds')
+    parser.add_argument('--sequential', type=int, default=50, help='addresses geocoded one request at a time')
+    args = parser.parse_args()
+    requests, _, period = args.rate_limit.partition('/')
+    run(args.addresses, args.latency, args.workers, (int(requests), float(period)), args.sequential)
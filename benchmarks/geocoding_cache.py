@@ -0,0 +1,84 @@
+"""POST /geocode through the two-tier cache, against an offline provider with API-like latency.
+
+Replays a skewed stream of address lookups (a few popular addresses, a
+long tail, spelling variants of each) and reports latency per answering
+tier, then clears the in-process tier to time a cold worker answering from
+geocoding_results.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.geocoding_cache --addresses 2000 --lookups 20000
+"""
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from benchmarks._support import bench_app, percentile
+from controllers.geocoding_controller import geocoding_cache
+from extensions import db
+from models.geocoding import GeocodingResult
+from utils.geocoding_providers import FakeGeocodingProvider, normalize_address
+
+VARIANTS = (str, str.upper, lambda address: address.replace(' ', '  '), lambda address: address.replace(',', ''))
+
+
+def report(label, timings):
+    print(f"{label:<30} n {len(timings):6d}  p50 {percentile(timings, 50):8.3f} ms  p99 {percentile(timings, 99):8.3f} ms")
+
+
+def run(addresses, lookups, latency):
+    app = bench_app()
+    client = app.test_client()
+    provider = FakeGeocodingProvider(latency=latency)
+    geocoding_cache.provider = provider
+    geocoding_cache.clear()
+
+    pool = [f'{i} Bench Street, Unit {i % 7}, Springfield' for i in range(addresses)]
+    weights = [1 / (rank + 1) for rank in range(addresses)]
+    picks = random.choices(pool, weights, k=lookups)
+    stream = [random.choice(VARIANTS)(address) for address in picks]
+
+    with app.app_context():
+        try:
+            by_source = defaultdict(list)
+            started = time.perf_counter()
+            for address in stream:
+                request_started = time.perf_counter()
+                response = client.post('/geocode', json={'address': address})
+                by_source[response.get_json()['source']].append((time.perf_counter() - request_started) * 1000)
+            elapsed = time.perf_counter() - started
+            print(f"{lookups} lookups over {addresses} addresses in {elapsed:.1f}s; provider calls {provider.calls} "
+                  f"(without the cache: {lookups} calls, ~{lookups * latency:.0f}s of provider latency)")
+            for source in ('memory', 'database', 'provider'):
+                if by_source[source]:
+                    report(f'POST /geocode ({source})', by_source[source])
+
+            geocoding_cache.clear()
+            stored = list(set(picks))
+            cold = [random.choice(VARIANTS)(address) for address in random.sample(stored, min(1000, len(stored)))]
+            timings = []
+            for address in cold:
+                lookup_started = time.perf_counter()
+                geocoding_cache.lookup(address)
+                timings.append((time.perf_counter() - lookup_started) * 1000)
+            report('lookup, cold worker (database)', timings)
+            timings = []
+            for address in cold:
+                lookup_started = time.perf_counter()
+                geocoding_cache.lookup(address)
+                timings.append((time.perf_counter() - lookup_started) * 1000)
+            report('lookup, warm worker (memory)', timings)
+            print(geocoding_cache.stats())
+        finally:
+            keys = {normalize_address(address) for address in pool}
+            GeocodingResult.query.filter(GeocodingResult.normalized_address.in_(keys)).delete(synchronize_session=False)
+            db.session.commit()
+            geocoding_cache.clear()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--addresses', type=int, default=2000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.05, help='simulated provider latency (s)')
+    args = parser.parse_args()
+    run(args.addresses, args.lookups, args.latency)
@@ -0,0 +1,110 @@
+"""Nearest and radius queries over a large geocoding_results table.
+
+Stores N points (clustered around a few hundred "cities" plus a uniform
+background), then times GET /geocode/nearest and /geocode/within against
+the geocell index, checks every answer against a brute-force haversine over
+all points, and times the full-table scan the index replaces.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.geocoding_spatial --points 1000000
+"""
+import argparse
+import random
+import secrets
+import time
+
+import numpy as np
+from sqlalchemy import insert
+
+from benchmarks._support import bench_app, percentile
+from controllers.geocoding_controller import geocoding_cache
+from extensions import db
+from models.geocoding import GeocodingResult
+from utils.geo import geocell, haversine_m
+
+_CHUNK = 20000
+CITIES = 300
+
+
+def populate(points):
+    prefix = f'spatial {secrets.token_hex(4)}'
+    cities = [(random.uniform(-60, 70), random.uniform(-180, 180)) for _ in range(CITIES)]
+    latitudes, longitudes = [], []
+    for offset in range(0, points, _CHUNK):
+        rows = []
+        for i in range(offset, min(offset + _CHUNK, points)):
+            if i % 5:
+                city_lat, city_lng = cities[i % CITIES]
+                latitude = max(-90.0, min(90.0, random.gauss(city_lat, 0.1)))
+                longitude = (random.gauss(city_lng, 0.1) + 180) % 360 - 180
+            else:
+                latitude, longitude = random.uniform(-90, 90), random.uniform(-180, 180)
+            latitudes.append(latitude)
+            longitudes.append(longitude)
+            rows.append({'address': f'{prefix} {i}', 'normalized_address': f'{prefix} {i}', 'latitude': latitude,
+                         'longitude': longitude, 'geocell': geocell(latitude, longitude)})
+        db.session.execute(insert(GeocodingResult.__table__), rows)
+    db.session.commit()
+    return prefix, cities, np.array(latitudes), np.array(longitudes)
+
+
+def report(label, timings):
+    print(f"{label:<34} p50 {percentile(timings, 50):8.3f} ms  p95 {percentile(timings, 95):8.3f} ms  "
+          f"p99 {percentile(timings, 99):8.3f} ms")
+
+
+def run(points, queries):
+    app = bench_app()
+    client = app.test_client()
+    geocoding_cache.clear()
+
+    with app.app_context():
+        started = time.perf_counter()
+        prefix, cities, latitudes, longitudes = populate(points)
+        print(f"dialect: {db.engine.dialect.name}; {points} points (setup {time.perf_counter() - started:.1f}s)")
+        try:
+            urban = [(random.gauss(lat, 0.1), random.gauss(lng, 0.1)) for lat, lng in random.choices(cities, k=queries)]
+            anywhere = [(random.uniform(-90, 90), random.uniform(-180, 180)) for _ in range(queries)]
+            cases = [
+                ('nearest, in a city', '/geocode/nearest?lat={}&lng={}', urban, None),
+                ('nearest, anywhere', '/geocode/nearest?lat={}&lng={}', anywhere, None),
+                ('within 1 km, in a city', '/geocode/within?lat={}&lng={}&radius=1000&limit=500', urban, 1000),
+                ('within 10 km, in a city', '/geocode/within?lat={}&lng={}&radius=10000&limit=500', urban, 10000),
+            ]
+            for label, url, sample, radius in cases:
+                timings, wrong, found = [], 0, 0
+                for lat, lng in sample:
+                    started = time.perf_counter()
+                    body = client.get(url.format(lat, lng)).get_json()
+                    timings.append((time.perf_counter() - started) * 1000)
+
+                    distances = haversine_m(lat, lng, latitudes, longitudes)
+                    if radius is None:
+                        found += 1
+                        wrong += abs(body['distance_m'] - distances.min()) > 0.1
+                    else:
+                        found += body['count']
+                        wrong += body['count'] != int((distances <= radius).sum())
+                report(f'GET {label}', timings)
+                print(f"{'':<34} {found / len(sample):.1f} results/query, {wrong} mismatches vs brute force")
+
+            timings = []
+            for lat, lng in urban[:10]:
+                started = time.perf_counter()
+                rows = db.session.query(GeocodingResult.id, GeocodingResult.latitude, GeocodingResult.longitude).all()
+                _, lats, lngs = zip(*rows)
+                haversine_m(lat, lng, lats, lngs).argmin()
+                timings.append((time.perf_counter() - started) * 1000)
+            report('full scan + haversine (replaced)', timings)
+        finally:
+            GeocodingResult.query.filter(GeocodingResult.normalized_address.like(f'{prefix} %')).delete(
+                synchronize_session=False
+            )
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=1000000)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+    run(args.points, args.queries)
@@ -0,0 +1,91 @@
+"""GET /hydration/summary: raw-log scan against the daily rollup rows.
+
+Gives one user a year of frequent hydration logs, then times a 90-day
+summary computed by scanning HydrationLog against the endpoint, which reads
+one rollup row per day, plus POST latency with the rollup upsert.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.hydration_summary --per-day 40
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks._support import bench_app, create_bench_user, auth_header, QueryCounter, percentile
+from controllers.hydration_controller import rebuild_hydration_rollups
+from extensions import db
+from models.hydration import HydrationLog, HydrationDailyRollup
+from models.user import User
+
+
+def log_scan(user_sk, start, end):
+    """The raw-log query the summary would otherwise run"""
+    day = db.func.date(HydrationLog.timestamp)
+    return db.session.query(day, db.func.sum(HydrationLog.water_intake), db.func.count(HydrationLog.id)).filter(
+        HydrationLog.user_sk == user_sk,
+        HydrationLog.timestamp >= start,
+        HydrationLog.timestamp < end
+    ).group_by(day).all()
+
+
+def sample(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label, samples):
+    print(f"{label:<28} p50 {percentile(samples, 50):8.3f} ms   p95 {percentile(samples, 95):8.3f} ms")
+
+
+def run(per_day, repeat):
+    app = bench_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user_sk = create_bench_user().user_sk
+        headers = auth_header(app, user_sk)
+        try:
+            today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+            for days_ago in range(365, 0, -30):
+                db.session.execute(insert(HydrationLog.__table__), [
+                    {'user_sk': user_sk, 'water_intake': random.randint(100, 500),
+                     'timestamp': today - timedelta(days=days_ago - d) + timedelta(seconds=random.uniform(0, 86399))}
+                    for d in range(min(30, days_ago)) for _ in range(per_day)
+                ])
+            db.session.commit()
+
+            started = time.perf_counter()
+            written = rebuild_hydration_rollups(user_sk)
+            print(f"{written * per_day} logs; rebuilt {written} rollups in {time.perf_counter() - started:.2f}s")
+
+            start = (today - timedelta(days=89)).date()
+            query = f'/hydration/summary?start_date={start.isoformat()}&end_date={today.date().isoformat()}'
+            report('90-day raw-log scan', sample(lambda: log_scan(user_sk, today - timedelta(days=89),
+                                                                  today + timedelta(days=1)), repeat))
+            report('GET 90-day summary (rollups)', sample(lambda: client.get(query, headers=headers), repeat))
+            report('POST log + rollup upsert', sample(
+                lambda: client.post('/hydration', json={'quantity': 250}, headers=headers), repeat
+            ))
+
+            with QueryCounter(db.engine) as counter:
+                body = client.get(query, headers=headers).get_json()
+            print(f"summary: {body['days_logged']} days, {body['log_count']} logs, {counter.count} queries")
+        finally:
+            HydrationLog.query.filter_by(user_sk=user_sk).delete()
+            HydrationDailyRollup.query.filter_by(user_sk=user_sk).delete()
+            User.query.filter_by(user_sk=user_sk).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--per-day', type=int, default=40, help='logs per day')
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    run(args.per_day, args.repeat)
@@ -0,0 +1,71 @@
+"""Offline hydration replay: one POST /hydration per log against POST /hydration/sync.
+
+Replays the same batch of client-generated logs both ways, counting SQL
+round trips, then replays the sync again to time the all-duplicates path a
+retried request takes.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.hydration_sync --logs 200
+"""
+import argparse
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from benchmarks._support import bench_app, create_bench_user, auth_header, QueryCounter
+from extensions import db
+from models.hydration import HydrationLog, HydrationDailyRollup
+from models.user import User
+
+
+def offline_logs(count):
+    start = datetime.utcnow() - timedelta(days=2)
+    step = timedelta(days=2) / count
+    return [
+        {'client_uuid': str(uuid.uuid4()), 'quantity': 250, 'timestamp': (start + step * i).isoformat()}
+        for i in range(count)
+    ]
+
+
+def timed_requests(label, counter, send):
+    with counter:
+        started = time.perf_counter()
+        statuses = send()
+        elapsed = time.perf_counter() - started
+    print(f"{label:<30} {elapsed * 1000:9.1f} ms  {counter.count:5d} SQL round trips  statuses {sorted(set(statuses))}")
+
+
+def run(count):
+    app = bench_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user_sks = [create_bench_user().user_sk for _ in range(2)]
+        headers = [auth_header(app, user_sk) for user_sk in user_sks]
+        counter = QueryCounter(db.engine)
+        try:
+            one_by_one, batch = offline_logs(count), offline_logs(count)
+            timed_requests(f'{count} x POST /hydration', counter, lambda: [
+                client.post('/hydration', json={'quantity': log['quantity']}, headers=headers[0]).status_code
+                for log in one_by_one
+            ])
+            timed_requests('1 x POST /hydration/sync', counter, lambda: [
+                client.post('/hydration/sync', json={'logs': batch}, headers=headers[1]).status_code
+            ])
+            timed_requests('retried sync (all duplicates)', counter, lambda: [
+                client.post('/hydration/sync', json={'logs': batch}, headers=headers[1]).status_code
+            ])
+            stored = HydrationLog.query.filter_by(user_sk=user_sks[1]).count()
+            print(f"logs stored for the synced user: {stored} (expected {count})")
+        finally:
+            for user_sk in user_sks:
+                HydrationLog.query.filter_by(user_sk=user_sk).delete()
+                HydrationDailyRollup.query.filter_by(user_sk=user_sk).delete()
+                User.query.filter_by(user_sk=user_sk).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--logs', type=int, default=200)
+    args = parser.parse_args()
+    run(args.logs)
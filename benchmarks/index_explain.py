@@ -0,0 +1,187 @@
+"""EXPLAIN ANALYZE of the hot per-user queries, without and with the index pack.
+
+Loads a synthetic dataset into a *scratch* PostgreSQL database, times every
+hot query with the per-user indexes dropped, rebuilds them, times again and
+prints both. The synthetic rows are removed afterwards.
+
+    DATABASE_URL=postgresql://.../scratch python -m benchmarks.index_explain --users 5000
+"""
+import argparse
+import json
+
+from sqlalchemy import text
+
+from benchmarks._support import bench_app
+from extensions import db
+
+# Index names come from the models (and migration a3f1c9e2b7d4)
+INDEX_PACK = {
+    'activities': ['ix_activities_athlete_start'],
+    'hydration_logs': ['ix_hydration_logs_user_timestamp'],
+    'spark_ledger': ['ix_spark_ledger_user_timestamp'],
+    'injury_reports': ['ix_injury_reports_user_sk'],
+    'user_supplements': ['ix_user_supplements_user_sk'],
+    'user_preferences': ['ix_user_preferences_user_sk'],
+    'geocoding_results': ['ix_geocoding_results_user_sk'],
+}
+
+HOT_QUERIES = {
+    'activities page': """
+        SELECT * FROM activities WHERE athlete_id = :user_sk
+        ORDER BY start_date DESC, activity_id DESC LIMIT 51""",
+    'activities date range': """
+        SELECT * FROM activities WHERE athlete_id = :user_sk
+        AND start_date >= now() - interval '90 days'
+        ORDER BY start_date DESC, activity_id DESC LIMIT 51""",
+    'spark balance': """
+        SELECT sum(points) FROM spark_ledger WHERE user_sk = :user_sk""",
+    'spark latest': """
+        SELECT * FROM spark_ledger WHERE user_sk = :user_sk ORDER BY timestamp DESC LIMIT 1""",
+    'spark history': """
+        SELECT * FROM spark_ledger WHERE user_sk = :user_sk ORDER BY timestamp DESC""",
+    'hydration day': """
+        SELECT * FROM hydration_logs WHERE user_sk = :user_sk
+        AND timestamp >= date_trunc('day', now()) AND timestamp < date_trunc('day', now()) + interval '1 day'""",
+    'hydration 90 days': """
+        SELECT * FROM hydration_logs WHERE user_sk = :user_sk
+        AND timestamp >= now() - interval '90 days'""",
+    'injury reports': """
+        SELECT * FROM injury_reports WHERE user_sk = :user_sk""",
+    'user supplements': """
+        SELECT * FROM user_supplements WHERE user_sk = :user_sk""",
+    'user preferences': """
+        SELECT * FROM user_preferences WHERE user_sk = :user_sk LIMIT 1""",
+    'geocoding results': """
+        SELECT * FROM geocoding_results WHERE user_sk = :user_sk""",
+}
+
+
+def load_dataset(conn, users, activities, ledger, hydration):
+    first = conn.execute(text("""
+        INSERT INTO users (username, email, created_at, updated_at)
+        SELECT 'explain_' || g, 'explain_' || g || '@example.com', now(), now()
+        FROM generate_series(1, :users) g
+        RETURNING user_sk
+    """), {'users': users}).scalars().all()
+    low, high = min(first), max(first)
+    params = {'low': low, 'high': high}
+
+    supplement_id = conn.execute(text(
+        "INSERT INTO supplements (name, description) VALUES ('explain supplement', '') RETURNING id"
+    )).scalar()
+    params['supplement_id'] = supplement_id
+
+    conn.execute(text(f"""
+        INSERT INTO activities (athlete_id, name, distance, moving_time, elapsed_time,
+                                total_elevation_gain, type, start_date, calories, created_at, updated_at)
+        SELECT u, 'Run', random() * 40000, (random() * 14400)::int, (random() * 15000)::int,
+               random() * 800, (ARRAY['Run', 'Ride', 'Walk'])[1 + (random() * 2)::int],
+               now() - (g || ' hours')::interval * 7, random() * 3000, now(), now()
+        FROM generate_series(:low, :high) u, generate_series(1, {activities}) g
+    """), params)
+    conn.execute(text(f"""
+        INSERT INTO spark_ledger (user_sk, points, activity_type, timestamp)
+        SELECT u, (random() * 100)::int, 'general', now() - (g || ' hours')::interval * 13
+        FROM generate_series(:low, :high) u, generate_series(1, {ledger}) g
+    """), params)
+    conn.execute(text(f"""
+        INSERT INTO hydration_logs (user_sk, water_intake, timestamp)
+        SELECT u, 250, now() - (g || ' hours')::interval * 5
+        FROM generate_series(:low, :high) u, generate_series(1, {hydration}) g
+    """), params)
+    conn.execute(text("""
+        INSERT INTO injury_reports (user_sk, injury_type, created_at, date_reported)
+        SELECT u, 'strain', now(), now() FROM generate_series(:low, :high) u, generate_series(1, 2)
+    """), params)
+    conn.execute(text("""
+        INSERT INTO user_supplements (user_sk, supplement_id, created_at)
+        SELECT u, :supplement_id, now() FROM generate_series(:low, :high) u, generate_series(1, 2)
+    """), params)
+    conn.execute(text("""
+        INSERT INTO user_preferences (user_sk, running_surface, created_at, updated_at)
+        SELECT u, 'road', now(), now() FROM generate_series(:low, :high) u
+    """), params)
+    conn.execute(text("""
+        INSERT INTO geocoding_results (user_sk, address, latitude, longitude, created_at)
+        SELECT u, 'somewhere', random() * 180 - 90, random() * 360 - 180, now()
+        FROM generate_series(:low, :high) u, generate_series(1, 5)
+    """), params)
+    for table in INDEX_PACK:
+        conn.execute(text(f'ANALYZE {table}'))
+    return params
+
+
+def remove_dataset(conn, params):
+    for table, column in [
+        ('activities', 'athlete_id'), ('spark_ledger', 'user_sk'), ('hydration_logs', 'user_sk'),
+        ('injury_reports', 'user_sk'), ('user_supplements', 'user_sk'),
+        ('user_preferences', 'user_sk'), ('geocoding_results', 'user_sk'), ('users', 'user_sk')
+    ]:
+        conn.execute(text(f'DELETE FROM {table} WHERE {column} BETWEEN :low AND :high'), params)
+    conn.execute(text('DELETE FROM supplements WHERE id = :supplement_id'), params)
+
+
+def explain(conn, user_sk):
+    timings = {}
+    for label, sql in HOT_QUERIES.items():
+        plan = conn.execute(text(f'EXPLAIN (ANALYZE, FORMAT JSON) {sql}'), {'user_sk': user_sk}).scalar()
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+        root = plan[0]
+        timings[label] = (root['Execution Time'], 'Seq Scan' in json.dumps(root['Plan']))
+    return timings
+
+
+def set_indexes(conn, present):
+    metadata_indexes = {
+        index.name: index
+        for table in db.metadata.tables.values() if table.name in INDEX_PACK
+        for index in table.indexes
+    }
+    for names in INDEX_PACK.values():
+        for name in names:
+            if present:
+                metadata_indexes[name].create(conn, checkfirst=True)
+            else:
+                conn.execute(text(f'DROP INDEX IF EXISTS {name}'))
+    for table in INDEX_PACK:
+        conn.execute(text(f'ANALYZE {table}'))
+
+
+def run(users, activities, ledger, hydration):
+    app = bench_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            raise SystemExit('index_explain needs PostgreSQL (EXPLAIN ANALYZE ... FORMAT JSON)')
+
+        with db.engine.begin() as conn:
+            params = load_dataset(conn, users, activities, ledger, hydration)
+        # Probe a user in the middle of the synthetic range
+        user_sk = (params['low'] + params['high']) // 2
+
+        try:
+            with db.engine.begin() as conn:
+                set_indexes(conn, present=False)
+                before = explain(conn, user_sk)
+            with db.engine.begin() as conn:
+                set_indexes(conn, present=True)
+                after = explain(conn, user_sk)
+        finally:
+            with db.engine.begin() as conn:
+                set_indexes(conn, present=True)
+                remove_dataset(conn, params)
+
+    print(f"{'query':<24} {'before ms':>10} {'after ms':>10} {'speedup':>8}  seq scan before/after")
+    for label in HOT_QUERIES:
+        (b, b_seq), (a, a_seq) = before[label], after[label]
+        speedup = b / a if a else float('inf')
+        print(f'{label:<24} {b:>10.2f} {a:>10.2f} {speedup:>7.1f}x  {b_seq}/{a_seq}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--activities', type=int, default=300, help='per user')
+    parser.add_argument('--ledger', type=int, default=200, help='spark ledger rows per user')
+    parser.add_argument('--hydration', type=int, default=400, help='hydration logs per user')
+    args = parser.parse_args()
+    run(args.users, args.activities, args.ledger, args.hydration)
@@ -0,0 +1,144 @@
+"""Spark-point leaderboard rank lookups with a large user base.
+
+Creates N users with balances (a tenth of them in partner programs) and a
+week of ledger entries, then times the first load of the boards, "my rank
+plus neighbours" and top-N lookups, the GET endpoint, folding in a burst of
+new awards, and the SQL COUNT(*) rank query the boards replace.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.leaderboard --users 1000000
+"""
+import argparse
+import random
+import secrets
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+
+from benchmarks._support import bench_app, auth_header, percentile
+from controllers.leaderboard_controller import leaderboards, week_start
+from extensions import db
+from models.spark_points import SparkBalance, SparkLedger
+from models.user import User
+
+_CHUNK = 20000
+PARTNERS = 20
+
+
+def populate(users, weekly_entries):
+    prefix = f'board_{secrets.token_hex(4)}'
+    now = datetime.utcnow()
+    for offset in range(0, users, _CHUNK):
+        db.session.execute(insert(User.__table__), [
+            {'username': f'{prefix}_{i}', 'email': f'{prefix}_{i}@example.com', 'created_at': now,
+             'updated_at': now, 'partner': f'{prefix}_p{i // 10 % PARTNERS}' if i % 10 == 0 else None}
+            for i in range(offset, min(offset + _CHUNK, users))
+        ])
+    db.session.commit()
+    user_sks = [user_sk for (user_sk,) in db.session.query(User.user_sk).filter(User.username.like(f'{prefix}_%'))]
+
+    for offset in range(0, len(user_sks), _CHUNK):
+        db.session.execute(insert(SparkBalance.__table__), [
+            {'user_sk': user_sk, 'total': int(random.paretovariate(1.5) * 100), 'last_updated': now}
+            for user_sk in user_sks[offset:offset + _CHUNK]
+        ])
+    monday = week_start(now)
+    span = max((now - monday).total_seconds(), 1)
+    for offset in range(0, weekly_entries, _CHUNK):
+        db.session.execute(insert(SparkLedger.__table__), [
+            {'user_sk': random.choice(user_sks), 'points': random.randint(1, 50), 'activity_type': 'bench',
+             'timestamp': monday + timedelta(seconds=random.uniform(0, span))}
+            for _ in range(min(_CHUNK, weekly_entries - offset))
+        ])
+    db.session.commit()
+    return prefix, user_sks
+
+
+def remove(prefix):
+    members = select(User.user_sk).where(User.username.like(f'{prefix}_%')).scalar_subquery()
+    db.session.execute(delete(SparkLedger).where(SparkLedger.user_sk.in_(members)))
+    db.session.execute(delete(SparkBalance).where(SparkBalance.user_sk.in_(members)))
+    db.session.execute(delete(User).where(User.username.like(f'{prefix}_%')))
+    db.session.commit()
+
+
+def latencies(fn, samples):
+    timings = []
+    for argument in samples:
+        started = time.perf_counter()
+        fn(argument)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"{label:<30} p50 {percentile(timings, 50):8.3f} ms  p95 {percentile(timings, 95):8.3f} ms  "
+          f"p99 {percentile(timings, 99):8.3f} ms")
+
+
+def run(users, weekly_entries, lookups, burst):
+    app = bench_app()
+    client = app.test_client()
+
+    with app.app_context():
+        started = time.perf_counter()
+        prefix, user_sks = populate(users, weekly_entries)
+        print(f"dialect: {db.engine.dialect.name}; {users} users, {weekly_entries} ledger entries this week "
+              f"(setup {time.perf_counter() - started:.1f}s)")
+        try:
+            leaderboards.invalidate()
+            started = time.perf_counter()
+            leaderboards.top('global', 10)
+            print(f"first load of all boards: {time.perf_counter() - started:.2f}s; {leaderboards.stats()}")
+
+            sample = random.sample(user_sks, min(lookups, len(user_sks)))
+            active = [sk for (sk,) in db.session.query(SparkLedger.user_sk.distinct()).filter(
+                SparkLedger.user_sk.in_(select(User.user_sk).where(User.username.like(f'{prefix}_%')))
+            ).limit(lookups)]
+            partner = f'{prefix}_p0'
+            members = [sk for (sk,) in db.session.query(User.user_sk).filter(User.partner == partner)]
+            report('global rank + 5 neighbours', latencies(lambda sk: leaderboards.around('global', sk, 5), sample))
+            report('global rank only', latencies(lambda sk: leaderboards.around('global', sk, 0), sample))
+            report('weekly rank + 5 neighbours', latencies(lambda sk: leaderboards.around('weekly', sk, 5), active))
+            report('partner rank + 5 neighbours', latencies(
+                lambda sk: leaderboards.around('partner', sk, 5, partner=partner), members
+            ))
+            report('global top 100 at random depth', latencies(
+                lambda sk: leaderboards.top('global', 100, offset=sk % len(user_sks)), sample
+            ))
+
+            headers = [auth_header(app, sk) for sk in sample[:200]]
+            report('GET /leaderboard/me (HTTP)', latencies(
+                lambda header: client.get('/user/spark-points/leaderboard/me?neighbours=5', headers=header), headers
+            ))
+
+            sql_rank = lambda sk: db.session.query(db.func.count()).filter(
+                SparkBalance.total > select(SparkBalance.total).where(SparkBalance.user_sk == sk).scalar_subquery()
+            ).scalar()
+            report('SQL COUNT(*) rank (replaced)', latencies(sql_rank, sample[:50]))
+
+            now = datetime.utcnow()
+            db.session.execute(insert(SparkLedger.__table__), [
+                {'user_sk': random.choice(user_sks), 'points': random.randint(1, 50), 'activity_type': 'bench',
+                 'timestamp': now}
+                for _ in range(burst)
+            ])
+            db.session.commit()
+            time.sleep(leaderboards.refresh_seconds)
+            started = time.perf_counter()
+            leaderboards.top('global', 10)
+            elapsed = time.perf_counter() - started
+            print(f"folded in {burst} new awards in {elapsed * 1000:.1f} ms ({burst / elapsed:,.0f} awards/s)")
+        finally:
+            remove(prefix)
+            leaderboards.invalidate()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=1000000)
+    parser.add_argument('--weekly-entries', type=int, default=200000)
+    parser.add_argument('--lookups', type=int, default=10000)
+    parser.add_argument('--burst', type=int, default=10000, help='awards landing between two polls')
+    args = parser.parse_args()
+    run(args.users, args.weekly_entries, args.lookups, args.burst)
@@ -0,0 +1,78 @@
+"""Latency of an unrelated endpoint while /login is being hammered.
+
+Run it against a live server twice, once per hashing mode, and compare:
+
+    PASSWORD_HASH_POOL_ENABLED=false gunicorn --config gunicorn.conf.py app:app
+    python -m benchmarks.login_storm --base-url http://localhost:8000
+
+    PASSWORD_HASH_POOL_ENABLED=true gunicorn --config gunicorn.conf.py app:app
+    python -m benchmarks.login_storm --base-url http://localhost:8000
+"""
+import argparse
+import secrets
+import threading
+import time
+
+import requests
+
+from utils.metrics import percentile
+
+
+counters_lock = threading.Lock()
+
+
+def login_storm(base_url, username, password, stop, counters):
+    session = requests.Session()
+    while not stop.is_set():
+        response = session.post(f'{base_url}/login', json={'username': username, 'password': password})
+        with counters_lock:
+            counters[response.status_code] = counters.get(response.status_code, 0) + 1
+
+
+def probe(base_url, path, stop, samples):
+    session = requests.Session()
+    while not stop.is_set():
+        started = time.perf_counter()
+        session.get(f'{base_url}{path}')
+        samples.append((time.perf_counter() - started) * 1000)
+        time.sleep(0.01)
+
+
+def run(base_url, storm_threads, duration, probe_path):
+    username = f'bench_{secrets.token_hex(4)}'
+    password = secrets.token_urlsafe(12)
+    requests.post(f'{base_url}/register', json={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': password
+    }).raise_for_status()
+
+    stop = threading.Event()
+    counters = {}
+    samples = []
+    threads = [threading.Thread(target=probe, args=(base_url, probe_path, stop, samples))]
+    threads += [
+        threading.Thread(target=login_storm, args=(base_url, username, password, stop, counters))
+        for _ in range(storm_threads)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    print(f'login responses by status: {counters}')
+    print(f'{probe_path} samples: {len(samples)}')
+    for pct in (50, 90, 99):
+        print(f'  p{pct}: {percentile(samples, pct):.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--storm-threads', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=20.0, help='seconds')
+    parser.add_argument('--probe-path', default='/health')
+    args = parser.parse_args()
+    run(args.base_url.rstrip('/'), args.storm_threads, args.duration, args.probe_path)
@@ -0,0 +1,139 @@
+"""Module-level requests calls against the shared pooled client, on a local upstream.
+
+Serves a small JSON endpoint over HTTP/1.1 keep-alive (and, with --tls,
+over HTTPS with a throwaway self-signed certificate made by the openssl
+CLI), then compares per-call ``requests.get`` with ``http_client.get``:
+latency, and the number of connections the upstream had to accept. It
+also shows retries hiding a flaky 503 and a read timeout cutting off an
+upstream that never answers.
+
+    python -m benchmarks.outbound_http --requests 2000 --threads 16 --tls
+"""
+import argparse
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from benchmarks._support import percentile
+from utils.http_client import HttpClient
+
+
+class Upstream(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, Nagle plus
+    # delayed ACKs add ~40 ms to every reused connection
+    disable_nagle_algorithm = True
+    connections = 0
+    flaky_calls = 0
+    lock = threading.Lock()
+
+    def setup(self):
+        super().setup()
+        with Upstream.lock:
+            Upstream.connections += 1
+
+    def do_GET(self):
+        if self.path == '/hang':
+            time.sleep(30)
+        if self.path == '/flaky':
+            with Upstream.lock:
+                Upstream.flaky_calls += 1
+                failing = Upstream.flaky_calls % 2 == 1
+            if failing:
+                return self._send(503, {'error': 'try again'})
+        self._send(200, {'status': 'OK', 'results': [{'place_id': 'x' * 27}]})
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _self_signed(directory):
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1', '-subj', '/CN=127.0.0.1',
+         '-addext', 'subjectAltName=IP:127.0.0.1', '-keyout', key, '-out', cert],
+        check=True, capture_output=True
+    )
+    return cert, key
+
+
+def _serve(tls_dir=None):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Upstream)
+    server.daemon_threads = True
+    scheme, verify = 'http', True
+    if tls_dir:
+        cert, key = _self_signed(tls_dir)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme, verify = 'https', cert
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'{scheme}://127.0.0.1:{server.server_port}', verify
+
+
+def _run(label, call, total, threads):
+    Upstream.connections = 0
+    samples = []
+
+    def one(_):
+        started = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    print(f'{label:<34} {total / elapsed:8.0f} req/s  p50 {percentile(samples, 50):7.3f} ms  '
+          f'p99 {percentile(samples, 99):7.3f} ms  {Upstream.connections} connections')
+
+
+def run(total, threads, tls):
+    with tempfile.TemporaryDirectory() as directory:
+        server, base, verify = _serve(directory if tls else None)
+        client = HttpClient(read_timeout=1, retries=2, backoff=0.05)
+        print(f'{total} GETs from {threads} threads to {base}')
+        _run('requests.get per call', lambda: requests.get(f'{base}/ok', timeout=5, verify=verify).json(),
+             total, threads)
+        _run('http_client.get (pooled)', lambda: client.get(f'{base}/ok', verify=verify).json(), total, threads)
+
+        Upstream.flaky_calls = 0
+        plain = [requests.get(f'{base}/flaky', timeout=5, verify=verify).status_code for _ in range(100)]
+        pooled = [client.get(f'{base}/flaky', verify=verify).status_code for _ in range(100)]
+        print(f'flaky upstream, 100 GETs: {plain.count(503)} x 503 without retries, '
+              f'{pooled.count(503)} x 503 through the client')
+
+        started = time.perf_counter()
+        try:
+            client.get(f'{base}/hang', verify=verify, timeout=(1, 1))
+        except requests.exceptions.RequestException as e:
+            outcome = type(e).__name__
+        print(f'hung upstream: {outcome} after {time.perf_counter() - started:.1f}s '
+              f'(read timeout 1s, 2 retries); no timeout would have waited for the upstream')
+        print(json.dumps(client.stats()['hosts'], indent=2))
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--tls', action='store_true', help='serve HTTPS (needs the openssl CLI)')
+    args = parser.parse_args()
+    run(args.requests, args.threads, args.tls)
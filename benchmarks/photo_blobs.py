@@ -0,0 +1,101 @@
+"""Photos inline in the database against the content-addressed blob store.
+
+Seeds N legacy photos (photo_data in the row, a share of them identical
+re-uploads), then measures bytes held in the photos table, a full
+``SELECT *`` over it (what scans, dumps and replication pay) and
+GET /photos/<pid>; runs the batched ``migrate_photo_blobs`` and measures
+the same again, plus how many bytes the deduplicated blob store holds.
+
+    DATABASE_URL=sqlite:////tmp/bench.db BLOB_STORE_PATH=/tmp/bench-blobs \
+        python -m benchmarks.photo_blobs --photos 300 --size-kb 512 --duplicates 0.3
+"""
+import argparse
+import os
+import random
+import time
+
+from sqlalchemy import text
+
+from benchmarks._support import auth_header, bench_app, create_bench_user, percentile
+from controllers import photo_controller
+from extensions import db
+from models.user import Photo, User
+from utils.blob_store import blob_store
+
+
+def _table_bytes(user_sk):
+    return db.session.execute(
+        db.select(db.func.coalesce(db.func.sum(db.func.length(Photo.photo_data)), 0)).where(Photo.user_sk == user_sk)
+    ).scalar_one()
+
+
+def _scan_ms(user_sk):
+    started = time.perf_counter()
+    db.session.execute(text('SELECT * FROM photos WHERE user_sk = :user_sk'), {'user_sk': user_sk}).all()
+    return (time.perf_counter() - started) * 1000
+
+
+def _get_p50(client, headers, pids):
+    samples = []
+    for pid in pids:
+        started = time.perf_counter()
+        response = client.get(f'/photos/{pid}', headers=headers)
+        response.get_data()
+        samples.append((time.perf_counter() - started) * 1000)
+    return percentile(samples, 50)
+
+
+def run(photos, size_kb, duplicates, batch_size):
+    app = bench_app()
+    client = app.test_client()
+    with app.app_context():
+        user = create_bench_user()
+        headers = auth_header(app, user.user_sk)
+        try:
+            originals = max(1, int(photos * (1 - duplicates)))
+            images = [os.urandom(size_kb * 1024) for _ in range(originals)]
+            rows = [
+                {'user_sk': user.user_sk, 'filename': f'photo_{i}.jpg',
+                 'photo_data': images[i] if i < originals else random.choice(images)}
+                for i in range(photos)
+            ]
+            db.session.execute(Photo.__table__.insert(), rows)
+            db.session.commit()
+            pids = db.session.execute(db.select(Photo.pid).where(Photo.user_sk == user.user_sk)).scalars().all()
+            sample = random.sample(pids, min(100, len(pids)))
+
+            print(f'{photos} photos of {size_kb} KB, {photos - originals} of them duplicates; '
+                  f'{db.engine.dialect.name}, batches of {batch_size}')
+            print(f'inline:  {_table_bytes(user.user_sk) / 2 ** 20:8.1f} MB in photo rows, '
+                  f'SELECT * {_scan_ms(user.user_sk):7.1f} ms, '
+                  f'GET /photos/<pid> p50 {_get_p50(client, headers, sample):6.2f} ms')
+
+            started = time.perf_counter()
+            moved = photo_controller.migrate_photo_blobs(batch_size)
+            elapsed = time.perf_counter() - started
+            print(f'migrate-blobs: {moved} in {elapsed:.2f}s ({sum(moved.values()) / elapsed:.0f} rows/s)')
+
+            digests = set(db.session.execute(
+                db.select(Photo.blob_sha256).where(Photo.user_sk == user.user_sk)
+            ).scalars())
+            stored = sum(os.path.getsize(blob_store._path(digest)) for digest in digests)
+            print(f'blobs:   {_table_bytes(user.user_sk) / 2 ** 20:8.1f} MB in photo rows, '
+                  f'SELECT * {_scan_ms(user.user_sk):7.1f} ms, '
+                  f'GET /photos/<pid> p50 {_get_p50(client, headers, sample):6.2f} ms')
+            print(f'blob store: {len(digests)} blobs, {stored / 2 ** 20:.1f} MB '
+                  f'for {photos * size_kb / 1024:.1f} MB uploaded')
+        finally:
+            Photo.query.filter_by(user_sk=user.user_sk).delete()
+            User.query.filter_by(user_sk=user.user_sk).delete()
+            db.session.commit()
+            print('gc-blobs:', photo_controller.collect_unreferenced_blobs(grace_seconds=0))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photos', type=int, default=300)
+    parser.add_argument('--size-kb', type=int, default=512)
+    parser.add_argument('--duplicates', type=float, default=0.3, help='share of photos that re-upload an earlier one')
+    parser.add_argument('--batch-size', type=int, default=50)
+    args = parser.parse_args()
+    run(args.photos, args.size_kb, args.duplicates, args.batch_size)
@@ -0,0 +1,96 @@
+"""Throughput of the platform sync pipeline against the offline fake provider.
+
+Creates N users with a 'fake' platform token each (a tenth of them already
+expired, so they go through a refresh), runs a full sync, adds a couple of
+activities per user on the fake side and runs an incremental sync.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.platform_sync --users 10000 --latency 0.02
+"""
+import argparse
+import secrets
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks._support import bench_app
+from controllers.platform_sync_controller import sync_tokens
+from extensions import db
+from models.activity import Activity
+from models.activity_rollup import ActivityRollup
+from models.training_load import TrainingLoadDay, TrainingLoadState
+from models.user import User, UserToken
+from utils.activity_providers import FakeActivityProvider, register_provider
+
+
+def create_connected_users(provider, users):
+    prefix = f'sync_{secrets.token_hex(4)}'
+    now = datetime.utcnow()
+    db.session.execute(insert(User.__table__), [
+        {'username': f'{prefix}_{i}', 'email': f'{prefix}_{i}@example.com', 'created_at': now, 'updated_at': now}
+        for i in range(users)
+    ])
+    user_sks = [user_sk for (user_sk,) in db.session.query(User.user_sk).filter(User.username.like(f'{prefix}_%'))]
+
+    expired = now - timedelta(hours=1)
+    tokens = []
+    for index, user_sk in enumerate(user_sks):
+        issued = provider.issue(f'{prefix}-{user_sk}', expires_at=expired if index % 10 == 0 else None)
+        tokens.append(dict(issued, user_sk=user_sk, platform='fake', access_token_secret=''))
+    db.session.execute(insert(UserToken.__table__), tokens)
+    db.session.commit()
+    return user_sks
+
+
+def remove(user_sks):
+    for model, column in [
+        (Activity, Activity.athlete_id), (ActivityRollup, ActivityRollup.athlete_id),
+        (TrainingLoadDay, TrainingLoadDay.athlete_id), (TrainingLoadState, TrainingLoadState.athlete_id),
+        (UserToken, UserToken.user_sk), (User, User.user_sk)
+    ]:
+        for offset in range(0, len(user_sks), 500):
+            model.query.filter(column.in_(user_sks[offset:offset + 500])).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def report(label, totals, elapsed):
+    print(f"{label:<12} {elapsed:>7.2f}s  {totals['tokens'] / elapsed:>8,.0f} users/s  "
+          f"{totals['fetched'] / elapsed:>9,.0f} activities/s  fetched {totals['fetched']} "
+          f"new {totals['inserted']} refreshed {totals['refreshed']} failed {totals['failed']}")
+
+
+def run(users, activities, latency, workers, batch_size, rate):
+    provider = FakeActivityProvider(activities_per_user=activities, latency=latency, rate_limit=rate)
+    register_provider(provider)
+    app = bench_app()
+
+    with app.app_context():
+        user_sks = create_connected_users(provider, users)
+        query = UserToken.query.filter(UserToken.platform == 'fake')
+        try:
+            print(f"dialect: {db.engine.dialect.name}, {users} users, {activities} activities each, "
+                  f"{latency * 1000:.0f} ms per call, {workers} workers, limit {rate[0]}/{rate[1]}s")
+            started = time.perf_counter()
+            totals = sync_tokens(query, workers=workers, batch_size=batch_size)
+            report('full', totals, time.perf_counter() - started)
+
+            provider.activities_per_user += 2
+            started = time.perf_counter()
+            totals = sync_tokens(query, workers=workers, batch_size=batch_size)
+            report('incremental', totals, time.perf_counter() - started)
+            print(f"rate limiter: {totals['rate_limits']['fake']}")
+        finally:
+            remove(user_sks)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--activities', type=int, default=30, help='per user on the first sync')
+    parser.add_argument('--latency', type=float, default=0.02, help='seconds per fake platform call')
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--batch-size', type=int, default=2000)
+    parser.add_argument('--rate', default='2000/1', help='fake platform budget, requests/seconds')
+    args = parser.parse_args()
+    requests, _, period = args.rate.partition('/')
+    run(args.users, args.activities, args.latency, args.workers, args.batch_size, (int(requests), float(period)))
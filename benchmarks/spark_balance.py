@@ -0,0 +1,92 @@
+"""GET /user/spark-points: ledger aggregate against the maintained balance row.
+
+Gives one user a long ledger, then times the SUM + latest-entry queries the
+endpoint used to run against the balance read it does now, plus POST award
+latency and a reconcile pass.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.spark_balance --entries 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+
+from benchmarks._support import bench_app, create_bench_user, auth_header, percentile
+from controllers.spark_points_controller import reconcile_balances
+from extensions import db
+from models.spark_points import SparkBalance, SparkLedger
+from models.user import User
+
+
+def ledger_aggregate(user_sk):
+    """What GET used to do on every call"""
+    total = db.session.query(db.func.sum(SparkLedger.points)).filter_by(user_sk=user_sk).scalar() or 0
+    latest = SparkLedger.query.filter_by(user_sk=user_sk).order_by(SparkLedger.timestamp.desc()).first()
+    return total, latest.timestamp if latest else None
+
+
+def sample(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+
+def report(label, samples):
+    print(f"{label:<24} p50 {percentile(samples, 50):8.3f} ms   p95 {percentile(samples, 95):8.3f} ms")
+
+
+def run(entries, repeat):
+    app = bench_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user = create_bench_user()
+        user_sk = user.user_sk
+        headers = auth_header(app, user_sk)
+        try:
+            start = datetime.utcnow() - timedelta(days=365)
+            step = timedelta(days=365) / entries
+            for offset in range(0, entries, 10000):
+                db.session.execute(insert(SparkLedger.__table__), [
+                    {'user_sk': user_sk, 'points': random.randint(1, 50), 'activity_type': 'bench',
+                     'timestamp': start + step * i}
+                    for i in range(offset, min(offset + 10000, entries))
+                ])
+            db.session.commit()
+
+            started = time.perf_counter()
+            totals = reconcile_balances(user_sk, fix=True)
+            print(f"{entries} ledger entries; backfilled the balance in "
+                  f"{(time.perf_counter() - started) * 1000:.1f} ms ({totals['fixed']} fixed)")
+
+            report('ledger aggregate', sample(lambda: ledger_aggregate(user_sk), repeat))
+            report('GET (balance row)', sample(lambda: client.get('/user/spark-points', headers=headers), repeat))
+            report('POST award', sample(
+                lambda: client.post('/user/spark-points', json={'points': 5}, headers=headers), repeat
+            ))
+
+            expected, _ = ledger_aggregate(user_sk)
+            body = client.get('/user/spark-points', headers=headers).get_json()
+            print(f"balance {body['total_spark_points']} == ledger {expected}: {body['total_spark_points'] == expected}")
+
+            started = time.perf_counter()
+            totals = reconcile_balances(user_sk)
+            print(f"reconcile: {totals['mismatched']} mismatched in {(time.perf_counter() - started) * 1000:.1f} ms")
+        finally:
+            SparkLedger.query.filter_by(user_sk=user_sk).delete()
+            SparkBalance.query.filter_by(user_sk=user_sk).delete()
+            User.query.filter_by(user_sk=user_sk).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+    run(args.entries, args.repeat)
@@ -0,0 +1,85 @@
+"""POST /user/spark-points/batch against one POST /user/spark-points per award.
+
+Awards a challenge to N users through the batch endpoint, replays the same
+batch (every entry is a duplicate the second time) and times a sample of
+single-award requests for comparison.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.spark_batch --users 20000
+"""
+import argparse
+import secrets
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+
+from benchmarks._support import bench_app, auth_header, QueryCounter
+from config import Config
+from extensions import db
+from models.spark_points import SparkBalance, SparkLedger
+from models.user import User
+
+
+def create_users(users):
+    prefix = f'batch_{secrets.token_hex(4)}'
+    now = datetime.utcnow()
+    db.session.execute(insert(User.__table__), [
+        {'username': f'{prefix}_{i}', 'email': f'{prefix}_{i}@example.com', 'created_at': now, 'updated_at': now}
+        for i in range(users)
+    ])
+    db.session.commit()
+    return prefix, [sk for (sk,) in db.session.query(User.user_sk).filter(User.username.like(f'{prefix}_%'))]
+
+
+def remove(prefix):
+    members = select(User.user_sk).where(User.username.like(f'{prefix}_%')).scalar_subquery()
+    db.session.execute(delete(SparkLedger).where(SparkLedger.user_sk.in_(members)))
+    db.session.execute(delete(SparkBalance).where(SparkBalance.user_sk.in_(members)))
+    db.session.execute(delete(User).where(User.username.like(f'{prefix}_%')))
+    db.session.commit()
+
+
+def run(users, singles):
+    app = bench_app()
+    client = app.test_client()
+
+    with app.app_context():
+        prefix, user_sks = create_users(users)
+        headers = auth_header(app, user_sks[0])
+        # The batch endpoint only serves listed partner/admin accounts
+        Config.SPARK_BATCH_ACCOUNTS = Config.SPARK_BATCH_ACCOUNTS | {f'{prefix}_0'}
+        awards = [
+            {'user_sk': user_sk, 'points': 25, 'activity_type': 'challenge', 'idempotency_key': f'{prefix}-challenge'}
+            for user_sk in user_sks
+        ]
+        try:
+            print(f"dialect: {db.engine.dialect.name}, {len(awards)} awards per batch")
+            for label in ('batch', 'replayed batch'):
+                with QueryCounter(db.engine) as queries:
+                    started = time.perf_counter()
+                    body = client.post('/user/spark-points/batch', json={'awards': awards}, headers=headers).get_json()
+                    elapsed = time.perf_counter() - started
+                print(f"{label:<16} {elapsed * 1000:8.1f} ms  {len(awards) / elapsed:>9,.0f} awards/s  "
+                      f"{queries.count} queries  awarded {body['awarded']} duplicates {body['duplicates']}")
+
+            started = time.perf_counter()
+            for user_sk in user_sks[:singles]:
+                client.post('/user/spark-points', json={'points': 25, 'activity_type': 'challenge'},
+                            headers=auth_header(app, user_sk))
+            elapsed = time.perf_counter() - started
+            print(f"{'single POSTs':<16} {elapsed / singles * 1000:8.2f} ms each  {singles / elapsed:>9,.0f} awards/s")
+
+            total = db.session.query(db.func.sum(SparkBalance.total)).filter(
+                SparkBalance.user_sk.in_(select(User.user_sk).where(User.username.like(f'{prefix}_%')))
+            ).scalar()
+            print(f"balances hold {total} points (expected {25 * (users + singles)})")
+        finally:
+            remove(prefix)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--singles', type=int, default=500, help='single-award requests to time')
+    args = parser.parse_args()
+    run(args.users, args.singles)
@@ -0,0 +1,119 @@
+"""Cold, incremental and cached GET /activities/training-load against a Python loop.
+
+Loads a multi-year synthetic history for one athlete, then times the
+per-activity Python loop the series used to be built with, a cold compute,
+a read after one new activity and a read with nothing changed.
+
+    DATABASE_URL=sqlite:////tmp/bench.db python -m benchmarks.training_load --years 8
+"""
+import argparse
+import json
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from benchmarks._support import bench_app, create_bench_user, auth_header
+from controllers.activity_ingest_controller import ingest_activities
+from controllers.training_load_controller import ATL_DAYS, CTL_DAYS, activity_loads
+from extensions import db
+from models.activity import Activity
+from models.training_load import TrainingLoadDay, TrainingLoadState
+from models.user import User
+
+
+def ndjson_lines(years, per_week):
+    start = datetime.utcnow() - timedelta(days=365 * years)
+    count = int(years * 52 * per_week)
+    spacing = timedelta(days=365 * years) / count
+    for i in range(count):
+        yield json.dumps({
+            'name': f'Run {i}',
+            'distance': round(random.uniform(3000, 30000), 1),
+            'moving_time': random.randint(900, 10800),
+            'total_elevation_gain': round(random.uniform(0, 600), 1),
+            'type': 'Run',
+            'start_date': (start + spacing * i).isoformat()
+        })
+
+
+def python_loop(athlete_id):
+    """What the external job did: every row into Python, one day at a time"""
+    activities = Activity.query.filter_by(athlete_id=athlete_id).order_by(Activity.start_date).all()
+    per_day = {}
+    for activity in activities:
+        load = float(activity_loads(
+            np.array([activity.moving_time or 0.0]),
+            np.array([activity.distance or 0.0]),
+            np.array([activity.total_elevation_gain or 0.0])
+        )[0])
+        day = activity.start_date.date()
+        per_day[day] = per_day.get(day, 0.0) + load
+
+    atl = ctl = 0.0
+    k_atl, k_ctl = 1 - math.exp(-1 / ATL_DAYS), 1 - math.exp(-1 / CTL_DAYS)
+    day, today, series = min(per_day), datetime.utcnow().date(), []
+    while day <= today:
+        tsb = ctl - atl
+        load = per_day.get(day, 0.0)
+        atl += k_atl * (load - atl)
+        ctl += k_ctl * (load - ctl)
+        series.append((day, load, atl, ctl, tsb))
+        day += timedelta(days=1)
+    return series
+
+
+def timed_ms(fn):
+    started = time.perf_counter()
+    result = fn()
+    return (time.perf_counter() - started) * 1000, result
+
+
+def run(years, per_week):
+    app = bench_app()
+    client = app.test_client()
+
+    with app.app_context():
+        user = create_bench_user()
+        user_sk = user.user_sk
+        headers = auth_header(app, user_sk)
+        url = f'/activities/training-load?from={(datetime.utcnow() - timedelta(days=365 * years)).date()}'
+
+        try:
+            ingest_activities(ndjson_lines(years, per_week), user_sk, chunk_size=5000)
+            # Bulk ingest marks the athlete dirty; start from an empty cache
+            TrainingLoadState.query.filter_by(athlete_id=user_sk).delete()
+            db.session.commit()
+            activities = Activity.query.filter_by(athlete_id=user_sk).count()
+
+            loop_ms, loop_series = timed_ms(lambda: python_loop(user_sk))
+            db.session.remove()
+            cold_ms, cold = timed_ms(lambda: client.get(url, headers=headers))
+
+            client.post('/activities', json={'name': 'today', 'distance': 8000, 'moving_time': 2700},
+                        headers=headers)
+            incremental_ms, _ = timed_ms(lambda: client.get(url, headers=headers))
+            cached_ms, _ = timed_ms(lambda: client.get(url, headers=headers))
+
+            print(f"dialect: {db.engine.dialect.name}, {activities} activities, "
+                  f"{len(cold.get_json()['series'])} days (python loop: {len(loop_series)} days)")
+            print(f'python loop            {loop_ms:>9.1f} ms')
+            print(f'cold compute + read    {cold_ms:>9.1f} ms')
+            print(f'after one new activity {incremental_ms:>9.1f} ms')
+            print(f'nothing changed        {cached_ms:>9.1f} ms')
+        finally:
+            TrainingLoadDay.query.filter_by(athlete_id=user_sk).delete()
+            TrainingLoadState.query.filter_by(athlete_id=user_sk).delete()
+            Activity.query.filter_by(athlete_id=user_sk).delete()
+            User.query.filter_by(user_sk=user_sk).delete()
+            db.session.commit()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, default=8)
+    parser.add_argument('--per-week', type=float, default=6)
+    args = parser.parse_args()
+    run(args.years, args.per_week)
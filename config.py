@@ -12,8 +12,8 @@ class Config:
     # Update database URI to use Neon PostgreSQL
     # Ensure SSL mode for Neon
     database_url = os.environ.get('DATABASE_URL')
-    if database_url and 'sslmode' not in database_url:
-        database_url += '?sslmode=require'
+    if database_url and database_url.startswith('postgres') and 'sslmode' not in database_url:
+        database_url += ('&' if '?' in database_url else '?') + 'sslmode=require'
     SQLALCHEMY_DATABASE_URI = database_url
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-key'
@@ -21,7 +21,88 @@ class Config:
     # File upload settings
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # Max file size 16MB
+
+    # Photo blobs, stored by SHA-256 outside the database
+    BLOB_STORE = os.getenv('BLOB_STORE', 'local')
+    # Must be persistent storage shared by every worker (a mounted volume in
+    # containers); unset falls back to instance/blobs, which only debug
+    # (development) servers accept uploads into
+    BLOB_STORE_PATH = os.getenv('BLOB_STORE_PATH')
+    BLOB_STORE_FSYNC = os.getenv('BLOB_STORE_FSYNC', 'true').lower() == 'true'
+    BLOB_MIGRATION_BATCH_SIZE = int(os.getenv('BLOB_MIGRATION_BATCH_SIZE', 50))  # rows per transaction
+
+    # Authenticated-identity cache (per worker process)
+    AUTH_CACHE_TTL = int(os.getenv('AUTH_CACHE_TTL', 60))  # seconds
+    AUTH_CACHE_MAX_SIZE = int(os.getenv('AUTH_CACHE_MAX_SIZE', 10000))
+
+    # Password hashing pool (per worker process)
+    PASSWORD_HASH_POOL_ENABLED = os.getenv('PASSWORD_HASH_POOL_ENABLED', 'true').lower() == 'true'
+    PASSWORD_HASH_POOL_WORKERS = int(os.getenv('PASSWORD_HASH_POOL_WORKERS', 2))
+    # Every pending job holds a request thread. One below the worker's
+    # thread count (gunicorn.conf.py) always leaves a thread for other
+    # endpoints during a login storm; the rest get 503
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv(
+        'PASSWORD_HASH_MAX_PENDING', max(1, int(os.getenv('GUNICORN_THREADS', 4)) - 1)
+    ))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 5))  # seconds
+
+    # Outbound HTTP client shared by every external call (per worker process)
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', 3.05))  # seconds
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', 10))  # seconds between bytes
+    HTTP_RETRIES = int(os.getenv('HTTP_RETRIES', 2))  # idempotent methods only
+    HTTP_RETRY_BACKOFF = float(os.getenv('HTTP_RETRY_BACKOFF', 0.3))  # 0.3s, 0.6s, ...
+    HTTP_POOL_MAXSIZE = int(os.getenv('HTTP_POOL_MAXSIZE', 32))  # kept-alive connections per host
+
+    # Bulk partner onboarding
+    ONBOARDING_BATCH_SIZE = int(os.getenv('ONBOARDING_BATCH_SIZE', 1000))
+    # Usernames (partner integrations, admins) allowed to call POST /user/onboard
+    ONBOARDING_ACCOUNTS = {name.strip() for name in os.getenv('ONBOARDING_ACCOUNTS', '').split(',') if name.strip()}
+
+    # Bulk activity ingest (rows per COPY / INSERT transaction)
+    ACTIVITY_INGEST_CHUNK_SIZE = int(os.getenv('ACTIVITY_INGEST_CHUNK_SIZE', 5000))
+    ACTIVITY_INGEST_MAX_CHUNK_SIZE = int(os.getenv('ACTIVITY_INGEST_MAX_CHUNK_SIZE', 50000))
+
+    # Duplicate activity detection: 'reject', 'merge' or 'flag' (empty disables it)
+    ACTIVITY_DEDUP_POLICY = os.getenv('ACTIVITY_DEDUP_POLICY', 'flag')
+    ACTIVITY_DEDUP_START_TOLERANCE = int(os.getenv('ACTIVITY_DEDUP_START_TOLERANCE', 300))  # seconds
+    ACTIVITY_DEDUP_RELATIVE_TOLERANCE = float(os.getenv('ACTIVITY_DEDUP_RELATIVE_TOLERANCE', 0.03))  # distance / moving time
+
+    # Third-party activity sync
+    SYNC_WORKERS = int(os.getenv('SYNC_WORKERS', 16))  # concurrent fetch threads
+    SYNC_BATCH_SIZE = int(os.getenv('SYNC_BATCH_SIZE', 2000))  # activities per upsert transaction
+    SYNC_PAGE_SIZE = int(os.getenv('SYNC_PAGE_SIZE', 100))
+    SYNC_MAX_PAGES = int(os.getenv('SYNC_MAX_PAGES', 20))  # per token per run
+    SYNC_REFRESH_MARGIN = int(os.getenv('SYNC_REFRESH_MARGIN', 300))  # refresh tokens expiring within (s)
+    # Refetch activities starting this long before the high-water mark, for late uploads (s)
+    SYNC_CURSOR_OVERLAP = int(os.getenv('SYNC_CURSOR_OVERLAP', 3 * 24 * 3600))
+    # Per-platform overrides, e.g. "strava=200/900,garmin=100/60" (requests/seconds)
+    SYNC_RATE_LIMITS = os.getenv('SYNC_RATE_LIMITS', '')
+
+    # Spark-point leaderboards (per worker process)
+    LEADERBOARD_REFRESH_SECONDS = float(os.getenv('LEADERBOARD_REFRESH_SECONDS', 1.0))  # poll for new awards
+    LEADERBOARD_REBUILD_SECONDS = int(os.getenv('LEADERBOARD_REBUILD_SECONDS', 3600))  # full reload
+    LEADERBOARD_MAX_LIMIT = int(os.getenv('LEADERBOARD_MAX_LIMIT', 100))
+
+    # Batch spark-point awards (entries per request, all in one transaction)
+    SPARK_BATCH_MAX_ENTRIES = int(os.getenv('SPARK_BATCH_MAX_ENTRIES', 50000))
+    # Usernames (partner integrations, admins) allowed to call POST /user/spark-points/batch
+    SPARK_BATCH_ACCOUNTS = {name.strip() for name in os.getenv('SPARK_BATCH_ACCOUNTS', '').split(',') if name.strip()}
+
+    # Offline hydration sync (logs per request, all in one transaction)
+    HYDRATION_SYNC_MAX_ENTRIES = int(os.getenv('HYDRATION_SYNC_MAX_ENTRIES', 1000))
     
+    # Geocoding cache: in-process LRU, then geocoding_results rows
+    GEOCODING_PROVIDER = os.getenv('GEOCODING_PROVIDER', 'google')  # or 'fake' (offline, deterministic)
+    GEOCODING_CACHE_TTL_DAYS = int(os.getenv('GEOCODING_CACHE_TTL_DAYS', 30))  # database rows
+    GEOCODING_MEMORY_TTL_SECONDS = int(os.getenv('GEOCODING_MEMORY_TTL_SECONDS', 3600))
+    GEOCODING_MEMORY_MAX_ENTRIES = int(os.getenv('GEOCODING_MEMORY_MAX_ENTRIES', 10000))
+    GEOCODING_NEGATIVE_TTL_SECONDS = int(os.getenv('GEOCODING_NEGATIVE_TTL_SECONDS', 300))  # unresolvable, memory only
+    GEOCODING_RATE_LIMIT = os.getenv('GEOCODING_RATE_LIMIT', '')  # requests/seconds, e.g. 50/1; default per provider
+    GEOCODING_BATCH_WORKERS = int(os.getenv('GEOCODING_BATCH_WORKERS', 16))  # concurrent provider calls per batch
+    GEOCODING_BATCH_MAX_ADDRESSES = int(os.getenv('GEOCODING_BATCH_MAX_ADDRESSES', 1000))
+    GEOCODING_MAX_RADIUS_M = int(os.getenv('GEOCODING_MAX_RADIUS_M', 100000))  # GET /geocode/within
+    GEOCODING_MATCH_RADIUS_M = float(os.getenv('GEOCODING_MATCH_RADIUS_M', 25))  # GET /geocode?lat=&lng=
+
     # API credentials
     CLIENT_ID = os.getenv('CLIENT_ID', 'CLIENT_ID')
     CLIENT_SECRET = os.getenv('CLIENT_SECRET', 'CLIENT_SECRET')
@@ -31,3 +112,4 @@ class Config:
     GOOGLE_CLIENT_ID = os.getenv('GOOGLE_CLIENT_ID', 'your-google-client-id')
     GOOGLE_CLIENT_SECRET = os.getenv('GOOGLE_CLIENT_SECRET', 'your-google-client-secret')
     GOOGLE_DISCOVERY_URL = "https://accounts.google.com/.well-known/openid-configuration"
+    GOOGLE_CERTS_URL = os.getenv('GOOGLE_CERTS_URL', 'https://www.googleapis.com/oauth2/v1/certs')
@@ -0,0 +1,274 @@
+"""Duplicate activity detection.
+
+Two activities are duplicates when they belong to the same athlete, start
+within ACTIVITY_DEDUP_START_TOLERANCE seconds of each other and their
+distance and moving time differ by at most ACTIVITY_DEDUP_RELATIVE_TOLERANCE.
+
+Every activity stores a fingerprint (Activity.dedup_key) of its bucket in
+each of those three dimensions. Buckets are twice the tolerance wide, so a
+duplicate always sits in the activity's own bucket or in the nearer
+neighbour of each dimension: 8 candidate keys, looked up through the
+(athlete_id, dedup_key) index, replace a scan of the athlete's history.
+Changing the tolerances changes the buckets; run ``flask activity
+find-duplicates --apply`` afterwards to re-key existing rows.
+
+Activities without a start date, a distance or a moving time get no
+fingerprint and never match: a zero would put every strength or yoga
+session into the same bucket.
+"""
+import math
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from config import Config
+from extensions import db
+from models.activity import Activity
+
+DEDUP_POLICIES = ('reject', 'merge', 'flag')
+
+# Fields a merge may copy onto the surviving activity when they are empty there
+MERGE_FIELDS = (
+    'name', 'distance', 'moving_time', 'elapsed_time',
+    'total_elevation_gain', 'type', 'description', 'calories'
+)
+
+_EPOCH = datetime(1970, 1, 1)
+_KEYS_PER_QUERY = 500
+
+
+def dedup_policy(requested=None):
+    """The policy for this request (?on_duplicate=...) or the configured default; None when disabled"""
+    policy = requested if requested is not None else Config.ACTIVITY_DEDUP_POLICY
+    if not policy or policy == 'off':
+        return None
+    if policy not in DEDUP_POLICIES:
+        raise ValueError(f"on_duplicate must be one of {', '.join(DEDUP_POLICIES)} or off")
+    return policy
+
+
+def _getter(item):
+    return item.get if isinstance(item, dict) else lambda key: getattr(item, key)
+
+
+def _dimensions(item):
+    """(start seconds, log distance, log moving time) of an Activity, row or dict; None if any is missing"""
+    get = _getter(item)
+    start, distance, moving_time = get('start_date'), get('distance'), get('moving_time')
+    if start is None or not distance or not moving_time or distance < 0 or moving_time < 0:
+        return None
+    if isinstance(start, str):
+        start = datetime.fromisoformat(start)
+    if not isinstance(start, datetime):
+        start = datetime.combine(start, datetime.min.time())
+    return (
+        (start - _EPOCH).total_seconds(),
+        math.log(max(distance, 1.0)),
+        math.log(max(moving_time, 1.0))
+    )
+
+
+def _tolerances():
+    relative = math.log1p(Config.ACTIVITY_DEDUP_RELATIVE_TOLERANCE)
+    return (Config.ACTIVITY_DEDUP_START_TOLERANCE, relative, relative)
+
+
+def _within_tolerance(a, b):
+    return all(abs(x - y) <= tolerance for x, y, tolerance in zip(a, b, _tolerances()))
+
+
+def _buckets(dimensions):
+    """Per dimension: the value's own bucket and the neighbour on its nearer side"""
+    result = []
+    for value, tolerance in zip(dimensions, _tolerances()):
+        position = value / (2 * tolerance)
+        bucket = math.floor(position)
+        result.append((bucket, bucket - 1 if position - bucket < 0.5 else bucket + 1))
+    return result
+
+
+def probe(item):
+    """(dimensions, own dedup_key, the 8 keys a duplicate can have), or None when it cannot be fingerprinted"""
+    dimensions = _dimensions(item)
+    if dimensions is None:
+        return None
+    starts, distances, moving_times = _buckets(dimensions)
+    keys = [
+        f'{start}:{distance}:{moving_time}'
+        for start in starts for distance in distances for moving_time in moving_times
+    ]
+    return dimensions, keys[0], keys
+
+
+def fingerprint(item):
+    """The dedup_key to store for an activity (None when it cannot be fingerprinted)"""
+    described = probe(item)
+    return described[1] if described else None
+
+
+class DuplicateIndex:
+    """In-memory fingerprint index over probes: add() activities, match() returns the original's reference"""
+
+    def __init__(self):
+        self._entries = defaultdict(list)
+
+    def add(self, described, reference):
+        if described is not None:
+            dimensions, key, _ = described
+            self._entries[key].append((dimensions, reference))
+
+    def match(self, described):
+        if described is None:
+            return None
+        dimensions, _, keys = described
+        for key in keys:
+            for other, reference in self._entries.get(key, ()):
+                if _within_tolerance(dimensions, other):
+                    return reference
+        return None
+
+
+def match_existing(athlete_id, items, exclude_ids=()):
+    """For each item, the activity_id of the stored activity it duplicates (or None).
+
+    Flagged duplicates resolve to their original, so a third copy points at
+    the first one. Costs one indexed IN query per 500 candidate keys. Items
+    may be activities, row dicts or their probe() results (None included).
+    """
+    probes = [item if item is None or isinstance(item, tuple) else probe(item) for item in items]
+    keys = sorted({key for described in probes if described for key in described[2]})
+    index = DuplicateIndex()
+    for offset in range(0, len(keys), _KEYS_PER_QUERY):
+        query = db.session.query(
+            Activity.activity_id, Activity.duplicate_of, Activity.start_date,
+            Activity.distance, Activity.moving_time
+        ).filter(
+            Activity.athlete_id == athlete_id,
+            Activity.dedup_key.in_(keys[offset:offset + _KEYS_PER_QUERY])
+        )
+        if exclude_ids:
+            query = query.filter(Activity.activity_id.notin_(exclude_ids))
+        for row in query:
+            reference = row.duplicate_of or row.activity_id
+            # A copy of one of the excluded activities is not a reason to flag it
+            if reference not in exclude_ids:
+                index.add(probe(row), reference)
+    return [index.match(described) for described in probes]
+
+
+def flag_new_rows(athlete_id, rows):
+    """Set duplicate_of on row dicts about to be inserted; returns (rows to write now, rows to write after them).
+
+    Only the given rows are probed and only they are changed: one
+    fingerprint lookup against stored activities, plus an in-memory index
+    for copies of an earlier row in the same batch. Those copies have no
+    original id to point at yet, so they are held back; write them after
+    the rest and pass them through here again to resolve it.
+    """
+    probes = [probe(row) for row in rows]
+    pending = DuplicateIndex()
+    now, later = [], []
+    for row, described, original_id in zip(rows, probes, match_existing(athlete_id, probes)):
+        row['duplicate_of'] = original_id
+        if original_id is None and pending.match(described) is not None:
+            later.append(row)
+            continue
+        if original_id is None:
+            pending.add(described, True)
+        now.append(row)
+    return now, later
+
+
+def merge_into(target, item):
+    """Copy the fields the surviving activity (model or row dict) is missing from a duplicate"""
+    get, current = _getter(item), _getter(target)
+    filled = []
+    for field in MERGE_FIELDS:
+        value = get(field)
+        if value not in (None, '', 0) and current(field) in (None, '', 0):
+            if isinstance(target, dict):
+                target[field] = value
+            else:
+                setattr(target, field, value)
+            filled.append(field)
+    return filled
+
+
+def scan_athlete(athlete_id, start=None, end=None, apply=False):
+    """Find duplicates in one athlete's history with a sliding time window.
+
+    Activities are read in start_date order through ix_activities_athlete_start
+    and each one is only compared with those that started less than the start
+    tolerance before it, so the scan is linear in the history length. With
+    apply, missing or stale dedup_keys are rewritten and new duplicates get
+    duplicate_of set, in the caller's transaction.
+    Returns (activities scanned, [(activity_id, duplicate_of)], rows updated).
+    """
+    tolerance = _tolerances()[0]
+    query = db.session.query(
+        Activity.activity_id, Activity.duplicate_of, Activity.dedup_key,
+        Activity.start_date, Activity.distance, Activity.moving_time
+    ).filter(Activity.athlete_id == athlete_id, Activity.start_date.isnot(None))
+    # Read one tolerance beyond the range so edge activities see their neighbours
+    if start is not None:
+        query = query.filter(Activity.start_date >= start - timedelta(seconds=tolerance))
+    if end is not None:
+        query = query.filter(Activity.start_date <= end + timedelta(seconds=tolerance))
+
+    scanned = 0
+    found = []
+    updates = []
+    window = deque()
+    for row in query.order_by(Activity.start_date, Activity.activity_id):
+        described = probe(row)
+        in_range = (start is None or row.start_date >= start) and (end is None or row.start_date <= end)
+        if described is None:
+            # Not fingerprintable: drop a stale key, keep any duplicate_of set by hand
+            if in_range:
+                scanned += 1
+                if apply and row.dedup_key is not None:
+                    updates.append({'activity_id': row.activity_id, 'dedup_key': None,
+                                    'duplicate_of': row.duplicate_of})
+            continue
+        dimensions, key, _ = described
+        while window and dimensions[0] - window[0][0][0] > tolerance:
+            window.popleft()
+
+        original = row.duplicate_of
+        if original is None and in_range:
+            for other, other_original in window:
+                if _within_tolerance(dimensions, other):
+                    original = other_original
+                    found.append((row.activity_id, original))
+                    break
+        window.append((dimensions, original or row.activity_id))
+
+        if not in_range:
+            continue
+        scanned += 1
+        if apply and (key != row.dedup_key or original != row.duplicate_of):
+            updates.append({'activity_id': row.activity_id, 'dedup_key': key, 'duplicate_of': original})
+
+    if updates:
+        db.session.execute(update(Activity), updates)
+    return scanned, found, len(updates)
+
+
+def scan_duplicates(athlete_id=None, apply=False):
+    """Batch job over every athlete (or one); commits per athlete when applying"""
+    if athlete_id is not None:
+        athlete_ids = [athlete_id]
+    else:
+        athlete_ids = [row[0] for row in db.session.query(Activity.athlete_id).distinct()]
+
+    totals = {'athletes': 0, 'scanned': 0, 'duplicates': 0, 'updated': 0}
+    for current in athlete_ids:
+        scanned, found, updated = scan_athlete(current, apply=apply)
+        if apply:
+            db.session.commit()
+        totals['athletes'] += 1
+        totals['scanned'] += scanned
+        totals['duplicates'] += len(found)
+        totals['updated'] += updated
+    return totals
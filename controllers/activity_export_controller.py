@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+from datetime import datetime, date
+
+from sqlalchemy import select
+
+from extensions import db
+from models.activity import Activity
+
+EXPORT_COLUMNS = [
+    'activity_id', 'athlete_id', 'name', 'distance', 'moving_time', 'elapsed_time',
+    'total_elevation_gain', 'type', 'start_date', 'description', 'calories',
+    'created_at', 'updated_at'
+]
+# Rows fetched per round trip from the server-side cursor
+FETCH_SIZE = 2000
+# Rows serialized into one chunk of the HTTP response
+ROWS_PER_CHUNK = 500
+
+
+def _stream_rows(filters):
+    """Yield plain row tuples through a server-side cursor.
+
+    yield_per turns on stream_results, so psycopg2 uses a named cursor and
+    only FETCH_SIZE rows are held in memory at a time; Core rows also skip
+    building an ORM object per activity.
+    """
+    stmt = (
+        select(*(getattr(Activity, column) for column in EXPORT_COLUMNS))
+        .where(*filters)
+        .order_by(Activity.start_date, Activity.activity_id)
+        .execution_options(yield_per=FETCH_SIZE)
+    )
+    result = db.session.execute(stmt)
+    try:
+        for row in result:
+            yield row
+    finally:
+        result.close()
+
+
+def _iso(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def export_ndjson(filters):
+    lines = []
+    for row in _stream_rows(filters):
+        lines.append(json.dumps({column: _iso(value) for column, value in zip(EXPORT_COLUMNS, row)}))
+        if len(lines) >= ROWS_PER_CHUNK:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def export_csv(filters):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    # Ship the header straight away so the client sees the first byte immediately
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+
+    pending = 0
+    for row in _stream_rows(filters):
+        writer.writerow([_iso(value) for value in row])
+        pending += 1
+        if pending >= ROWS_PER_CHUNK:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
@@ -0,0 +1,245 @@
+import csv
+import io
+import json
+from collections import defaultdict
+from datetime import datetime, date
+
+from sqlalchemy import insert
+
+from extensions import db
+from models.activity import Activity
+from controllers.activity_rollup_controller import activity_snapshot, apply_rollup_changes
+from controllers.activity_dedup_controller import (
+    DuplicateIndex, fingerprint, flag_new_rows, match_existing, merge_into, probe
+)
+from controllers.training_load_controller import mark_training_load_dirty
+
+# Client-writable Activity columns and how each one is validated
+INGEST_COLUMNS = {
+    'name': ('str', 255),
+    'distance': ('float', None),
+    'moving_time': ('int', None),
+    'elapsed_time': ('int', None),
+    'total_elevation_gain': ('float', None),
+    'type': ('str', 50),
+    'start_date': ('datetime', None),
+    'description': ('str', None),
+    'calories': ('float', None)
+}
+COPY_COLUMNS = ['athlete_id'] + list(INGEST_COLUMNS) + ['dedup_key', 'duplicate_of', 'created_at', 'updated_at']
+
+
+def _coerce(field, value):
+    kind, max_length = INGEST_COLUMNS[field]
+    if value is None:
+        return None
+    if kind == 'str':
+        if not isinstance(value, str):
+            raise ValueError(f'{field} must be a string')
+        if max_length and len(value) > max_length:
+            raise ValueError(f'{field} must be at most {max_length} characters')
+        return value
+    if kind == 'float':
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ValueError(f'{field} must be a number')
+        return float(value)
+    if kind == 'int':
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value != int(value):
+            raise ValueError(f'{field} must be an integer')
+        return int(value)
+    if not isinstance(value, str):
+        raise ValueError(f'{field} must be an ISO 8601 datetime string')
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f'{field} must be an ISO 8601 datetime string')
+    # Stored naive in UTC like every other timestamp in the schema
+    if parsed.tzinfo is not None:
+        parsed = (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    return parsed
+
+
+def parse_start_date(value):
+    """A client-supplied start_date (ISO 8601 string or None) as naive UTC; raises ValueError"""
+    return _coerce('start_date', value)
+
+
+def validate_activity_line(line):
+    """Parse and validate one NDJSON line; returns (row, error)"""
+    try:
+        record = json.loads(line)
+    except ValueError as e:
+        return None, f'Invalid JSON: {e}'
+    if not isinstance(record, dict):
+        return None, 'Expected a JSON object'
+
+    unknown = sorted(set(record) - set(INGEST_COLUMNS))
+    if unknown:
+        return None, f"Unknown fields: {', '.join(unknown)}"
+
+    row = {}
+    try:
+        for field in INGEST_COLUMNS:
+            row[field] = _coerce(field, record.get(field))
+    except (ValueError, OverflowError) as e:
+        return None, str(e)
+    return row, None
+
+
+def _copy_rows(rows):
+    """Load rows with PostgreSQL COPY on the session's own connection"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in (row[column] for column in COPY_COLUMNS)
+        ])
+    buffer.seek(0)
+
+    cursor = db.session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {Activity.__tablename__} ({', '.join(COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+    finally:
+        cursor.close()
+
+
+def _insert_rows(rows):
+    # One cached INSERT compiled once and run through the driver's executemany;
+    # a literal multi-row VALUES clause would be recompiled for every chunk
+    db.session.execute(insert(Activity.__table__), rows)
+
+
+def _resolve_duplicates(athlete_id, chunk, chunk_lines, policy, rejected):
+    """Apply the reject/merge policy to a chunk; returns (rows to load, their lines, merged count).
+
+    Rows are matched against stored activities with one fingerprint lookup
+    and against earlier rows of the same chunk with an in-memory index.
+    Merges into stored activities are written in the chunk's transaction.
+    """
+    probes = [probe(row) for row in chunk]
+    originals = match_existing(athlete_id, probes)
+    pending = DuplicateIndex()
+    rows, lines = [], []
+    merges = defaultdict(list)
+    merged = 0
+    for row, line_number, described, original_id in zip(chunk, chunk_lines, probes, originals):
+        earlier = pending.match(described) if original_id is None else None
+        if original_id is None and earlier is None:
+            pending.add(described, len(rows))
+            rows.append(row)
+            lines.append(line_number)
+        elif policy == 'reject':
+            duplicate = f'activity {original_id}' if original_id is not None else f'line {lines[earlier]}'
+            rejected.append({'line': line_number, 'error': f'Duplicate of {duplicate}'})
+        else:
+            if original_id is not None:
+                merges[original_id].append(row)
+            else:
+                merge_into(rows[earlier], row)
+            merged += 1
+
+    if merges:
+        for activity in Activity.query.filter(Activity.activity_id.in_(merges)):
+            before = activity_snapshot(activity)
+            for row in merges[activity.activity_id]:
+                merge_into(activity, row)
+            activity.dedup_key = fingerprint(activity)
+            apply_rollup_changes(athlete_id, removed=[before], added=[activity])
+            mark_training_load_dirty(athlete_id, [before], [activity])
+    return rows, lines, merged
+
+
+def ingest_activities(lines, athlete_id, chunk_size=5000, on_duplicate=None):
+    """Bulk-load NDJSON activity lines for one athlete.
+
+    Lines are validated as they are read and loaded chunk by chunk, each
+    chunk in its own transaction (COPY on PostgreSQL, executemany INSERT
+    elsewhere). A chunk that fails in the database is rolled back and all of
+    its lines are reported as rejected; the rest of the stream still loads.
+    on_duplicate is a dedup policy (see activity_dedup_controller): 'reject'
+    and 'merge' drop duplicate lines before loading, 'flag' loads them with
+    duplicate_of set; stored activities are never touched.
+    """
+    use_copy = db.session.get_bind().dialect.name == 'postgresql'
+    load_rows = _copy_rows if use_copy else _insert_rows
+
+    accepted = merged = flagged = 0
+    rejected = []
+    chunk, chunk_lines = [], []
+    now = datetime.utcnow()
+    # Same default as Activity.start_date (today, midnight)
+    default_start = datetime.combine(date.today(), datetime.min.time())
+
+    def load(rows):
+        # Defaulted only now: an invented start must not make rows look like duplicates
+        for row in rows:
+            if row['start_date'] is None:
+                row['start_date'] = default_start
+        load_rows(rows)
+
+    def flush(rows, row_lines):
+        nonlocal accepted, merged, flagged
+        all_lines = row_lines
+        duplicates = []
+        chunk_merged = chunk_flagged = 0
+        try:
+            if on_duplicate in ('reject', 'merge'):
+                rows, row_lines, chunk_merged = _resolve_duplicates(
+                    athlete_id, rows, row_lines, on_duplicate, duplicates
+                )
+            if rows and on_duplicate == 'flag':
+                first, later = flag_new_rows(athlete_id, rows)
+                load(first)
+                if later:
+                    flag_new_rows(athlete_id, later)
+                    load(later)
+                chunk_flagged = sum(row['duplicate_of'] is not None for row in rows)
+            elif rows:
+                load(rows)
+            if rows:
+                apply_rollup_changes(athlete_id, added=rows)
+                mark_training_load_dirty(athlete_id, rows)
+            db.session.commit()
+            accepted += len(rows)
+            merged += chunk_merged
+            flagged += chunk_flagged
+            rejected.extend(duplicates)
+        except Exception as e:
+            db.session.rollback()
+            error = f'Chunk failed to load: {e.__cause__ or e}'
+            rejected.extend({'line': line_number, 'error': error} for line_number in all_lines)
+
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        if not line.strip():
+            continue
+
+        row, error = validate_activity_line(line)
+        if error:
+            rejected.append({'line': line_number, 'error': error})
+            continue
+
+        row.update(athlete_id=athlete_id, duplicate_of=None, created_at=now, updated_at=now)
+        row['dedup_key'] = fingerprint(row)
+        chunk.append(row)
+        chunk_lines.append(line_number)
+
+        if len(chunk) >= chunk_size:
+            flush(chunk, chunk_lines)
+            chunk, chunk_lines = [], []
+
+    if chunk:
+        flush(chunk, chunk_lines)
+
+    return {
+        'accepted': accepted,
+        'merged': merged,
+        'flagged': flagged,
+        'rejected': len(rejected),
+        'rejects': sorted(rejected, key=lambda reject: reject['line'])
+    }
@@ -0,0 +1,179 @@
+from collections import defaultdict
+from datetime import datetime, date, timedelta
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models.activity import Activity
+from models.activity_rollup import ActivityRollup
+
+PERIOD_TYPES = ('week', 'month')
+METRICS = ('distance', 'moving_time', 'total_elevation_gain', 'calories')
+# Athletes aggregated and upserted together by rebuild_rollups
+_REBUILD_ATHLETES = 500
+
+
+def period_start(period_type, day):
+    if period_type == 'week':
+        return day - timedelta(days=day.weekday())
+    return day.replace(day=1)
+
+
+def _day_of(start_date):
+    if isinstance(start_date, str):
+        start_date = datetime.fromisoformat(start_date)
+    if isinstance(start_date, datetime):
+        return start_date.date()
+    return start_date
+
+
+def activity_snapshot(activity):
+    """The rollup-relevant fields of an Activity (or an Activity-shaped dict); raises ValueError on a non-numeric metric"""
+    get = activity.get if isinstance(activity, dict) else lambda key: getattr(activity, key)
+    snapshot = {'start_date': _day_of(get('start_date'))}
+    for metric in METRICS:
+        value = get(metric) or 0
+        if isinstance(value, bool):
+            raise ValueError(f'{metric} must be numeric')
+        try:
+            snapshot[metric] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f'{metric} must be numeric')
+    return snapshot
+
+
+def _upsert(rows):
+    """Add each row's counters to its rollup, creating the row if needed.
+
+    The increments happen inside the database (col = col + excluded.col),
+    so concurrent writers for the same athlete never lose an update.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        insert = postgresql.insert
+    elif dialect == 'sqlite':
+        insert = sqlite.insert
+    else:
+        raise RuntimeError(f'Activity rollups do not support the {dialect} dialect')
+
+    table = ActivityRollup.__table__
+    stmt = insert(table)
+    counters = ('activity_count',) + METRICS
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.athlete_id, table.c.period_type, table.c.period_start],
+        set_=dict(
+            {column: table.c[column] + stmt.excluded[column] for column in counters},
+            updated_at=stmt.excluded.updated_at
+        )
+    )
+    # executemany: upserts are not in the compiled cache, and a multi-VALUES
+    # statement would be compiled afresh for every row count
+    db.session.execute(stmt, rows)
+
+
+def apply_rollup_changes(athlete_id, removed=(), added=()):
+    """Fold activity writes into the athlete's weekly and monthly rollups.
+
+    ``removed`` and ``added`` are activity snapshots (see activity_snapshot);
+    an update is the old snapshot removed plus the new one added. All deltas
+    are merged per period and written with one upsert in the caller's
+    transaction, so the rollups commit or roll back with the activity rows.
+    """
+    apply_rollup_changes_many({athlete_id: (removed, added)})
+
+
+def apply_rollup_changes_many(changes):
+    """apply_rollup_changes for several athletes at once.
+
+    ``changes`` maps athlete_id -> (removed, added); every athlete's deltas
+    go into the same upsert, so batch writers pay for one statement instead
+    of one per athlete.
+    """
+    deltas = defaultdict(lambda: dict.fromkeys(('activity_count',) + METRICS, 0))
+    for athlete_id, (removed, added) in changes.items():
+        for sign, snapshots in ((-1, removed), (1, added)):
+            for snapshot in snapshots:
+                # Rebuild passes pre-aggregated day totals that already carry a count
+                if not isinstance(snapshot, dict) or 'activity_count' not in snapshot:
+                    snapshot = activity_snapshot(snapshot)
+                if snapshot['start_date'] is None:
+                    continue
+                for period_type in PERIOD_TYPES:
+                    delta = deltas[(athlete_id, period_type, period_start(period_type, snapshot['start_date']))]
+                    delta['activity_count'] += sign * snapshot.get('activity_count', 1)
+                    for metric in METRICS:
+                        delta[metric] += sign * snapshot[metric]
+
+    now = datetime.utcnow()
+    rows = [
+        dict(delta, athlete_id=athlete_id, period_type=period_type, period_start=start, updated_at=now)
+        for (athlete_id, period_type, start), delta in deltas.items()
+        if any(delta.values())
+    ]
+    if rows:
+        _upsert(rows)
+
+
+def rebuild_rollups(athlete_id=None):
+    """Recompute rollups from the activities table; returns the number of rollup rows written.
+
+    Activities are pre-aggregated per athlete and day in SQL, so Python only
+    sees one row per active day. Athletes are read in keyset chunks of
+    _REBUILD_ATHLETES by id, and each chunk's days go into one
+    apply_rollup_changes_many upsert, so memory holds one chunk rather than
+    the whole table. It all commits once: readers keep the old rollups
+    until the rebuild is complete.
+    """
+    day = db.func.date(Activity.start_date)
+    query = db.session.query(
+        Activity.athlete_id,
+        day,
+        db.func.count(Activity.activity_id),
+        *(db.func.coalesce(db.func.sum(getattr(Activity, metric)), 0) for metric in METRICS)
+    ).filter(Activity.start_date.isnot(None)).group_by(Activity.athlete_id, day)
+    athletes = db.session.query(Activity.athlete_id).filter(
+        Activity.start_date.isnot(None)
+    ).distinct().order_by(Activity.athlete_id)
+
+    delete = ActivityRollup.query
+    if athlete_id is not None:
+        athletes = athletes.filter(Activity.athlete_id == athlete_id)
+        delete = delete.filter(ActivityRollup.athlete_id == athlete_id)
+    delete.delete(synchronize_session=False)
+
+    last = None
+    while True:
+        chunk = athletes if last is None else athletes.filter(Activity.athlete_id > last)
+        athlete_ids = [row_athlete_id for (row_athlete_id,) in chunk.limit(_REBUILD_ATHLETES)]
+        if not athlete_ids:
+            break
+        changes = defaultdict(lambda: ((), []))
+        rows = query.filter(Activity.athlete_id.between(athlete_ids[0], athlete_ids[-1]))
+        for row_athlete_id, active_day, count, *totals in rows:
+            if isinstance(active_day, str):
+                active_day = date.fromisoformat(active_day)
+            snapshot = dict(zip(METRICS, totals), start_date=active_day, activity_count=count)
+            changes[row_athlete_id][1].append(snapshot)
+        apply_rollup_changes_many(changes)
+        last = athlete_ids[-1]
+    db.session.commit()
+
+    written = ActivityRollup.query
+    if athlete_id is not None:
+        written = written.filter(ActivityRollup.athlete_id == athlete_id)
+    return written.count()
+
+
+def get_rollups(athlete_id, period_type, start=None, end=None, limit=12):
+    """Most recent rollups first; reads only the rollup table"""
+    query = ActivityRollup.query.filter(
+        ActivityRollup.athlete_id == athlete_id,
+        ActivityRollup.period_type == period_type,
+        ActivityRollup.activity_count > 0
+    )
+    if start:
+        query = query.filter(ActivityRollup.period_start >= period_start(period_type, start))
+    if end:
+        query = query.filter(ActivityRollup.period_start <= end)
+    rows = query.order_by(ActivityRollup.period_start.desc()).limit(limit).all()
+    return [row.to_dict() for row in rows]
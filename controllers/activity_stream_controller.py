@@ -0,0 +1,82 @@
+import math
+
+import numpy as np
+
+from extensions import db
+from models.activity_stream import ActivityStream
+from utils.streams import CHANNEL_SCALES, encode_channel, decode_channel, downsample
+
+
+def save_streams(activity_id, data):
+    """Replace the given channels of an activity; returns (result, status_code)"""
+    if not isinstance(data, dict) or not data:
+        return {'error': 'Expected an object mapping channel names to arrays of numbers'}, 400
+
+    unknown = sorted(set(data) - set(CHANNEL_SCALES))
+    if unknown:
+        return {'error': f"Unknown channels: {', '.join(unknown)}"}, 400
+
+    lengths = {len(values) for values in data.values() if isinstance(values, list)}
+    if len(lengths) != 1 or not all(isinstance(values, list) for values in data.values()):
+        return {'error': 'All channels must be arrays of the same length'}, 400
+
+    for channel, values in data.items():
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                return {'error': f'{channel} must contain only finite numbers'}, 400
+
+    try:
+        existing = {
+            stream.channel: stream
+            for stream in ActivityStream.query.filter(ActivityStream.activity_id == activity_id)
+        }
+        length = lengths.pop()
+        kept = [stream for channel, stream in existing.items() if channel not in data]
+        if any(stream.point_count != length for stream in kept):
+            return {'error': 'Channels must have the same length as the streams already stored'}, 400
+
+        result = {}
+        for channel, values in data.items():
+            blob = encode_channel(channel, values)
+            stream = existing.get(channel) or ActivityStream(activity_id=activity_id, channel=channel)
+            stream.point_count = len(values)
+            stream.data = blob
+            db.session.add(stream)
+            result[channel] = {'points': len(values), 'bytes': len(blob)}
+        db.session.commit()
+        return {'activity_id': activity_id, 'channels': result}, 200
+    except Exception as e:
+        db.session.rollback()
+        return {'error': str(e)}, 500
+
+
+def get_streams(activity_id, channels=None, max_points=None):
+    """Decode an activity's channels, downsampled to at most max_points samples"""
+    query = ActivityStream.query.filter(ActivityStream.activity_id == activity_id)
+    if channels:
+        # Always load lat/lng/time so the simplification can follow the route
+        # shape even when the caller only asked for, say, heart rate
+        query = query.filter(ActivityStream.channel.in_(set(channels) | {'lat', 'lng', 'time'}))
+    rows = query.all()
+    if not rows:
+        return {'error': 'No streams stored for this activity'}, 404
+
+    lengths = {row.point_count for row in rows}
+    if len(lengths) != 1:
+        return {'error': 'Stored channels have mismatched lengths'}, 500
+    original_points = lengths.pop()
+
+    streams = {row.channel: decode_channel(row.channel, row.data) for row in rows}
+    if max_points and original_points > max_points:
+        streams = downsample(streams, max_points)
+
+    requested = set(channels) if channels else set(streams)
+    return {
+        'activity_id': activity_id,
+        'original_points': original_points,
+        'points': len(next(iter(streams.values()))),
+        'streams': {
+            name: np.round(values, 7).tolist()
+            for name, values in streams.items() if name in requested
+        }
+    }, 200
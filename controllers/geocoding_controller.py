@@ -1,57 +1,532 @@
-from flask import current_app
+"""Address geocoding behind a two-tier cache.
+
+Lookups are keyed by the normalized address. Each worker keeps an LRU of
+recent answers in memory; behind it, geocoding_results rows are found by
+uq_geocoding_results_normalized_address. Only a miss in both reaches the
+provider (Google, or the offline fake; see GEOCODING_PROVIDER), and its
+answer is upserted into the table. Rows expire after
+GEOCODING_CACHE_TTL_DAYS and are deleted by ``flask geocoding purge-cache``.
+
+Every row carries its geocell (utils.geo), so nearest and radius queries
+read a few index ranges and refine those candidates with a vectorized
+haversine instead of scanning the table.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import Config
 from extensions import db
 from models.geocoding import GeocodingResult
-from flask import jsonify, request
-import requests
+from utils.geo import EARTH_RADIUS_M, bounding_box, cell_ranges, geocell, haversine_m
+from utils.geocoding_providers import (
+    GeocodingError, GeocodingRateLimited, address_key, get_provider, normalize_address
+)
+from utils.metrics import percentile
+from utils.rate_limit import RateLimiter
 
-def geocode_address(address):
-    """Get geocoding information for an address using Google Maps API"""
+TIERS = ('memory', 'database', 'provider')
+# Recent lookups per tier kept for the latency percentiles in stats()
+_LATENCY_SAMPLES = 1000
+_PURGE_BATCH = 5000
+_KEYS_PER_QUERY = 500
+_RATE_LIMIT_RETRIES = 3
+_MISSING = object()
+# First radius find_nearest tries; it grows eightfold until something is in range
+_NEAREST_START_M = 250
+_HALF_CIRCUMFERENCE_M = math.pi * EARTH_RADIUS_M
+# Columns a provider result fills, besides the address and cache bookkeeping
+_RESULT_COLUMNS = (
+    'formatted_address', 'latitude', 'longitude', 'place_id', 'types', 'address_components', 'plus_code', 'viewport'
+)
+
+
+def _insert():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert
+    if dialect == 'sqlite':
+        return sqlite.insert
+    raise RuntimeError(f'The geocoding cache does not support the {dialect} dialect')
+
+
+def _entry(row_id, values):
+    """What POST /geocode answers with, as cached in memory"""
+    return {
+        "id": row_id,
+        "formatted_address": values['formatted_address'],
+        "latitude": values['latitude'],
+        "longitude": values['longitude'],
+        "place_id": values['place_id']
+    }
+
+
+def parse_rate_limit(value):
+    """'50/1' -> (50, 1.0); empty -> None (the provider's default)"""
+    if not value:
+        return None
+    requests, _, period = value.partition('/')
     try:
-        api_key = current_app.config['GOOGLE_API_KEY']
-        url = f"https://maps.googleapis.com/maps/api/geocode/json?address={address}&key={api_key}"
-        
-        response = requests.get(url)
-        data = response.json()
-        
-        if data['status'] != 'OK':
-            return {"error": f"Geocoding API error: {data['status']}"}, 400
-            
-        # Extract the first result
-        result = data['results'][0]
-        
-        # Store in database
-        geo_result = GeocodingResult(
-            formatted_address=result['formatted_address'],
-            latitude=result['geometry']['location']['lat'],
-            longitude=result['geometry']['location']['lng'],
-            place_id=result['place_id'],
-            types=result.get('types'),
-            address_components=result.get('address_components'),
-            plus_code=result.get('plus_code'),
-            viewport=result['geometry'].get('viewport')
-        )
-        
-        db.session.add(geo_result)
+        return int(requests), float(period)
+    except ValueError:
+        raise ValueError(f'Invalid GEOCODING_RATE_LIMIT {value!r}; expected requests/seconds')
+
+
+class GeocodingCache:
+    """Per-process LRU in front of the geocoding_results table, in front of the provider.
+
+    Memory entries live for ``memory_ttl`` seconds but never past their
+    row's expires_at, so every worker stops serving a result once it has
+    expired in the table. Addresses the provider cannot resolve are
+    remembered in memory only, for ``negative_ttl`` seconds, so a client
+    retrying a typo does not spend API quota on every request. Provider
+    calls from single and batch lookups share one RateLimiter, sized by
+    ``rate_limit`` or else the provider's own default.
+    """
+
+    def __init__(self, provider, ttl_days=30, memory_ttl=3600, max_entries=10000, negative_ttl=300,
+                 rate_limit=None):
+        self.ttl = timedelta(days=ttl_days)
+        self.memory_ttl = memory_ttl
+        self.max_entries = max_entries
+        self.negative_ttl = negative_ttl
+        self.rate_limit = rate_limit
+        self.provider = provider
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._latencies = {tier: deque(maxlen=_LATENCY_SAMPLES) for tier in TIERS}
+        self.hits = {tier: 0 for tier in TIERS}
+        self.not_found = 0
+        self.provider_errors = 0
+        self.evictions = 0
+        self.purged = 0
+
+    @property
+    def provider(self):
+        return self._provider
+
+    @provider.setter
+    def provider(self, provider):
+        self._provider = provider
+        budget = self.rate_limit or getattr(provider, 'rate_limit', None)
+        self.limiter = RateLimiter(*budget) if budget else None
+
+    def _recall(self, key):
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is None:
+                return _MISSING
+            entry, expires_at = cached
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return entry
+
+    def _remember(self, key, entry, ttl):
+        with self._lock:
+            self._entries[key] = (entry, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _record(self, tier, started=None, count=1):
+        with self._lock:
+            self.hits[tier] += count
+            if started is not None:
+                self._latencies[tier].append((time.perf_counter() - started) * 1000)
+
+    def _remember_row(self, key, row, now):
+        entry = _entry(row.id, {column: getattr(row, column) for column in _RESULT_COLUMNS})
+        self._remember(key, entry, min(self.memory_ttl, (row.expires_at - now).total_seconds()))
+        return entry
+
+    def _call_provider(self, address):
+        """The provider's answer under the shared rate limit. Safe on worker threads: no database access."""
+        if self.provider is None:
+            raise GeocodingError('No geocoding provider is configured')
+        for attempt in range(_RATE_LIMIT_RETRIES + 1):
+            if self.limiter is not None:
+                self.limiter.acquire()
+            started = time.perf_counter()
+            try:
+                result = self.provider.geocode(address)
+            except GeocodingRateLimited as e:
+                if attempt < _RATE_LIMIT_RETRIES and self.limiter is not None:
+                    # Every caller backs off, not just this one
+                    self.limiter.pause(e.retry_after)
+                    continue
+                with self._lock:
+                    self.provider_errors += 1
+                raise
+            except GeocodingError:
+                with self._lock:
+                    self.provider_errors += 1
+                raise
+            self._record('provider', started)
+            if result is None:
+                with self._lock:
+                    self.not_found += 1
+            return result
+
+    def _store(self, answers, now):
+        """Upsert provider answers {key: (address, result)} in one transaction; returns {key: entry}.
+
+        An expired row for the same key is overwritten in place.
+        """
+        table = GeocodingResult.__table__
+        stmt = _insert()(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.normalized_address],
+            set_={
+                column: stmt.excluded[column]
+                for column in (*_RESULT_COLUMNS, 'address', 'geocell', 'created_at', 'expires_at')
+            }
+        ).returning(table.c.id, table.c.normalized_address)
+        values = {key: {column: result.get(column) for column in _RESULT_COLUMNS} for key, (_, result) in answers.items()}
+        rows = [
+            dict(values[key], address=address.strip()[:255], normalized_address=key, created_at=now,
+                 expires_at=now + self.ttl, geocell=geocell(values[key]['latitude'], values[key]['longitude']))
+            for key, (address, _) in answers.items()
+        ]
+        ids = {key: row_id for row_id, key in db.session.execute(stmt, rows)}
         db.session.commit()
-        
-        return {
-            "id": geo_result.id,
-            "formatted_address": geo_result.formatted_address,
-            "latitude": geo_result.latitude,
-            "longitude": geo_result.longitude,
-            "place_id": geo_result.place_id
-        }, 201
+
+        entries = {}
+        for key, row_id in ids.items():
+            entries[key] = _entry(row_id, values[key])
+            self._remember(key, entries[key], self.memory_ttl)
+        return entries
+
+    def lookup(self, address):
+        """(entry or None if the address does not resolve, tier that answered)
+
+        Raises GeocodingError when the provider fails; nothing is cached then.
+        """
+        started = time.perf_counter()
+        key = normalize_address(address)
+        entry = self._recall(key)
+        if entry is not _MISSING:
+            self._record('memory', started)
+            return entry, 'memory'
+
+        now = datetime.utcnow()
+        row = GeocodingResult.query.filter(
+            GeocodingResult.normalized_address == key,
+            GeocodingResult.expires_at > now
+        ).first()
+        if row is not None:
+            entry = self._remember_row(key, row, now)
+            self._record('database', started)
+            return entry, 'database'
+
+        result = self._call_provider(address)
+        if result is None:
+            self._remember(key, None, self.negative_ttl)
+            return None, 'provider'
+        return self._store({key: (address, result)}, now)[key], 'provider'
+
+    def lookup_many(self, addresses, workers=16):
+        """{normalized address: (entry or None, tier) or the GeocodingError it failed with}, for each distinct address.
+
+        Memory answers first and one indexed query per chunk finds live rows
+        for the rest. Whatever is left goes to the provider from up to
+        ``workers`` threads under the shared rate limit, so the wall-clock
+        time is about that of the slowest calls rather than their sum. All
+        new answers are then stored in one transaction.
+        """
+        pending = {}
+        for address in addresses:
+            pending.setdefault(normalize_address(address), address)
+        answers = {}
+        for key in list(pending):
+            entry = self._recall(key)
+            if entry is not _MISSING:
+                answers[key] = (entry, 'memory')
+                del pending[key]
+        if answers:
+            self._record('memory', count=len(answers))
+
+        now = datetime.utcnow()
+        keys = list(pending)
+        for offset in range(0, len(keys), _KEYS_PER_QUERY):
+            rows = GeocodingResult.query.filter(
+                GeocodingResult.normalized_address.in_(keys[offset:offset + _KEYS_PER_QUERY]),
+                GeocodingResult.expires_at > now
+            )
+            for row in rows:
+                answers[row.normalized_address] = (self._remember_row(row.normalized_address, row, now), 'database')
+                del pending[row.normalized_address]
+                self._record('database')
+        # Release the read transaction before the slow provider phase
+        db.session.commit()
+        if not pending:
+            return answers
+
+        found = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(pending))),
+                                thread_name_prefix='geocode') as executor:
+            futures = {executor.submit(self._call_provider, address): key for key, address in pending.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except GeocodingError as e:
+                    answers[key] = e
+                    continue
+                if result is None:
+                    self._remember(key, None, self.negative_ttl)
+                    answers[key] = (None, 'provider')
+                else:
+                    found[key] = (pending[key], result)
+        if found:
+            for key, entry in self._store(found, now).items():
+                answers[key] = (entry, 'provider')
+        return answers
+
+    def invalidate(self, normalized_address):
+        with self._lock:
+            self._entries.pop(normalized_address, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def purge(self, now=None):
+        """Drop expired memory entries and delete expired rows in id batches; returns rows deleted"""
+        monotonic = time.monotonic()
+        with self._lock:
+            for key in [key for key, (_, expires_at) in self._entries.items() if expires_at <= monotonic]:
+                del self._entries[key]
+
+        now = now or datetime.utcnow()
+        deleted = 0
+        while True:
+            # Short batches keep each DELETE's locks brief on a large table
+            ids = [row_id for (row_id,) in db.session.query(GeocodingResult.id).filter(
+                GeocodingResult.expires_at <= now
+            ).limit(_PURGE_BATCH)]
+            if not ids:
+                break
+            GeocodingResult.query.filter(GeocodingResult.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+        with self._lock:
+            self.purged += deleted
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            lookups = sum(self.hits.values())
+            cached = self.hits['memory'] + self.hits['database']
+            return {
+                'provider': getattr(self.provider, 'name', None),
+                'size': len(self._entries),
+                'max_size': self.max_entries,
+                'memory_ttl': self.memory_ttl,
+                'database_ttl_days': self.ttl.days,
+                'lookups': lookups,
+                'hits': dict(self.hits),
+                'hit_ratio': round(cached / lookups, 4) if lookups else None,
+                'not_found': self.not_found,
+                'provider_errors': self.provider_errors,
+                'evictions': self.evictions,
+                'purged': self.purged,
+                'rate_limit': self.limiter.stats() if self.limiter is not None else None,
+                'latency_ms': {
+                    tier: {
+                        'p50': round(percentile(samples, 50), 3),
+                        'p99': round(percentile(samples, 99), 3)
+                    } if samples else None
+                    for tier, samples in self._latencies.items()
+                }
+            }
+
+
+geocoding_cache = GeocodingCache(
+    get_provider(Config.GEOCODING_PROVIDER),
+    ttl_days=Config.GEOCODING_CACHE_TTL_DAYS,
+    memory_ttl=Config.GEOCODING_MEMORY_TTL_SECONDS,
+    max_entries=Config.GEOCODING_MEMORY_MAX_ENTRIES,
+    negative_ttl=Config.GEOCODING_NEGATIVE_TTL_SECONDS,
+    rate_limit=parse_rate_limit(Config.GEOCODING_RATE_LIMIT)
+)
+
+
+def geocode_address(address):
+    """Resolve an address, from the cache where possible; 201 when the provider had to be called"""
+    try:
+        entry, source = geocoding_cache.lookup(address)
+    except GeocodingError as e:
+        db.session.rollback()
+        return {"error": str(e)}, 502
     except Exception as e:
         db.session.rollback()
         return {"error": str(e)}, 500
 
+    if entry is None:
+        return {"error": "No geocoding result found for this address"}, 404
+    return dict(entry, source=source), 201 if source == 'provider' else 200
+
+
+def geocode_batch(addresses, workers=None):
+    """Resolve many addresses at once; duplicates (after normalization) are looked up once.
+
+    Returns counts plus one result per input, in request order: 'ok' (with
+    the tier that answered and the result), 'not_found', 'error' (the
+    provider failed; retry later) or 'rejected' (not a usable address).
+    """
+    results = [None] * len(addresses)
+    valid = {}
+    for index, address in enumerate(addresses):
+        try:
+            address_key(address)
+        except ValueError as e:
+            results[index] = {'index': index, 'status': 'rejected', 'error': str(e)}
+        else:
+            valid[index] = address
+
+    try:
+        answers = geocoding_cache.lookup_many(valid.values(), workers=workers or Config.GEOCODING_BATCH_WORKERS)
+    except Exception as e:
+        db.session.rollback()
+        return {"error": str(e)}, 500
+
+    for index, address in valid.items():
+        answer = answers[normalize_address(address)]
+        if isinstance(answer, GeocodingError):
+            results[index] = {'index': index, 'address': address, 'status': 'error', 'error': str(answer)}
+        elif answer[0] is None:
+            results[index] = {'index': index, 'address': address, 'status': 'not_found', 'source': answer[1]}
+        else:
+            results[index] = {'index': index, 'address': address, 'status': 'ok', 'source': answer[1],
+                              'result': answer[0]}
+
+    statuses = defaultdict(int)
+    sources = defaultdict(int)
+    for answer in answers.values():
+        if not isinstance(answer, GeocodingError):
+            sources[answer[1]] += 1
+    for result in results:
+        statuses[result['status']] += 1
+    return {
+        'total': len(addresses),
+        'unique': len(answers),
+        'ok': statuses['ok'],
+        'not_found': statuses['not_found'],
+        'errors': statuses['error'],
+        'rejected': statuses['rejected'],
+        'sources': {tier: sources[tier] for tier in TIERS},
+        'results': results
+    }, 200
+
+
+def _result_dict(result):
+    return {
+        "id": result.id,
+        "formatted_address": result.formatted_address,
+        "latitude": result.latitude,
+        "longitude": result.longitude,
+        "place_id": result.place_id,
+        "types": result.types,
+        "address_components": result.address_components,
+        "plus_code": result.plus_code,
+        "viewport": result.viewport
+    }
+
+
+def _candidates(latitude, longitude, radius_m):
+    """(ids, distances) of results within radius_m: pruned by geocell ranges, refined by haversine"""
+    ranges = cell_ranges(latitude, longitude, radius_m)
+    lat_min, lat_max, lng_min, lng_span = bounding_box(latitude, longitude, radius_m)
+    # The cells overshoot the circle; the box trims most of that before rows reach Python
+    conditions = [
+        or_(*(GeocodingResult.geocell.between(low, high) for low, high in ranges)),
+        GeocodingResult.latitude.between(lat_min, lat_max)
+    ]
+    lng_max = lng_min + lng_span
+    if lng_span < 360 and lng_min < -180:
+        conditions.append(or_(GeocodingResult.longitude >= lng_min + 360, GeocodingResult.longitude <= lng_max))
+    elif lng_span < 360 and lng_max > 180:
+        conditions.append(or_(GeocodingResult.longitude >= lng_min, GeocodingResult.longitude <= lng_max - 360))
+    elif lng_span < 360:
+        conditions.append(GeocodingResult.longitude.between(lng_min, lng_max))
+    rows = db.session.query(
+        GeocodingResult.id, GeocodingResult.latitude, GeocodingResult.longitude
+    ).filter(*conditions).all()
+    if not rows:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    ids, latitudes, longitudes = zip(*rows)
+    distances = haversine_m(latitude, longitude, latitudes, longitudes)
+    inside = distances <= radius_m
+    return np.asarray(ids, dtype=np.int64)[inside], distances[inside]
+
+
+def _with_distances(ids, distances):
+    """Full result dicts for ids, in the given order, with their distance_m"""
+    rows = {row.id: row for row in GeocodingResult.query.filter(GeocodingResult.id.in_(ids.tolist()))}
+    return [
+        dict(_result_dict(rows[row_id]), distance_m=round(float(distance), 1))
+        for row_id, distance in zip(ids.tolist(), distances) if row_id in rows
+    ]
+
+
+def _nearest(latitude, longitude, max_distance_m=None):
+    """(id, distance) of the closest result, or None if there is none within max_distance_m.
+
+    Searches a small radius first and widens it until a candidate turns up,
+    so a query in a dense area only ever reads the cells right around it.
+    """
+    limit = _HALF_CIRCUMFERENCE_M if max_distance_m is None else min(max_distance_m, _HALF_CIRCUMFERENCE_M)
+    radius = min(_NEAREST_START_M, limit)
+    while True:
+        ids, distances = _candidates(latitude, longitude, radius)
+        if ids.size:
+            best = int(np.argmin(distances))
+            return ids[best:best + 1], distances[best:best + 1]
+        if radius >= limit:
+            return None
+        radius = min(radius * 8, limit)
+
+
+def find_nearest(latitude, longitude, max_distance_m=None):
+    """The stored result closest to a point, with its distance_m; 404 when none is in range"""
+    nearest = _nearest(latitude, longitude, max_distance_m)
+    if nearest is None:
+        return {"message": "No geocoding result found near the given point."}, 404
+    return _with_distances(*nearest)[0], 200
+
+
+def find_within(latitude, longitude, radius_m, limit):
+    """Stored results within radius_m of a point, closest first"""
+    ids, distances = _candidates(latitude, longitude, radius_m)
+    order = np.argsort(distances, kind='stable')[:limit]
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "radius_m": radius_m,
+        "count": int(ids.size),
+        "results": _with_distances(ids[order], distances[order])
+    }, 200
+
+
 def get_geocoding_result(place_id=None, lat=None, lng=None, formatted_address=None):
     """Get geocoding result by place_id, coordinates, or formatted address"""
     try:
         if place_id:
             result = GeocodingResult.query.filter_by(place_id=place_id).first()
         elif lat is not None and lng is not None:
-            result = GeocodingResult.query.filter_by(latitude=lat, longitude=lng).first()
+            # Stored coordinates rarely equal the query's exactly; take the closest within a few metres
+            nearest = _nearest(lat, lng, Config.GEOCODING_MATCH_RADIUS_M)
+            result = db.session.get(GeocodingResult, int(nearest[0][0])) if nearest else None
         elif formatted_address:
             result = GeocodingResult.query.filter_by(formatted_address=formatted_address).first()
         else:
@@ -60,17 +535,7 @@ def get_geocoding_result(place_id=None, lat=None, lng=None, formatted_address=No
         if not result:
             return {"message": "No geocoding result found for the given input."}, 404
 
-        return {
-            "id": result.id,
-            "formatted_address": result.formatted_address,
-            "latitude": result.latitude,
-            "longitude": result.longitude,
-            "place_id": result.place_id,
-            "types": result.types,
-            "address_components": result.address_components,
-            "plus_code": result.plus_code,
-            "viewport": result.viewport
-        }, 200
+        return _result_dict(result), 200
     except Exception as e:
         return {"error": str(e)}, 500
 
@@ -82,8 +547,12 @@ def delete_geocoding_result(id):
         if not geocode_entry:
             return {"message": "Address not found"}, 404
         
+        normalized_address = geocode_entry.normalized_address
         db.session.delete(geocode_entry)
         db.session.commit()
+        # Other workers drop theirs within GEOCODING_MEMORY_TTL_SECONDS
+        if normalized_address:
+            geocoding_cache.invalidate(normalized_address)
         return {"message": f"Address with ID {id} successfully deleted"}, 200
     except Exception as e:
         db.session.rollback()
@@ -1,8 +1,138 @@
-from models.hydration import HydrationLog
+from models.hydration import HydrationLog, HydrationDailyRollup
 from extensions import db
-from datetime import datetime
-from flask import request, current_app
-import jwt
+from datetime import datetime, timedelta
+from collections import defaultdict
+from uuid import UUID
+from sqlalchemy import case, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+# Window a summary covers when no start_date is given
+DEFAULT_SUMMARY_DAYS = 30
+_IDS_PER_QUERY = 500
+
+
+def _insert():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert
+    if dialect == 'sqlite':
+        return sqlite.insert
+    raise RuntimeError(f'Hydration rollups do not support the {dialect} dialect')
+
+
+def _parse_timestamp(value):
+    """ISO 8601 string as a naive UTC datetime, which is how logs and their day buckets are stored"""
+    try:
+        timestamp = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise ValueError('timestamp must be an ISO 8601 datetime')
+    if timestamp.tzinfo is not None:
+        timestamp = (timestamp - timestamp.utcoffset()).replace(tzinfo=None)
+    return timestamp
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def apply_hydration_changes(user_sk, removed=(), added=()):
+    """Fold log writes into the user's daily rollups, in the caller's transaction.
+
+    ``removed`` and ``added`` are (timestamp, water_intake) pairs; an update
+    is the old pair removed plus the new one added. Totals and counts are
+    incremented inside the database, so concurrent writers never lose an
+    update. A removal can take away a day's first or last log, so those
+    days re-read their bounds from the logs while the upsert holds the
+    rollup row lock.
+    """
+    deltas = defaultdict(lambda: {'total_intake': 0, 'log_count': 0, 'first_logged_at': None, 'last_logged_at': None})
+    shrunk = set()
+    for sign, pairs in ((-1, removed), (1, added)):
+        for timestamp, water_intake in pairs:
+            delta = deltas[timestamp.date()]
+            delta['total_intake'] += sign * (water_intake or 0)
+            delta['log_count'] += sign
+            if sign < 0:
+                shrunk.add(timestamp.date())
+                continue
+            if delta['first_logged_at'] is None or timestamp < delta['first_logged_at']:
+                delta['first_logged_at'] = timestamp
+            if delta['last_logged_at'] is None or timestamp > delta['last_logged_at']:
+                delta['last_logged_at'] = timestamp
+    if not deltas:
+        return
+
+    now = datetime.utcnow()
+    table = HydrationDailyRollup.__table__
+    stmt = _insert()(table)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_sk, table.c.day],
+        set_={
+            'total_intake': table.c.total_intake + excluded.total_intake,
+            'log_count': table.c.log_count + excluded.log_count,
+            'first_logged_at': case(
+                (excluded.first_logged_at.is_(None), table.c.first_logged_at),
+                (table.c.first_logged_at.is_(None), excluded.first_logged_at),
+                (excluded.first_logged_at < table.c.first_logged_at, excluded.first_logged_at),
+                else_=table.c.first_logged_at
+            ),
+            'last_logged_at': case(
+                (excluded.last_logged_at.is_(None), table.c.last_logged_at),
+                (table.c.last_logged_at.is_(None), excluded.last_logged_at),
+                (excluded.last_logged_at > table.c.last_logged_at, excluded.last_logged_at),
+                else_=table.c.last_logged_at
+            ),
+            'updated_at': excluded.updated_at
+        }
+    )
+    db.session.execute(stmt, [
+        dict(delta, user_sk=user_sk, day=day, updated_at=now) for day, delta in sorted(deltas.items())
+    ])
+
+    for day in sorted(shrunk):
+        start, end = _day_bounds(day)
+        logs = db.session.query(
+            db.func.min(HydrationLog.timestamp), db.func.max(HydrationLog.timestamp)
+        ).filter(
+            HydrationLog.user_sk == user_sk,
+            HydrationLog.timestamp >= start,
+            HydrationLog.timestamp < end
+        ).one()
+        db.session.execute(
+            update(HydrationDailyRollup)
+            .where(HydrationDailyRollup.user_sk == user_sk, HydrationDailyRollup.day == day)
+            .values(first_logged_at=logs[0], last_logged_at=logs[1])
+        )
+
+
+def rebuild_hydration_rollups(user_sk=None):
+    """Recompute daily rollups from hydration_logs with one grouped INSERT .. SELECT; returns rows written"""
+    day = db.func.date(HydrationLog.timestamp)
+    source = db.select(
+        HydrationLog.user_sk,
+        day,
+        db.func.sum(HydrationLog.water_intake),
+        db.func.count(HydrationLog.id),
+        db.func.min(HydrationLog.timestamp),
+        db.func.max(HydrationLog.timestamp),
+        db.literal(datetime.utcnow())
+    ).where(HydrationLog.timestamp.isnot(None)).group_by(HydrationLog.user_sk, day)
+
+    delete = HydrationDailyRollup.query
+    if user_sk is not None:
+        source = source.where(HydrationLog.user_sk == user_sk)
+        delete = delete.filter(HydrationDailyRollup.user_sk == user_sk)
+    delete.delete(synchronize_session=False)
+
+    result = db.session.execute(insert(HydrationDailyRollup).from_select(
+        ['user_sk', 'day', 'total_intake', 'log_count', 'first_logged_at', 'last_logged_at', 'updated_at'],
+        source
+    ))
+    db.session.commit()
+    return result.rowcount
+
 
 def log_hydration(data):
     try:
@@ -11,14 +141,188 @@ def log_hydration(data):
             water_intake=data['quantity'],  # Changed to water_intake
             timestamp=datetime.utcnow()
         )
-        
+
         db.session.add(hydration_log)
+        apply_hydration_changes(data['user_sk'], added=[(hydration_log.timestamp, hydration_log.water_intake)])
         db.session.commit()
-        
+
         return {
             "message": "Hydration log added successfully",
             "data": hydration_log.to_dict()
         }, 201
     except Exception as e:
         db.session.rollback()
-        return {"error": str(e)}, 400
\ No newline at end of file
+        return {"error": str(e)}, 400
+
+
+def _clean_sync_entry(entry):
+    """Validate one offline log; returns (values, error)"""
+    if not isinstance(entry, dict):
+        return None, 'Expected an object'
+    try:
+        client_uuid = str(UUID(str(entry.get('client_uuid'))))
+    except ValueError:
+        return None, 'client_uuid must be a UUID'
+    quantity = entry.get('quantity')
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        return None, 'quantity must be a positive integer'
+    try:
+        timestamp = _parse_timestamp(entry.get('timestamp'))
+    except ValueError as e:
+        return None, str(e)
+    return {'client_uuid': client_uuid, 'water_intake': quantity, 'timestamp': timestamp}, None
+
+
+def sync_hydration_logs(user_sk, entries):
+    """Store a replay of offline {client_uuid, quantity, timestamp} logs in one transaction.
+
+    New logs go in with a single INSERT .. ON CONFLICT DO NOTHING against
+    uq_hydration_logs_user_client_uuid, so a uuid the server has already
+    stored (by an earlier, possibly half-acknowledged sync) is skipped by
+    the database rather than checked row by row. Returns counts plus one
+    result per entry, in request order: 'created' or 'duplicate' (both
+    with the server id) or 'rejected' (with error).
+    """
+    results = [None] * len(entries)
+    pending = {}
+    for index, entry in enumerate(entries):
+        values, error = _clean_sync_entry(entry)
+        if error:
+            results[index] = {'index': index, 'status': 'rejected', 'error': error}
+        elif values['client_uuid'] in pending:
+            results[index] = {'index': index, 'status': 'rejected', 'error': 'Duplicate client_uuid in batch'}
+        else:
+            pending[values['client_uuid']] = (index, values)
+
+    added = []
+    if pending:
+        table = HydrationLog.__table__
+        stmt = _insert()(table).on_conflict_do_nothing(
+            index_elements=[table.c.user_sk, table.c.client_uuid]
+        ).returning(table.c.id, table.c.client_uuid)
+        rows = [dict(values, user_sk=user_sk) for _, values in pending.values()]
+        for log_id, client_uuid in db.session.execute(stmt, rows):
+            index, values = pending.pop(client_uuid)
+            results[index] = {'index': index, 'client_uuid': client_uuid, 'status': 'created', 'id': log_id}
+            added.append((values['timestamp'], values['water_intake']))
+        apply_hydration_changes(user_sk, added=added)
+
+    uuids = list(pending)
+    for offset in range(0, len(uuids), _IDS_PER_QUERY):
+        # Whatever the INSERT skipped was stored before
+        stored = db.session.query(HydrationLog.id, HydrationLog.client_uuid).filter(
+            HydrationLog.user_sk == user_sk,
+            HydrationLog.client_uuid.in_(uuids[offset:offset + _IDS_PER_QUERY])
+        )
+        for log_id, client_uuid in stored:
+            index, _ = pending.pop(client_uuid)
+            results[index] = {'index': index, 'client_uuid': client_uuid, 'status': 'duplicate', 'id': log_id}
+    for index, values in pending.values():
+        results[index] = {'index': index, 'client_uuid': values['client_uuid'], 'status': 'rejected',
+                          'error': 'Could not be stored; retry'}
+    db.session.commit()
+
+    counts = defaultdict(int)
+    for result in results:
+        counts[result['status']] += 1
+    return {
+        'total': len(entries),
+        'created': counts['created'],
+        'duplicates': counts['duplicate'],
+        'rejected': counts['rejected'],
+        'results': results
+    }, 200
+
+
+def get_hydration_logs(user_sk, day=None):
+    """The user's logs for one UTC day (default: today), oldest first"""
+    day = day or datetime.utcnow().date()
+    start, end = _day_bounds(day)
+    logs = HydrationLog.query.filter(
+        HydrationLog.user_sk == user_sk,
+        HydrationLog.timestamp >= start,
+        HydrationLog.timestamp < end
+    ).order_by(HydrationLog.timestamp, HydrationLog.id).all()
+    return {
+        "date": day.isoformat(),
+        "data": [log.to_dict() for log in logs]
+    }, 200
+
+
+def update_hydration_log(data):
+    hydration_log = HydrationLog.query.filter_by(id=data['log_id'], user_sk=data['user_sk']).first()
+    if not hydration_log:
+        return {"error": "Hydration log not found"}, 404
+
+    timestamp = None
+    if data.get('timestamp'):
+        try:
+            timestamp = _parse_timestamp(data['timestamp'])
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
+    try:
+        before = (hydration_log.timestamp, hydration_log.water_intake)
+        if 'quantity' in data:
+            hydration_log.water_intake = data['quantity']
+        if timestamp:
+            hydration_log.timestamp = timestamp
+
+        after = (hydration_log.timestamp, hydration_log.water_intake)
+        if after != before:
+            # Flush first so a moved day re-reads its bounds without this log
+            db.session.flush()
+            apply_hydration_changes(data['user_sk'], removed=[before], added=[after])
+        db.session.commit()
+
+        return {
+            "message": "Hydration log updated successfully",
+            "data": hydration_log.to_dict()
+        }, 200
+    except Exception as e:
+        db.session.rollback()
+        return {"error": str(e)}, 400
+
+
+def delete_hydration_log(user_sk, log_id):
+    hydration_log = HydrationLog.query.filter_by(id=log_id, user_sk=user_sk).first()
+    if not hydration_log:
+        return {"error": "Hydration log not found"}, 404
+
+    try:
+        removed = (hydration_log.timestamp, hydration_log.water_intake)
+        db.session.delete(hydration_log)
+        db.session.flush()
+        apply_hydration_changes(user_sk, removed=[removed])
+        db.session.commit()
+        return {}, 204
+    except Exception as e:
+        db.session.rollback()
+        return {"error": str(e)}, 400
+
+
+def get_hydration_summary(user_sk, start_date=None, end_date=None):
+    """Daily totals for start_date..end_date (default: the last 30 days), read from the rollup table only"""
+    end_date = end_date or datetime.utcnow().date()
+    start_date = start_date or end_date - timedelta(days=DEFAULT_SUMMARY_DAYS - 1)
+    if start_date > end_date:
+        return {"error": "start_date must not be after end_date"}, 400
+
+    days = HydrationDailyRollup.query.filter(
+        HydrationDailyRollup.user_sk == user_sk,
+        HydrationDailyRollup.day >= start_date,
+        HydrationDailyRollup.day <= end_date,
+        HydrationDailyRollup.log_count > 0
+    ).order_by(HydrationDailyRollup.day).all()
+
+    total_intake = sum(day.total_intake for day in days)
+    span = (end_date - start_date).days + 1
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "total_intake": total_intake,
+        "log_count": sum(day.log_count for day in days),
+        "days_logged": len(days),
+        "average_daily_intake": round(total_intake / span, 1),
+        "days": [day.to_dict() for day in days]
+    }, 200
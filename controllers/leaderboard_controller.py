@@ -0,0 +1,298 @@
+"""Spark-point leaderboards served from per-process sorted score tables.
+
+Each worker keeps a RankedScores table for the global board (seeded from
+spark_balances), the current week's board (ledger entries since Monday
+00:00 UTC) and one per partner (a subset of the global scores). Instead of
+re-aggregating, requests fold in the ledger rows awarded since the last
+poll, found by id above a high-water mark, at most every
+LEADERBOARD_REFRESH_SECONDS. Everything is rebuilt from the database every
+LEADERBOARD_REBUILD_SECONDS and when the week rolls over, on a background
+thread: requests keep using the current boards until the new ones are
+swapped in, and only the first use of a worker waits for a build.
+
+Ledger ids are not always committed in order, so ids skipped by a poll are
+retried for a while before being given up as rolled back.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import literal, or_, select, union_all
+
+from config import Config
+from extensions import db
+from models.spark_points import SparkBalance, SparkLedger
+from models.user import User
+from utils.ranked_scores import RankedScores
+
+BOARDS = ('global', 'weekly', 'partner')
+_POLL_ROWS = 10000
+# How long a skipped ledger id is retried, and how many are remembered
+_GAP_SECONDS = 60
+_MAX_GAPS = 1000
+# Wait before retrying a background rebuild that failed
+_RETRY_SECONDS = 30
+
+
+def week_start(now):
+    """Monday 00:00 (UTC) of the week ``now`` falls in"""
+    return datetime(now.year, now.month, now.day) - timedelta(days=now.weekday())
+
+
+class Leaderboards:
+    def __init__(self, refresh_seconds=1.0, rebuild_seconds=3600):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._lock = threading.Lock()
+        # Serialises the blocking first build, so concurrent requests share one
+        self._first_build_lock = threading.Lock()
+        self._global = None
+        self._weekly = None
+        self._week_start = None
+        self._partners = {}
+        self._partner_of = {}
+        self._high_water = 0
+        self._gaps = {}
+        self._built_at = None
+        self._polled_at = 0.0
+        self._rebuilding = False
+        self._retry_at = 0.0
+        self.builds = 0
+        self.build_errors = 0
+        self.polls = 0
+        self.applied = 0
+
+    @staticmethod
+    def _weekly_scores(start, high_water, gaps):
+        totals = db.session.query(SparkLedger.user_sk, db.func.sum(SparkLedger.points)).filter(
+            SparkLedger.timestamp >= start,
+            SparkLedger.id <= high_water
+        )
+        if gaps:
+            # Still pending; the next poll applies them if they commit
+            totals = totals.filter(SparkLedger.id.notin_(list(gaps)))
+        return RankedScores((user_sk, int(points)) for user_sk, points in totals.group_by(SparkLedger.user_sk))
+
+    @classmethod
+    def _load(cls, now, gaps):
+        """Read a complete set of boards from the database; returns them without touching shared state.
+
+        Balances, the high-water mark and the ledger ids near it come from one
+        statement, so they describe the same snapshot of the ledger. Ids below
+        the mark missing from that snapshot may belong to transactions still
+        in flight, so they become gaps, as in the incremental poll; known gaps
+        that committed meanwhile are already in the balances and are dropped.
+        """
+        mark = select(db.func.coalesce(db.func.max(SparkLedger.id), 0)).scalar_subquery()
+        recent = SparkLedger.id > mark - _MAX_GAPS
+        if gaps:
+            recent = or_(recent, SparkLedger.id.in_(list(gaps)))
+        rows = db.session.execute(union_all(
+            select(literal('mark'), mark, literal(0)),
+            select(literal('balance'), SparkBalance.user_sk, SparkBalance.total),
+            select(literal('entry'), SparkLedger.id, literal(0)).where(recent)
+        ))
+        high_water, balances, present = 0, [], set()
+        for kind, key, value in rows:
+            if kind == 'mark':
+                high_water = key
+            elif kind == 'balance':
+                balances.append((key, value))
+            else:
+                present.add(key)
+
+        until = time.monotonic() + _GAP_SECONDS
+        pending = {entry_id: expiry for entry_id, expiry in gaps.items() if entry_id not in present}
+        for missing in range(max(1, high_water - _MAX_GAPS + 1), high_water + 1):
+            if missing not in present:
+                pending.setdefault(missing, until)
+
+        scores = RankedScores(balances)
+        partner_of = dict(db.session.query(User.user_sk, User.partner).filter(User.partner.isnot(None)))
+        members = {}
+        for user_sk, partner in partner_of.items():
+            members.setdefault(partner, []).append(user_sk)
+        start = week_start(now)
+        return {
+            '_global': scores,
+            '_week_start': start,
+            '_weekly': cls._weekly_scores(start, high_water, pending),
+            '_partner_of': partner_of,
+            '_partners': {
+                partner: RankedScores((user_sk, scores.score(user_sk) or 0) for user_sk in user_sks)
+                for partner, user_sks in members.items()
+            },
+            '_high_water': high_water,
+            '_gaps': pending
+        }
+
+    def _install(self, boards):
+        """Swap freshly loaded boards in; called with the lock held"""
+        for name, value in boards.items():
+            setattr(self, name, value)
+        self._built_at = time.monotonic()
+        self.builds += 1
+
+    def _ensure_built(self):
+        """Block only for the very first build (or after invalidate); later rebuilds run in the background"""
+        if self._global is not None:
+            return
+        with self._first_build_lock:
+            if self._global is None:
+                with self._lock:
+                    gaps = dict(self._gaps)
+                boards = self._load(datetime.utcnow(), gaps)
+                with self._lock:
+                    self._install(boards)
+
+    def _rebuild_in_background(self):
+        """Start a rebuild unless one is running; called with the lock held"""
+        if self._rebuilding:
+            return
+        self._rebuilding = True
+        threading.Thread(
+            target=self._background_rebuild,
+            args=(current_app._get_current_object(), dict(self._gaps)),
+            name='leaderboard-rebuild',
+            daemon=True
+        ).start()
+
+    def _background_rebuild(self, app, gaps):
+        try:
+            with app.app_context():
+                boards = self._load(datetime.utcnow(), gaps)
+            with self._lock:
+                self._install(boards)
+        except Exception:
+            # Keep serving (and polling into) the current boards and try again later
+            with self._lock:
+                self._retry_at = time.monotonic() + _RETRY_SECONDS
+                self.build_errors += 1
+        finally:
+            self._rebuilding = False
+
+    def _apply(self, user_sk, points, timestamp):
+        self._global.add(user_sk, points)
+        if timestamp is not None and timestamp >= self._week_start:
+            self._weekly.add(user_sk, points)
+        partner = self._partner_of.get(user_sk)
+        if partner is not None:
+            self._partners[partner].add(user_sk, points)
+        self.applied += 1
+
+    def _poll(self):
+        now = time.monotonic()
+        self._gaps = {entry_id: until for entry_id, until in self._gaps.items() if until > now}
+        while True:
+            condition = SparkLedger.id > self._high_water
+            if self._gaps:
+                condition = or_(condition, SparkLedger.id.in_(list(self._gaps)))
+            rows = db.session.query(
+                SparkLedger.id, SparkLedger.user_sk, SparkLedger.points, SparkLedger.timestamp
+            ).filter(condition).order_by(SparkLedger.id).limit(_POLL_ROWS).all()
+
+            expected = self._high_water + 1
+            for entry_id, user_sk, points, timestamp in rows:
+                if entry_id <= self._high_water:
+                    self._gaps.pop(entry_id, None)
+                else:
+                    # Ids skipped here may still be uncommitted
+                    for missing in range(expected, entry_id):
+                        self._gaps[missing] = now + _GAP_SECONDS
+                    expected = entry_id + 1
+                    self._high_water = entry_id
+                self._apply(user_sk, points, timestamp)
+            if len(self._gaps) > _MAX_GAPS:
+                for entry_id in sorted(self._gaps)[:len(self._gaps) - _MAX_GAPS]:
+                    del self._gaps[entry_id]
+            if len(rows) < _POLL_ROWS:
+                break
+        self._polled_at = now
+        self.polls += 1
+
+    def _refresh(self):
+        # The current boards keep serving (and taking new awards) until the
+        # rebuild swaps its result in; a new week gets one the same way
+        now = time.monotonic()
+        stale = now - self._built_at >= self.rebuild_seconds
+        if now >= self._retry_at and (stale or week_start(datetime.utcnow()) != self._week_start):
+            self._rebuild_in_background()
+        if time.monotonic() - self._polled_at >= self.refresh_seconds:
+            self._poll()
+
+    def _board(self, board, partner):
+        if board == 'global':
+            return self._global
+        if board == 'weekly':
+            return self._weekly
+        return self._partners.get(partner) or RankedScores()
+
+    def top(self, board, limit, offset=0, partner=None):
+        """([(rank, user_sk, points)], number of ranked users)"""
+        self._ensure_built()
+        with self._lock:
+            self._refresh()
+            scores = self._board(board, partner)
+            return scores.top(limit, offset), len(scores)
+
+    def around(self, board, user_sk, neighbours, partner=None):
+        """(rank or None, points, [(rank, user_sk, points)] around the user, number of ranked users)"""
+        self._ensure_built()
+        with self._lock:
+            self._refresh()
+            scores = self._board(board, partner)
+            return scores.rank(user_sk), scores.score(user_sk), scores.around(user_sk, neighbours), len(scores)
+
+    def invalidate(self):
+        with self._lock:
+            self._global = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'global_users': len(self._global) if self._global is not None else 0,
+                'weekly_users': len(self._weekly) if self._weekly is not None else 0,
+                'partners': len(self._partners),
+                'high_water': self._high_water,
+                'pending_gaps': len(self._gaps),
+                'builds': self.builds,
+                'build_errors': self.build_errors,
+                'rebuilding': self._rebuilding,
+                'polls': self.polls,
+                'applied': self.applied
+            }
+
+
+leaderboards = Leaderboards(
+    refresh_seconds=Config.LEADERBOARD_REFRESH_SECONDS,
+    rebuild_seconds=Config.LEADERBOARD_REBUILD_SECONDS
+)
+
+
+def _entries(ranked):
+    """Ranked (rank, user_sk, points) tuples as dicts with usernames, in one query"""
+    names = dict(
+        db.session.query(User.user_sk, User.username).filter(User.user_sk.in_([user_sk for _, user_sk, _ in ranked]))
+    ) if ranked else {}
+    return [
+        {'rank': rank, 'user_sk': user_sk, 'username': names.get(user_sk), 'points': points}
+        for rank, user_sk, points in ranked
+    ]
+
+
+def get_leaderboard(board, limit, offset=0, partner=None):
+    ranked, total = leaderboards.top(board, limit, offset, partner=partner)
+    return {'board': board, 'total_ranked': total, 'entries': _entries(ranked)}
+
+
+def get_leaderboard_position(board, user_sk, neighbours, partner=None):
+    rank, points, around, total = leaderboards.around(board, user_sk, neighbours, partner=partner)
+    return {
+        'board': board,
+        'user_sk': user_sk,
+        'rank': rank,
+        'points': points or 0,
+        'total_ranked': total,
+        'neighbours': _entries(around)
+    }
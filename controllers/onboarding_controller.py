@@ -0,0 +1,208 @@
+import csv
+import json
+from datetime import datetime
+
+from sqlalchemy import insert, select, union_all
+
+from extensions import db
+from models.user import User, UserInfo
+from utils.password_hashing import hash_passwords
+from utils.validators import validate_email
+
+ROSTER_FIELDS = {
+    'username', 'email', 'first_name', 'last_name', 'mobile_no', 'password', 'gender',
+    'date_of_birth', 'height', 'weight', 'experience_level', 'distance_goal', 'preferences', 'partner'
+}
+NUMERIC_FIELDS = ('height', 'weight', 'distance_goal')
+
+
+def parse_roster(stream, fmt):
+    """Yield (line_number, record) pairs from a CSV or NDJSON text stream"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        # Header is line 1, so the first record is line 2
+        for line_number, row in enumerate(reader, start=2):
+            yield line_number, row
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                record = {'_parse_error': f'Invalid JSON: {e}'}
+            if not isinstance(record, dict):
+                record = {'_parse_error': 'Expected a JSON object'}
+            yield line_number, record
+    else:
+        raise ValueError(f"Unsupported roster format '{fmt}'. Use csv or ndjson")
+
+
+def _clean(record):
+    """Normalise one roster record; returns (values, error)"""
+    if '_parse_error' in record:
+        return None, record['_parse_error']
+
+    values = {k: (v.strip() if isinstance(v, str) else v) for k, v in record.items() if k in ROSTER_FIELDS}
+    # Accept the /users/profile spelling as well
+    if not values.get('email') and record.get('email_id'):
+        values['email'] = record['email_id'].strip()
+    values = {k: v for k, v in values.items() if v not in ('', None)}
+
+    if not values.get('username'):
+        return None, 'username is required'
+    if not validate_email(values.get('email')):
+        return None, 'A valid email is required'
+
+    for field in NUMERIC_FIELDS:
+        if field in values:
+            try:
+                values[field] = float(values[field])
+            except (TypeError, ValueError):
+                return None, f'{field} must be numeric'
+
+    if 'date_of_birth' in values:
+        try:
+            values['date_of_birth'] = datetime.strptime(str(values['date_of_birth']), '%Y-%m-%d').date()
+        except ValueError:
+            return None, 'date_of_birth must be YYYY-MM-DD'
+
+    return values, None
+
+
+def _existing_identities(usernames, emails):
+    """One round trip for every username/email already taken in users or user_info"""
+    taken = union_all(
+        select(User.username, User.email).where(
+            db.or_(User.username.in_(usernames), User.email.in_(emails))
+        ),
+        select(UserInfo.username, UserInfo.email_id).where(
+            db.or_(UserInfo.username.in_(usernames), UserInfo.email_id.in_(emails))
+        )
+    )
+    taken_usernames, taken_emails = set(), set()
+    for username, email in db.session.execute(taken):
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+def _onboard_batch(batch, report, set_passwords):
+    usernames = [values['username'] for _, values in batch]
+    emails = [values['email'] for _, values in batch]
+    taken_usernames, taken_emails = _existing_identities(usernames, emails)
+
+    accepted = []
+    for line_number, values in batch:
+        if values['username'] in taken_usernames:
+            report.append({'line': line_number, 'status': 'rejected', 'error': 'Username already exists'})
+        elif values['email'] in taken_emails:
+            report.append({'line': line_number, 'status': 'rejected', 'error': 'Email already exists'})
+        else:
+            accepted.append((line_number, values))
+    if not accepted:
+        return 0
+
+    if set_passwords:
+        with_password = [values for _, values in accepted if values.get('password')]
+        for values, password_hash in zip(with_password, hash_passwords([v['password'] for v in with_password])):
+            values['password_hash'] = password_hash
+
+    now = datetime.utcnow()
+    try:
+        user_rows = db.session.execute(
+            insert(User).returning(User.user_sk, User.username),
+            [{
+                'username': values['username'],
+                'email': values['email'],
+                'first_name': values.get('first_name'),
+                'last_name': values.get('last_name'),
+                'mobile_no': values.get('mobile_no'),
+                'password_hash': values.get('password_hash'),
+                'partner': values.get('partner'),
+                'created_at': now,
+                'updated_at': now
+            } for _, values in accepted]
+        ).all()
+        # RETURNING order is not guaranteed for multi-row inserts, so match on username
+        user_sks = {username: user_sk for user_sk, username in user_rows}
+
+        db.session.execute(insert(UserInfo), [{
+            'user_sk': user_sks[values['username']],
+            'username': values['username'],
+            'email_id': values['email'],
+            'gender': values.get('gender'),
+            'date_of_birth': values.get('date_of_birth'),
+            'height': values.get('height'),
+            'weight': values.get('weight'),
+            'experience_level': values.get('experience_level'),
+            'distance_goal': values.get('distance_goal'),
+            'preferences': values.get('preferences'),
+            'mobile_no': values.get('mobile_no')
+        } for _, values in accepted])
+        db.session.commit()
+    except Exception as e:
+        # Typically a row that raced in between the collision check and the insert
+        db.session.rollback()
+        for line_number, _ in accepted:
+            report.append({'line': line_number, 'status': 'failed', 'error': str(e.__cause__ or e)})
+        return 0
+
+    for line_number, values in accepted:
+        report.append({
+            'line': line_number,
+            'status': 'created',
+            'user_sk': user_sks[values['username']],
+            'username': values['username'],
+            'password_set': 'password_hash' in values
+        })
+    return len(accepted)
+
+
+def onboard_users(records, batch_size=1000, set_passwords=True, partner=None):
+    """Create User + UserInfo rows for a roster of (line_number, record) pairs.
+
+    Each batch costs one collision query and one multi-row INSERT per table,
+    and is committed on its own. Without ``set_passwords`` roster passwords
+    are ignored and users are created with no usable password, to be set
+    through the password reset flow; hashing a whole roster is a job for
+    the CLI, not a web worker. ``partner`` overrides every record's partner.
+    Returns a summary plus a per-row report ordered by roster line.
+    """
+    report = []
+    seen_usernames, seen_emails = set(), set()
+    batch = []
+    created = 0
+
+    for line_number, record in records:
+        values, error = _clean(record)
+        if error:
+            report.append({'line': line_number, 'status': 'rejected', 'error': error})
+            continue
+        if partner is not None:
+            values['partner'] = partner
+        if values['username'] in seen_usernames:
+            report.append({'line': line_number, 'status': 'rejected', 'error': 'Duplicate username in roster'})
+            continue
+        if values['email'] in seen_emails:
+            report.append({'line': line_number, 'status': 'rejected', 'error': 'Duplicate email in roster'})
+            continue
+        seen_usernames.add(values['username'])
+        seen_emails.add(values['email'])
+
+        batch.append((line_number, values))
+        if len(batch) >= batch_size:
+            created += _onboard_batch(batch, report, set_passwords)
+            batch = []
+
+    if batch:
+        created += _onboard_batch(batch, report, set_passwords)
+
+    report.sort(key=lambda row: row['line'])
+    return {
+        'total': len(report),
+        'created': created,
+        'rejected': len(report) - created,
+        'results': report
+    }
@@ -0,0 +1,184 @@
+"""User and supplement photos, stored as content-addressed blobs.
+
+Rows keep only the blob's SHA-256, size and MIME type; the bytes live in
+``utils.blob_store``, written once however many rows share them. Rows
+created before the blob store still carry ``photo_data`` until
+``migrate_photo_blobs`` moves them out. Deleting a row leaves its blob in
+place (another row may share it); ``collect_unreferenced_blobs`` removes
+blobs no row points at any more.
+"""
+import io
+import time
+
+from flask import current_app
+from sqlalchemy import bindparam
+from werkzeug.utils import secure_filename
+
+from config import Config
+from extensions import db
+from models.supplements import SupplementPhoto
+from models.user import Photo
+from utils.blob_store import BlobNotFound, blob_store
+from utils.file_handlers import allowed_file, get_mime_type
+
+BLOB_MODELS = (Photo, SupplementPhoto)
+# Digests checked against the photo tables per query when collecting garbage
+_DIGESTS_PER_QUERY = 500
+
+
+def _uses_fallback_store():
+    """True while blobs would go to the local backend's development directory, lost on every redeploy"""
+    return (Config.BLOB_STORE or '').lower() == 'local' and not Config.BLOB_STORE_PATH
+
+
+def save_photo(user_sk, upload):
+    """Store an uploaded image (a werkzeug FileStorage) for a user; the bytes are streamed to the blob store"""
+    if _uses_fallback_store() and not current_app.debug:
+        return {"error": "Photo storage is not configured (BLOB_STORE_PATH is unset)"}, 503
+    filename = secure_filename(upload.filename or '')
+    if not filename or not allowed_file(filename):
+        return {"error": f"Allowed file types: {', '.join(sorted(Config.ALLOWED_EXTENSIONS))}"}, 400
+    # Checked before anything is written, so a rejected upload leaves no blob
+    if not upload.stream.read(1):
+        return {"error": "Uploaded file is empty"}, 400
+    upload.stream.seek(0)
+
+    try:
+        digest, size = blob_store.put(upload.stream)
+        photo = Photo(
+            user_sk=user_sk,
+            filename=filename,
+            blob_sha256=digest,
+            size_bytes=size,
+            mime_type=get_mime_type(filename)
+        )
+        db.session.add(photo)
+        db.session.commit()
+        return photo.to_dict(), 201
+    except Exception as e:
+        db.session.rollback()
+        return {"error": str(e)}, 500
+
+
+def get_photos(user_sk):
+    photos = Photo.query.filter_by(user_sk=user_sk).order_by(Photo.pid).all()
+    return {"photos": [photo.to_dict() for photo in photos]}, 200
+
+
+def get_photo(user_sk, pid):
+    return Photo.query.filter_by(pid=pid, user_sk=user_sk).first()
+
+
+def open_photo(photo):
+    """A binary file object with the photo's bytes, from the blob store or a not-yet-migrated row"""
+    if photo.blob_sha256:
+        return blob_store.open(photo.blob_sha256)
+    if photo.photo_data is None:
+        raise BlobNotFound(photo.pid)
+    return io.BytesIO(photo.photo_data)
+
+
+def delete_photo(user_sk, pid):
+    photo = get_photo(user_sk, pid)
+    if photo is None:
+        return {"error": "Photo not found"}, 404
+    db.session.delete(photo)
+    db.session.commit()
+    return {"message": "Photo deleted successfully"}, 200
+
+
+def migrate_photo_blobs(batch_size=None, limit=None, progress=None):
+    """Move photo_data out of the photo tables into the blob store; returns {table: rows moved}.
+
+    Each batch picks up to ``batch_size`` unmigrated rows by primary key,
+    writes their bytes to the blob store one row at a time (so memory holds
+    one image, not a batch), then points the rows at their blobs and
+    clears photo_data in one transaction. Blobs are durable before the row
+    changes, so an interrupted run loses nothing and simply resumes; at
+    worst it leaves blobs for collect_unreferenced_blobs.
+
+    photo_data is the only other copy, so this refuses to run against the
+    local backend's development fallback directory: in a container that
+    directory is discarded on every redeploy.
+    """
+    if _uses_fallback_store():
+        raise RuntimeError(
+            'BLOB_STORE_PATH is not set. Point it at persistent storage shared by every worker '
+            '(e.g. a mounted volume) before moving photos out of the database.'
+        )
+    batch_size = batch_size or Config.BLOB_MIGRATION_BATCH_SIZE
+    moved = {}
+    for model in BLOB_MODELS:
+        table = model.__table__
+        key = model.__mapper__.primary_key[0]
+        moved[table.name] = 0
+        update = table.update().where(key == bindparam('row_id')).values(
+            blob_sha256=bindparam('digest'),
+            size_bytes=bindparam('size'),
+            mime_type=bindparam('mime'),
+            photo_data=None
+        )
+        last = None
+        while limit is None or moved[table.name] < limit:
+            query = db.select(key, table.c.filename).where(
+                table.c.blob_sha256.is_(None),
+                table.c.photo_data.isnot(None)
+            )
+            if last is not None:
+                query = query.where(key > last)
+            take = batch_size if limit is None else min(batch_size, limit - moved[table.name])
+            rows = db.session.execute(query.order_by(key).limit(take)).all()
+            if not rows:
+                break
+
+            params = []
+            for row_id, filename in rows:
+                data = db.session.execute(db.select(table.c.photo_data).where(key == row_id)).scalar_one()
+                digest, size = blob_store.put(data)
+                params.append({'row_id': row_id, 'digest': digest, 'size': size, 'mime': get_mime_type(filename)})
+            db.session.execute(update, params)
+            db.session.commit()
+
+            last = rows[-1][0]
+            moved[table.name] += len(rows)
+            if progress:
+                progress(table.name, moved[table.name])
+    return moved
+
+
+def collect_unreferenced_blobs(grace_seconds=86400, dry_run=False):
+    """Delete blobs older than ``grace_seconds`` that no photo row references.
+
+    The grace period covers uploads and migrations that have written a
+    blob but not yet committed the row pointing at it. Each blob is
+    re-checked just before it is unlinked: a re-upload of the same bytes
+    after the reference query touches the blob, and it is then kept.
+    """
+    cutoff = time.time() - grace_seconds
+    scanned = unreferenced = deleted = 0
+    candidates = []
+
+    def sweep(digests):
+        referenced = set()
+        for model in BLOB_MODELS:
+            referenced.update(db.session.execute(
+                db.select(model.blob_sha256).where(model.blob_sha256.in_(digests)).distinct()
+            ).scalars())
+        db.session.commit()
+        orphans = [digest for digest in digests if digest not in referenced]
+        if dry_run:
+            return len(orphans), 0
+        return len(orphans), sum(blob_store.delete(digest, older_than=cutoff) for digest in orphans)
+
+    for digest, modified in blob_store.iter_blobs():
+        scanned += 1
+        if modified < cutoff:
+            candidates.append(digest)
+        if len(candidates) == _DIGESTS_PER_QUERY:
+            found, removed = sweep(candidates)
+            unreferenced, deleted = unreferenced + found, deleted + removed
+            candidates = []
+    if candidates:
+        found, removed = sweep(candidates)
+        unreferenced, deleted = unreferenced + found, deleted + removed
+    return {'scanned': scanned, 'unreferenced': unreferenced, 'deleted': deleted}
@@ -0,0 +1,297 @@
+"""Incremental activity sync from third-party platforms, driven by UserToken rows.
+
+Worker threads only talk to the platforms: each takes a snapshot of one
+token, refreshes it when it is about to expire and pages through the
+activities that started after the token's high-water mark, under a rate
+limiter shared by every worker calling the same platform. The calling
+thread owns the database session: it commits a refreshed token as soon as
+its worker returns (the platform may already have revoked the old one),
+then upserts the fetched activities in batches, together with the new
+high-water marks, while the workers keep fetching.
+
+The mark is the newest start_date seen, but an activity recorded offline
+can be uploaded days after newer ones. Every run therefore starts
+SYNC_CURSOR_OVERLAP before the mark; the upsert makes the refetch harmless.
+"""
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+from sqlalchemy import tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from config import Config
+from extensions import db
+from models.activity import Activity
+from models.user import UserToken
+from utils.activity_providers import get_provider, ProviderError, ProviderAuthError, ProviderRateLimited
+from utils.rate_limit import RateLimiter
+from controllers.activity_rollup_controller import METRICS, activity_snapshot, apply_rollup_changes_many
+from controllers.training_load_controller import mark_training_load_dirty_many
+from controllers.activity_dedup_controller import fingerprint, flag_new_rows
+
+# Activity columns a sync may write
+SYNC_FIELDS = (
+    'name', 'distance', 'moving_time', 'elapsed_time', 'total_elevation_gain',
+    'type', 'start_date', 'description', 'calories'
+)
+# Where a token without a high-water mark starts
+SYNC_EPOCH = datetime(1970, 1, 1)
+MAX_RATE_LIMIT_RETRIES = 3
+_IDS_PER_QUERY = 500
+
+
+def parse_rate_limits(value):
+    """'strava=200/900,garmin=100/60' -> {'strava': (200, 900.0), 'garmin': (100, 60.0)}"""
+    limits = {}
+    for part in (item.strip() for item in (value or '').split(',')):
+        if not part:
+            continue
+        platform, _, budget = part.partition('=')
+        requests, _, period = budget.partition('/')
+        try:
+            limits[platform.strip().lower()] = (int(requests), float(period))
+        except ValueError:
+            raise ValueError(f'Invalid SYNC_RATE_LIMITS entry {part!r}; expected platform=requests/seconds')
+    return limits
+
+
+def _fetch(job, provider, limiter, page_size, max_pages, refresh_margin, overlap):
+    """Worker thread: refresh and page through one token. No database access here."""
+    result = {'job': job, 'tokens': None, 'activities': [], 'cursor': job['cursor'], 'error': None}
+
+    def call(method, *args):
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            limiter.acquire()
+            try:
+                return method(*args)
+            except ProviderRateLimited as e:
+                if attempt == MAX_RATE_LIMIT_RETRIES:
+                    raise
+                # Every worker on this platform backs off, not just this one
+                limiter.pause(e.retry_after)
+
+    def refresh():
+        result['tokens'] = call(provider.refresh, job['refresh_token'])
+        return result['tokens']['access_token']
+
+    try:
+        access_token = job['access_token']
+        expires_at = job['expires_at']
+        if (job['refresh_token'] and expires_at is not None
+                and expires_at - datetime.utcnow() < timedelta(seconds=refresh_margin)):
+            access_token = refresh()
+
+        after = job['cursor'] - timedelta(seconds=overlap) if job['cursor'] else SYNC_EPOCH
+        for page in range(1, max_pages + 1):
+            try:
+                items = call(provider.fetch_activities, access_token, after, page, page_size)
+            except ProviderAuthError:
+                # Tokens without a known expiry are refreshed on their first rejection
+                if result['tokens'] or not job['refresh_token']:
+                    raise
+                access_token = refresh()
+                items = call(provider.fetch_activities, access_token, after, page, page_size)
+            result['activities'].extend(items)
+            if items:
+                result['cursor'] = max(result['cursor'] or SYNC_EPOCH, max(item['start_date'] for item in items))
+            if len(items) < page_size:
+                break
+    except ProviderError as e:
+        # Pages fetched before the failure are still stored and move the mark
+        result['error'] = str(e)[:255]
+    return result
+
+
+def _insert():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert
+    if dialect == 'sqlite':
+        return sqlite.insert
+    raise RuntimeError(f'Platform sync does not support the {dialect} dialect')
+
+
+def _stored_snapshots(keys):
+    """(source, external_id) -> (athlete_id, rollup snapshot) for activities already synced"""
+    stored = {}
+    keys = list(keys)
+    for offset in range(0, len(keys), _IDS_PER_QUERY):
+        rows = db.session.query(
+            Activity.source, Activity.external_id, Activity.athlete_id, Activity.start_date,
+            *(getattr(Activity, metric) for metric in METRICS)
+        ).filter(tuple_(Activity.source, Activity.external_id).in_(keys[offset:offset + _IDS_PER_QUERY]))
+        for row in rows:
+            stored[(row.source, row.external_id)] = (row.athlete_id, activity_snapshot(row._asdict()))
+    return stored
+
+
+def _upsert_activities(rows):
+    table = Activity.__table__
+    stmt = _insert()(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.source, table.c.external_id],
+        set_={column: stmt.excluded[column] for column in SYNC_FIELDS + ('dedup_key', 'updated_at')}
+    )
+    db.session.execute(stmt, rows)
+
+
+def _write_batch(results):
+    """Upsert one batch of fetch results and their high-water marks in a single transaction"""
+    totals = defaultdict(int)
+    now = datetime.utcnow()
+    rows = {}
+    for result in results:
+        job = result['job']
+        for item in result['activities']:
+            row = {field: item.get(field) for field in SYNC_FIELDS}
+            row.update(
+                athlete_id=job['user_sk'], source=job['platform'], external_id=item['external_id'],
+                created_at=now, updated_at=now
+            )
+            row['dedup_key'] = fingerprint(row)
+            # A platform can return the same activity twice; one row per key per statement
+            rows[(row['source'], row['external_id'])] = row
+
+    if rows:
+        stored = _stored_snapshots(rows)
+        # The same session recorded on two platforms becomes two rows; flag,
+        # never drop, so the next sync of either one still finds its row.
+        # Only inserted rows are probed; an update keeps its duplicate_of
+        new_rows = defaultdict(list)
+        upserts = []
+        for key, row in rows.items():
+            row['duplicate_of'] = None
+            if key in stored:
+                upserts.append(row)
+            else:
+                new_rows[row['athlete_id']].append(row)
+        later = {}
+        for athlete_id, added in new_rows.items():
+            first, later[athlete_id] = flag_new_rows(athlete_id, added)
+            upserts.extend(first)
+        _upsert_activities(upserts)
+        later = {athlete_id: held for athlete_id, held in later.items() if held}
+        if later:
+            for athlete_id, held in later.items():
+                flag_new_rows(athlete_id, held)
+            _upsert_activities([row for held in later.values() for row in held])
+
+        changes = defaultdict(lambda: ([], []))
+        for key, row in rows.items():
+            if key in stored:
+                # An update keeps the stored owner, so its rollups move there
+                athlete_id, before = stored[key]
+                changes[athlete_id][0].append(before)
+            else:
+                athlete_id = row['athlete_id']
+            changes[athlete_id][1].append(row)
+        # One rollup and one dirty-mark statement for the whole batch
+        apply_rollup_changes_many(changes)
+        mark_training_load_dirty_many(changes)
+        totals['flagged'] += sum(
+            row['duplicate_of'] is not None for added in new_rows.values() for row in added
+        )
+        totals['upserted'] += len(rows)
+        totals['inserted'] += len(rows) - len(stored)
+
+    token_updates = []
+    for result in results:
+        values = {
+            'id': result['job']['id'],
+            'sync_cursor': result['cursor'],
+            'last_synced_at': now,
+            'sync_error': result['error']
+        }
+        token_updates.append(values)
+        totals['failed' if result['error'] else 'synced'] += 1
+    db.session.execute(update(UserToken), token_updates)
+    db.session.commit()
+    return totals
+
+
+def _save_tokens(result, totals):
+    """Commit a refreshed token on its own, so a failed activity batch cannot lose it"""
+    try:
+        db.session.execute(update(UserToken), [dict(result['tokens'], id=result['job']['id'])])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        totals['write_errors'].append(str(e.__cause__ or e)[:255])
+        return
+    totals['refreshed'] += 1
+
+
+def _flush(results, totals):
+    try:
+        counts = _write_batch(results)
+    except Exception as e:
+        # Tokens keep their old high-water marks, so the next run refetches
+        db.session.rollback()
+        totals['failed'] += len(results)
+        totals['write_errors'].append(str(e.__cause__ or e)[:255])
+        return
+    for key, value in counts.items():
+        totals[key] += value
+
+
+def sync_tokens(query=None, workers=None, batch_size=None, page_size=None, max_pages=None):
+    """Sync every token matched by ``query`` (default: all UserTokens); returns counts"""
+    workers = workers or Config.SYNC_WORKERS
+    batch_size = batch_size or Config.SYNC_BATCH_SIZE
+    page_size = page_size or Config.SYNC_PAGE_SIZE
+    max_pages = max_pages or Config.SYNC_MAX_PAGES
+    rate_limits = parse_rate_limits(Config.SYNC_RATE_LIMITS)
+
+    query = query if query is not None else UserToken.query
+    tokens = db.session.query(
+        UserToken.id, UserToken.user_sk, UserToken.platform, UserToken.access_token,
+        UserToken.refresh_token, UserToken.expires_at, UserToken.sync_cursor
+    ).filter(UserToken.id.in_(query.with_entities(UserToken.id)), UserToken.user_sk.isnot(None))
+
+    totals = dict.fromkeys(
+        ('tokens', 'unsupported', 'synced', 'failed', 'refreshed', 'fetched', 'upserted', 'inserted', 'flagged'), 0
+    )
+    totals['write_errors'] = []
+    jobs, providers, limiters = [], {}, {}
+    for token in tokens:
+        totals['tokens'] += 1
+        provider = get_provider(token.platform)
+        if provider is None:
+            totals['unsupported'] += 1
+            continue
+        providers[provider.name] = provider
+        if provider.name not in limiters:
+            limiters[provider.name] = RateLimiter(*rate_limits.get(provider.name, provider.rate_limit))
+        jobs.append({
+            'id': token.id, 'user_sk': token.user_sk, 'platform': provider.name,
+            'access_token': token.access_token, 'refresh_token': token.refresh_token,
+            'expires_at': token.expires_at, 'cursor': token.sync_cursor
+        })
+    # Release the read transaction before the long fetch phase
+    db.session.commit()
+
+    batch, batch_activities = [], 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='activity-sync') as executor:
+        futures = [
+            executor.submit(
+                _fetch, job, providers[job['platform']], limiters[job['platform']],
+                page_size, max_pages, Config.SYNC_REFRESH_MARGIN, Config.SYNC_CURSOR_OVERLAP
+            )
+            for job in jobs
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            if result['tokens']:
+                _save_tokens(result, totals)
+            totals['fetched'] += len(result['activities'])
+            batch.append(result)
+            batch_activities += len(result['activities'])
+            if batch_activities >= batch_size or len(batch) >= batch_size:
+                _flush(batch, totals)
+                batch, batch_activities = [], 0
+    if batch:
+        _flush(batch, totals)
+
+    totals['rate_limits'] = {name: limiter.stats() for name, limiter in limiters.items()}
+    return totals
@@ -0,0 +1,323 @@
+"""Spark-point ledger writes and the per-user balance they maintain.
+
+Every ledger insert goes through ``apply_balance_changes`` in the same
+transaction, which adds the points to the user's SparkBalance row inside
+the database (total = total + excluded.total), so concurrent awards never
+lose an update and reading a balance is a primary-key lookup.
+``reconcile_balances`` checks the maintained totals against the ledger.
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models.spark_points import SparkBalance, SparkLedger
+from models.user import User
+from utils.pagination import keyset_page
+
+_IDS_PER_QUERY = 500
+HISTORY_BUCKETS = ('day', 'week', 'month')
+# Window a bucketed history covers when no ?from= is given
+DEFAULT_BUCKET_WINDOWS = {'day': timedelta(days=90), 'week': timedelta(weeks=52), 'month': timedelta(days=365)}
+
+
+def _insert():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert
+    if dialect == 'sqlite':
+        return sqlite.insert
+    raise RuntimeError(f'Spark balances do not support the {dialect} dialect')
+
+
+def _greater(column, value):
+    return case((column.is_(None), value), (value > column, value), else_=column)
+
+
+def apply_balance_changes(entries):
+    """Fold flushed SparkLedger rows (or dicts with their columns) into the balances.
+
+    Runs in the caller's transaction, so the balances commit or roll back
+    with the ledger rows. Rows are upserted in user order, which keeps
+    concurrent multi-user batches from deadlocking on each other's rows.
+    """
+    deltas = defaultdict(lambda: {'total': 0, 'last_updated': None, 'last_ledger_id': None})
+    for entry in entries:
+        get = entry.get if isinstance(entry, dict) else lambda key: getattr(entry, key)
+        delta = deltas[get('user_sk')]
+        delta['total'] += get('points')
+        if get('timestamp') is not None and (delta['last_updated'] is None or get('timestamp') > delta['last_updated']):
+            delta['last_updated'] = get('timestamp')
+        if get('id') is not None and (delta['last_ledger_id'] is None or get('id') > delta['last_ledger_id']):
+            delta['last_ledger_id'] = get('id')
+    if not deltas:
+        return
+
+    table = SparkBalance.__table__
+    stmt = _insert()(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_sk],
+        set_={
+            'total': table.c.total + stmt.excluded.total,
+            'last_updated': _greater(table.c.last_updated, stmt.excluded.last_updated),
+            'last_ledger_id': _greater(table.c.last_ledger_id, stmt.excluded.last_ledger_id)
+        }
+    )
+    db.session.execute(stmt, [dict(delta, user_sk=user_sk) for user_sk, delta in sorted(deltas.items())])
+
+
+def award_spark_points(user_sk, points, activity_type='general'):
+    """Append one ledger entry and update the balance; returns the committed entry"""
+    entry = SparkLedger(user_sk=user_sk, points=points, activity_type=activity_type, timestamp=datetime.utcnow())
+    db.session.add(entry)
+    # The balance records the entry's id as its high-water mark
+    db.session.flush()
+    apply_balance_changes([entry])
+    db.session.commit()
+    return entry
+
+
+def _clean_award(entry):
+    """Validate one batch entry; returns (values, error)"""
+    if not isinstance(entry, dict):
+        return None, 'Expected an object'
+    try:
+        user_sk = int(entry.get('user_sk'))
+        points = int(entry.get('points'))
+    except (TypeError, ValueError):
+        return None, 'user_sk and points must be integers'
+    activity_type = entry.get('activity_type') or 'general'
+    key = entry.get('idempotency_key')
+    if not isinstance(key, str) or not key.strip():
+        return None, 'idempotency_key is required'
+    if not isinstance(activity_type, str) or len(activity_type) > 50:
+        return None, 'activity_type must be a string of at most 50 characters'
+    if len(key.strip()) > 100:
+        return None, 'idempotency_key must be at most 100 characters'
+    return {'user_sk': user_sk, 'points': points, 'activity_type': activity_type,
+            'idempotency_key': key.strip()}, None
+
+
+def _in_chunks(column, values):
+    values = list(values)
+    for offset in range(0, len(values), _IDS_PER_QUERY):
+        yield column.in_(values[offset:offset + _IDS_PER_QUERY])
+
+
+def award_batch(entries):
+    """Award a batch of {user_sk, points, activity_type, idempotency_key} entries in one transaction.
+
+    New entries go in with one executemany INSERT .. ON CONFLICT DO NOTHING
+    against uq_spark_ledger_user_idempotency, so a key already applied for
+    that user (by an earlier request, or a concurrent one that commits
+    first) is skipped by the database rather than checked row by row.
+    Returns counts plus one result per entry, in request order:
+    'awarded' (with ledger_id), 'duplicate' (with the ledger_id applied
+    before) or 'rejected' (with error).
+    """
+    results = [None] * len(entries)
+    pending = {}
+    for index, entry in enumerate(entries):
+        values, error = _clean_award(entry)
+        if error:
+            results[index] = {'index': index, 'status': 'rejected', 'error': error}
+        elif (values['user_sk'], values['idempotency_key']) in pending:
+            results[index] = {'index': index, 'status': 'rejected', 'error': 'Duplicate idempotency_key in batch'}
+        else:
+            pending[(values['user_sk'], values['idempotency_key'])] = (index, values)
+
+    # Unknown users would fail the whole statement on the foreign key
+    known = set()
+    for condition in _in_chunks(User.user_sk, {user_sk for user_sk, _ in pending}):
+        known.update(user_sk for (user_sk,) in db.session.query(User.user_sk).filter(condition))
+    for key in [key for key in pending if key[0] not in known]:
+        index, _ = pending.pop(key)
+        results[index] = {'index': index, 'status': 'rejected', 'error': 'Unknown user_sk'}
+
+    inserted = []
+    if pending:
+        now = datetime.utcnow()
+        rows = [dict(values, timestamp=now) for _, values in pending.values()]
+        table = SparkLedger.__table__
+        stmt = _insert()(table).on_conflict_do_nothing(
+            index_elements=[table.c.user_sk, table.c.idempotency_key]
+        ).returning(table.c.id, table.c.user_sk, table.c.idempotency_key)
+        for ledger_id, user_sk, key in db.session.execute(stmt, rows):
+            index, values = pending.pop((user_sk, key))
+            results[index] = {'index': index, 'status': 'awarded', 'ledger_id': ledger_id}
+            inserted.append(dict(values, id=ledger_id, timestamp=now))
+        apply_balance_changes(inserted)
+
+    if pending:
+        # Whatever the INSERT skipped was applied before
+        pairs = db.tuple_(SparkLedger.user_sk, SparkLedger.idempotency_key)
+        for condition in _in_chunks(pairs, list(pending)):
+            applied = db.session.query(SparkLedger.id, SparkLedger.user_sk, SparkLedger.idempotency_key).filter(condition)
+            for ledger_id, user_sk, key in applied:
+                index, _ = pending.pop((user_sk, key))
+                results[index] = {'index': index, 'status': 'duplicate', 'ledger_id': ledger_id}
+    for index, _ in pending.values():
+        results[index] = {'index': index, 'status': 'rejected', 'error': 'Could not be applied; retry'}
+    db.session.commit()
+
+    counts = defaultdict(int)
+    for result in results:
+        counts[result['status']] += 1
+    return {
+        'total': len(entries),
+        'awarded': counts['awarded'],
+        'duplicates': counts['duplicate'],
+        'rejected': counts['rejected'],
+        'points_awarded': sum(row['points'] for row in inserted),
+        'results': results
+    }
+
+
+def get_balance(user_sk):
+    balance = db.session.get(SparkBalance, user_sk)
+    if balance is None:
+        return {'user_sk': user_sk, 'total_spark_points': 0, 'last_updated': None}
+    return balance.to_dict()
+
+
+def list_history(user_sk, limit, cursor=None):
+    """One keyset page of the user's ledger, newest first.
+
+    Ordered by (timestamp, id), so every page is a range scan on
+    ix_spark_ledger_user_timestamp however deep the cursor is. Entries
+    without a timestamp come last, newest id first.
+    """
+    query = SparkLedger.query.filter(SparkLedger.user_sk == user_sk)
+    rows, next_cursor = keyset_page(query, SparkLedger.timestamp, SparkLedger.id, limit, cursor)
+    return {'entries': [row.to_dict() for row in rows], 'next_cursor': next_cursor}
+
+
+def _bucket_start(bucket):
+    """SQL expression for the start of the day, Monday-based week or month of each entry"""
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return db.func.date_trunc(bucket, SparkLedger.timestamp)
+    if dialect == 'sqlite':
+        if bucket == 'day':
+            return db.func.date(SparkLedger.timestamp)
+        if bucket == 'week':
+            # Forward to Sunday (or stay on it), then back to that week's Monday
+            return db.func.date(SparkLedger.timestamp, 'weekday 0', '-6 days')
+        return db.func.strftime('%Y-%m-01', SparkLedger.timestamp)
+    raise RuntimeError(f'Bucketed spark history does not support the {dialect} dialect')
+
+
+def bucket_history(user_sk, bucket, start, end):
+    """Points and entry counts per (bucket, activity_type) for start <= day <= end, newest first.
+
+    Grouped in SQL, so the response has one row per bucket and type however
+    many ledger entries the window holds.
+    """
+    bucket_start = _bucket_start(bucket).label('bucket')
+    rows = db.session.query(
+        bucket_start,
+        SparkLedger.activity_type,
+        db.func.sum(SparkLedger.points),
+        db.func.count(SparkLedger.id)
+    ).filter(
+        SparkLedger.user_sk == user_sk,
+        SparkLedger.timestamp >= datetime.combine(start, datetime.min.time()),
+        SparkLedger.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time())
+    ).group_by(bucket_start, SparkLedger.activity_type).order_by(
+        bucket_start.desc(), SparkLedger.activity_type
+    )
+    return [
+        {
+            'bucket': (value.date() if isinstance(value, datetime) else date.fromisoformat(value)).isoformat(),
+            'activity_type': activity_type,
+            'points': int(points or 0),
+            'entries': entries
+        }
+        for value, activity_type, points, entries in rows
+    ]
+
+
+def _ledger_totals(user_sks):
+    """user_sk -> (points, newest timestamp, highest id) aggregated from the whole ledger"""
+    query = db.session.query(
+        SparkLedger.user_sk,
+        db.func.sum(SparkLedger.points),
+        db.func.max(SparkLedger.timestamp),
+        db.func.max(SparkLedger.id)
+    ).group_by(SparkLedger.user_sk)
+    totals = {}
+    for offset in range(0, len(user_sks), _IDS_PER_QUERY):
+        chunk = query.filter(SparkLedger.user_sk.in_(user_sks[offset:offset + _IDS_PER_QUERY]))
+        totals.update((row[0], tuple(row[1:])) for row in chunk)
+    return totals
+
+
+def _rewrite_balances(user_sks):
+    """Recompute the given users' balances from the whole ledger, under their row locks"""
+    user_sks = sorted(user_sks)
+    for offset in range(0, len(user_sks), _IDS_PER_QUERY):
+        # Awards for these users wait until the rewrite commits
+        db.session.query(SparkBalance.user_sk).filter(
+            SparkBalance.user_sk.in_(user_sks[offset:offset + _IDS_PER_QUERY])
+        ).with_for_update().all()
+    ledger = _ledger_totals(user_sks)
+
+    table = SparkBalance.__table__
+    stmt = _insert()(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.user_sk],
+        set_={column: stmt.excluded[column] for column in ('total', 'last_updated', 'last_ledger_id')}
+    )
+    rows = []
+    for user_sk in user_sks:
+        points, last_updated, last_ledger_id = ledger.get(user_sk, (0, None, None))
+        rows.append({'user_sk': user_sk, 'total': points or 0, 'last_updated': last_updated,
+                     'last_ledger_id': last_ledger_id})
+    if rows:
+        db.session.execute(stmt, rows)
+
+
+def reconcile_balances(user_sk=None, fix=False):
+    """Compare maintained balances with the ledger; with ``fix`` rewrite the drifted ones.
+
+    Each balance is compared with its user's whole ledger, and ledger rows
+    above its last_ledger_id (written without updating the balance) count as
+    drift too. An award writes its ledger row and balance in one
+    transaction, and both sides are read in the same statement, so awards
+    landing while the check runs are not reported. Returns {'checked',
+    'mismatched', 'fixed', 'mismatches': [first 20]}.
+    """
+    ledger_total = db.session.query(db.func.coalesce(db.func.sum(SparkLedger.points), 0)).filter(
+        SparkLedger.user_sk == SparkBalance.user_sk
+    ).scalar_subquery()
+    unfolded = db.session.query(db.func.count(SparkLedger.id)).filter(
+        SparkLedger.user_sk == SparkBalance.user_sk,
+        SparkLedger.id > db.func.coalesce(SparkBalance.last_ledger_id, 0)
+    ).scalar_subquery()
+    balances = db.session.query(SparkBalance.user_sk, SparkBalance.total, ledger_total, unfolded)
+    # Users with ledger entries but no balance row at all
+    missing = db.session.query(SparkLedger.user_sk, db.func.sum(SparkLedger.points)).filter(
+        ~db.session.query(SparkBalance.user_sk).filter(SparkBalance.user_sk == SparkLedger.user_sk).exists()
+    ).group_by(SparkLedger.user_sk)
+    if user_sk is not None:
+        balances = balances.filter(SparkBalance.user_sk == user_sk)
+        missing = missing.filter(SparkLedger.user_sk == user_sk)
+
+    checked = 0
+    mismatches = []
+    for sk, total, expected, unfolded_rows in balances:
+        checked += 1
+        if total != expected or unfolded_rows:
+            mismatches.append({'user_sk': sk, 'balance': total, 'ledger': expected, 'unfolded': unfolded_rows})
+    for sk, expected in missing:
+        checked += 1
+        mismatches.append({'user_sk': sk, 'balance': None, 'ledger': expected, 'unfolded': None})
+
+    fixed = 0
+    if fix and mismatches:
+        _rewrite_balances([item['user_sk'] for item in mismatches])
+        fixed = len(mismatches)
+    db.session.commit()
+    return {'checked': checked, 'mismatched': len(mismatches), 'fixed': fixed, 'mismatches': mismatches[:20]}
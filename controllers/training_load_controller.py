@@ -0,0 +1,211 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import case, insert, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from extensions import db
+from models.activity import Activity
+from models.training_load import TrainingLoadDay, TrainingLoadState
+from controllers.activity_rollup_controller import activity_snapshot
+
+ATL_DAYS = 7    # acute load (fatigue) time constant
+CTL_DAYS = 42   # chronic load (fitness) time constant
+
+# Effort speed (km/h, with 100 m of climbing counted as 1 km) that scores
+# 60 load points per hour; intensity is clipped so outliers stay bounded
+REFERENCE_EFFORT_SPEED = 10.0
+INTENSITY_RANGE = (0.5, 2.0)
+
+# Days per closed-form EWMA block; keeps decay ** -BLOCK well inside float64
+_BLOCK = 256
+
+
+def activity_loads(moving_time, distance, elevation_gain):
+    """Load of each activity: moving minutes weighted by effort intensity (numpy arrays in)"""
+    hours = moving_time / 3600.0
+    effort_km = distance / 1000.0 + elevation_gain / 100.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        speed = np.where(hours > 0, effort_km / hours, 0.0)
+    intensity = np.clip(speed / REFERENCE_EFFORT_SPEED, *INTENSITY_RANGE)
+    return np.where(hours > 0, hours * 60.0 * intensity, 0.0)
+
+
+def ewma(loads, time_constant, seed=0.0):
+    """y[t] = y[t-1] + k * (loads[t] - y[t-1]) with k = 1 - exp(-1 / time_constant).
+
+    Evaluated with the closed form y[t] = d^(t+1) * (seed + k * sum(x[i] * d^-(i+1)))
+    (d = 1 - k), so each block of days is a single cumsum; blocks only exist
+    to keep the d^-i factors from overflowing on multi-year histories.
+    """
+    decay = np.exp(-1.0 / time_constant)
+    k = 1.0 - decay
+    out = np.empty(len(loads), dtype=np.float64)
+    powers = decay ** np.arange(1, _BLOCK + 1)
+    for begin in range(0, len(loads), _BLOCK):
+        block = loads[begin:begin + _BLOCK]
+        grow = powers[:len(block)]
+        out[begin:begin + len(block)] = grow * (seed + k * np.cumsum(block / grow))
+        seed = out[begin + len(block) - 1]
+    return out
+
+
+def _insert():
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return postgresql.insert
+    if dialect == 'sqlite':
+        return sqlite.insert
+    raise RuntimeError(f'Training load does not support the {dialect} dialect')
+
+
+def mark_training_load_dirty(athlete_id, *activity_groups):
+    """Move the athlete's dirty_from back to the earliest day touched by a write.
+
+    Takes any number of lists of activities or activity snapshots (e.g. the
+    removed and added sides of an update). Runs in the caller's transaction,
+    so the mark commits or rolls back with the activity rows.
+    """
+    mark_training_load_dirty_many({athlete_id: activity_groups})
+
+
+def mark_training_load_dirty_many(groups_by_athlete):
+    """mark_training_load_dirty for several athletes in one executemany upsert.
+
+    ``groups_by_athlete`` maps athlete_id -> a sequence of activity lists.
+    """
+    now = datetime.utcnow()
+    rows = []
+    for athlete_id, activity_groups in groups_by_athlete.items():
+        days = [
+            snapshot['start_date']
+            for group in activity_groups
+            for snapshot in map(activity_snapshot, group)
+            if snapshot['start_date'] is not None
+        ]
+        if days:
+            rows.append({'athlete_id': athlete_id, 'dirty_from': min(days), 'updated_at': now})
+
+    if not rows:
+        return
+
+    table = TrainingLoadState.__table__
+    stmt = _insert()(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.athlete_id],
+        set_={
+            'dirty_from': case(
+                (or_(table.c.dirty_from.is_(None), stmt.excluded.dirty_from < table.c.dirty_from),
+                 stmt.excluded.dirty_from),
+                else_=table.c.dirty_from
+            ),
+            'updated_at': stmt.excluded.updated_at
+        }
+    )
+    db.session.execute(stmt, rows)
+
+
+def _daily_loads(athlete_id, start, end):
+    """Summed activity load per day for start..end inclusive, as one array"""
+    rows = db.session.query(
+        Activity.start_date,
+        db.func.coalesce(Activity.moving_time, 0),
+        db.func.coalesce(Activity.distance, 0),
+        db.func.coalesce(Activity.total_elevation_gain, 0)
+    ).filter(
+        Activity.athlete_id == athlete_id,
+        Activity.start_date >= datetime.combine(start, datetime.min.time()),
+        Activity.start_date < datetime.combine(end + timedelta(days=1), datetime.min.time())
+    ).all()
+
+    days = (end - start).days + 1
+    if not rows:
+        return np.zeros(days)
+    start_dates, moving_time, distance, elevation_gain = zip(*rows)
+    offsets = (np.array(start_dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+    loads = activity_loads(
+        np.array(moving_time, dtype=np.float64),
+        np.array(distance, dtype=np.float64),
+        np.array(elevation_gain, dtype=np.float64)
+    )
+    return np.bincount(offsets, weights=loads, minlength=days)
+
+
+def refresh_training_load(athlete_id, today=None):
+    """Bring the athlete's cached series up to today; returns the number of days recomputed.
+
+    Only days from the earliest dirty date (or the day after the last
+    computed one) are recomputed, seeded with the cached ATL/CTL of the day
+    before. The state row is locked so concurrent readers do not recompute
+    the same range twice; it is created first if missing, since FOR UPDATE
+    locks nothing on a row that does not exist yet.
+    """
+    today = today or datetime.utcnow().date()
+    table = TrainingLoadState.__table__
+    db.session.execute(
+        _insert()(table).values(athlete_id=athlete_id, updated_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[table.c.athlete_id])
+    )
+    state = db.session.execute(
+        db.select(TrainingLoadState).where(TrainingLoadState.athlete_id == athlete_id)
+        .with_for_update().execution_options(populate_existing=True)
+    ).scalar_one()
+
+    if state.computed_through is None:
+        first = db.session.query(db.func.min(Activity.start_date)).filter(
+            Activity.athlete_id == athlete_id
+        ).scalar()
+        if isinstance(first, str):
+            first = datetime.fromisoformat(first)
+        start = first.date() if isinstance(first, datetime) else first
+    else:
+        start = state.computed_through + timedelta(days=1)
+        if state.dirty_from is not None:
+            start = min(start, state.dirty_from)
+
+    recomputed = 0
+    if start is not None and start <= today:
+        previous = db.session.get(TrainingLoadDay, (athlete_id, start - timedelta(days=1)))
+        seed_atl, seed_ctl = (previous.atl, previous.ctl) if previous else (0.0, 0.0)
+
+        loads = _daily_loads(athlete_id, start, today)
+        atl = ewma(loads, ATL_DAYS, seed_atl)
+        ctl = ewma(loads, CTL_DAYS, seed_ctl)
+        # Form is yesterday's fitness minus yesterday's fatigue
+        tsb = np.concatenate(([seed_ctl - seed_atl], (ctl - atl)[:-1]))
+
+        TrainingLoadDay.query.filter(
+            TrainingLoadDay.athlete_id == athlete_id,
+            TrainingLoadDay.day >= start
+        ).delete(synchronize_session=False)
+        db.session.execute(insert(TrainingLoadDay.__table__), [
+            {'athlete_id': athlete_id, 'day': start + timedelta(days=offset),
+             'load': values[0], 'atl': values[1], 'ctl': values[2], 'tsb': values[3]}
+            for offset, values in enumerate(np.column_stack((loads, atl, ctl, tsb)).tolist())
+        ])
+        recomputed = len(loads)
+
+    state.computed_through = today
+    state.dirty_from = None
+    db.session.commit()
+    return recomputed
+
+
+def get_training_load(athlete_id, start, end):
+    """Daily load, ATL, CTL and TSB for start..end, refreshing the cache first"""
+    refresh_training_load(athlete_id)
+    # Plain column rows: a multi-year window is thousands of days and does
+    # not need ORM identity tracking
+    rows = db.session.query(
+        TrainingLoadDay.day, TrainingLoadDay.load, TrainingLoadDay.atl,
+        TrainingLoadDay.ctl, TrainingLoadDay.tsb
+    ).filter(
+        TrainingLoadDay.athlete_id == athlete_id,
+        TrainingLoadDay.day >= start,
+        TrainingLoadDay.day <= end
+    ).order_by(TrainingLoadDay.day).all()
+    return [
+        {'date': day.isoformat(), 'load': round(load, 2), 'atl': round(atl, 2),
+         'ctl': round(ctl, 2), 'tsb': round(tsb, 2)}
+        for day, load, atl, ctl, tsb in rows
+    ]
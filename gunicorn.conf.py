@@ -1,9 +1,18 @@
+import os
+
 bind = "0.0.0.0:8000"
 workers = 4  # Generally (2 x num_cores) + 1
-worker_class = "sync"
+worker_class = "gthread"  # Threads wait on the password hashing pool without blocking other requests
+# PASSWORD_HASH_MAX_PENDING defaults to threads - 1: at most that many
+# threads wait on password hashing, so one is always free for other requests
+threads = int(os.getenv('GUNICORN_THREADS', 4))
 timeout = 120
 keepalive = 5
 errorlog = "-"  # stderr
 accesslog = "-"  # stdout
 loglevel = "info"
 reload = True  # Auto-reload on code changes
+
+def worker_exit(server, worker):
+    from utils.password_hashing import shutdown
+    shutdown()
@@ -1,8 +1,8 @@
 from functools import wraps
 from flask import request, jsonify
 import jwt
-from models.user import User
 from config import Config
+from middleware.identity_cache import load_user
 
 def token_required(f):
     @wraps(f)
@@ -16,7 +16,7 @@ def token_required(f):
         
         try:
             data = jwt.decode(token, Config.SECRET_KEY, algorithms=["HS256"])
-            current_user = User.query.filter_by(user_sk=data['user_sk']).first()
+            current_user = load_user(data['user_sk'])
         except:
             return jsonify({'error': 'Token is invalid'}), 401
             
@@ -1,6 +1,7 @@
 from functools import wraps
 from flask import request, jsonify, current_app
 import jwt
+from middleware.identity_cache import load_user
 
 def login_required(f):
     @wraps(f)
@@ -14,7 +15,9 @@ def login_required(f):
         try:
             token = auth_header.split(' ')[1]
             data = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            return f(data['user_sk'])
+            if not load_user(data['user_sk']):
+                return jsonify({'error': 'User not found'}), 401
+            return f(data['user_sk'], *args, **kwargs)
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired'}), 401
         except Exception as e:
@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from extensions import db
+from models.user import User
+from config import Config
+
+
+class IdentityCache:
+    """Process-wide TTL + LRU cache of authenticated users keyed by user_sk.
+
+    Entries are detached ``User`` instances; callers re-attach them to the
+    request session with ``merge(load=False)`` so no SELECT is issued on a hit.
+    Each gunicorn worker holds its own cache, so cross-worker staleness is
+    bounded by the TTL.
+    """
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_sk):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_sk)
+            if entry is None:
+                self.misses += 1
+                return None
+            user, expires_at = entry
+            if expires_at <= now:
+                del self._entries[user_sk]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_sk)
+            self.hits += 1
+            return user
+
+    def set(self, user_sk, user):
+        with self._lock:
+            self._entries[user_sk] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_sk)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, user_sk):
+        with self._lock:
+            if self._entries.pop(user_sk, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations
+            }
+
+
+identity_cache = IdentityCache(
+    max_size=Config.AUTH_CACHE_MAX_SIZE,
+    ttl=Config.AUTH_CACHE_TTL
+)
+
+
+def load_user(user_sk):
+    """Return the session-attached User for user_sk, or None if it does not exist"""
+    cached = identity_cache.get(user_sk)
+    if cached is not None:
+        return db.session.merge(cached, load=False)
+
+    user = User.query.filter_by(user_sk=user_sk).first()
+    if not user:
+        return None
+
+    # Cache a detached copy and hand the view an instance bound to its own session
+    db.session.expunge(user)
+    identity_cache.set(user_sk, user)
+    return db.session.merge(user, load=False)
+
+
+# Invalidate on every User write path (profile updates, password resets, deletes).
+# Entries are dropped at flush and again after commit so a concurrent request
+# cannot re-cache the pre-commit row.
+def _mark_user_dirty(mapper, connection, target):
+    identity_cache.invalidate(target.user_sk)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('dirty_user_sks', set()).add(target.user_sk)
+
+
+event.listen(User, 'after_update', _mark_user_dirty)
+event.listen(User, 'after_delete', _mark_user_dirty)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed_users(session):
+    for user_sk in session.info.pop('dirty_user_sks', ()):
+        identity_cache.invalidate(user_sk)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_dirty_users(session):
+    session.info.pop('dirty_user_sks', None)
@@ -0,0 +1,49 @@
+"""Add users.partner and the indexes the spark-point leaderboards load from
+
+Revision ID: 0b9d5e2f7a13
+Revises: f1a6c3d8e207
+Create Date: 2026-10-18 17:30:44.208617
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b9d5e2f7a13'
+down_revision = 'f1a6c3d8e207'
+branch_labels = None
+depends_on = None
+
+INDEXES = (
+    ('ix_users_partner', 'users', ['partner']),
+    ('ix_spark_ledger_timestamp', 'spark_ledger', ['timestamp']),
+)
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'users' in tables and 'partner' not in {column['name'] for column in inspector.get_columns('users')}:
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('partner', sa.String(length=100), nullable=True))
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if table not in tables:
+                continue
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            op.execute(f'CREATE INDEX {_concurrently()}IF NOT EXISTS {name} ON {table} ({column_list})')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX {_concurrently()}IF EXISTS {name}')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('partner')
@@ -0,0 +1,43 @@
+"""Add hydration_logs.client_uuid with a per-user unique index
+
+Revision ID: 2d7f4b9e1c58
+Revises: 8e3a6d0c4b71
+Create Date: 2026-10-18 19:20:44.318502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7f4b9e1c58'
+down_revision = '8e3a6d0c4b71'
+branch_labels = None
+depends_on = None
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'hydration_logs' not in inspector.get_table_names():
+        return
+    if 'client_uuid' not in {column['name'] for column in inspector.get_columns('hydration_logs')}:
+        with op.batch_alter_table('hydration_logs') as batch_op:
+            batch_op.add_column(sa.Column('client_uuid', sa.String(length=36), nullable=True))
+
+    # Logs posted one at a time have no uuid, and NULLs never collide
+    with op.get_context().autocommit_block():
+        op.execute(
+            f'CREATE UNIQUE INDEX {_concurrently()}IF NOT EXISTS uq_hydration_logs_user_client_uuid '
+            'ON hydration_logs ("user_sk", "client_uuid")'
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f'DROP INDEX {_concurrently()}IF EXISTS uq_hydration_logs_user_client_uuid')
+    with op.batch_alter_table('hydration_logs') as batch_op:
+        batch_op.drop_column('client_uuid')
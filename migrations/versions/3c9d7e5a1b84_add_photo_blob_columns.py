@@ -0,0 +1,91 @@
+"""Add blob store columns to photos and supplement_photos
+
+Revision ID: 3c9d7e5a1b84
+Revises: 6f1a8d3c5e92
+Create Date: 2026-10-18 23:12:05.418377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.blob_store import BlobNotFound, blob_store
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9d7e5a1b84'
+down_revision = '6f1a8d3c5e92'
+branch_labels = None
+depends_on = None
+
+# (table, primary key)
+_TABLES = (('photos', 'pid'), ('supplement_photos', 'id'))
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def _existing_tables():
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade():
+    # Schema only: `flask photos migrate-blobs` moves the bytes out in batches
+    inspector = sa.inspect(op.get_bind())
+    tables = _existing_tables()
+    for table, _ in _TABLES:
+        if table not in tables:
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table)}
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('photo_data', existing_type=sa.LargeBinary(), nullable=True)
+            if 'blob_sha256' not in columns:
+                batch_op.add_column(sa.Column('blob_sha256', sa.String(length=64), nullable=True))
+            if 'size_bytes' not in columns:
+                batch_op.add_column(sa.Column('size_bytes', sa.Integer(), nullable=True))
+            if 'mime_type' not in columns:
+                batch_op.add_column(sa.Column('mime_type', sa.String(length=100), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for table, _ in _TABLES:
+            if table in tables:
+                op.execute(
+                    f'CREATE INDEX {_concurrently()}IF NOT EXISTS ix_{table}_blob_sha256 ON {table} ("blob_sha256")'
+                )
+
+
+def downgrade():
+    bind = op.get_bind()
+    tables = _existing_tables()
+    for table, key in _TABLES:
+        if table not in tables:
+            continue
+        # Copy moved bytes back into the rows, one image at a time
+        photos = sa.table(table, sa.column(key), sa.column('blob_sha256'), sa.column('photo_data'))
+        pending = bind.execute(
+            sa.select(photos.c[key], photos.c.blob_sha256).where(photos.c.photo_data.is_(None))
+        ).all()
+        missing = []
+        for row_id, digest in pending:
+            try:
+                data = blob_store.get(digest) if digest else None
+            except BlobNotFound:
+                data = None
+            if data is None:
+                missing.append(row_id)
+                continue
+            bind.execute(photos.update().where(photos.c[key] == row_id).values(photo_data=data))
+        if missing:
+            raise RuntimeError(f'{table}: no blob to restore for rows {missing[:20]} ({len(missing)} in all)')
+
+    with op.get_context().autocommit_block():
+        for table, _ in _TABLES:
+            op.execute(f'DROP INDEX {_concurrently()}IF EXISTS ix_{table}_blob_sha256')
+    for table, _ in _TABLES:
+        if table not in tables:
+            continue
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('mime_type')
+            batch_op.drop_column('size_bytes')
+            batch_op.drop_column('blob_sha256')
+            batch_op.alter_column('photo_data', existing_type=sa.LargeBinary(), nullable=False)
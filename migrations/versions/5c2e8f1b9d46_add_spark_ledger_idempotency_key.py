@@ -0,0 +1,43 @@
+"""Add spark_ledger.idempotency_key with a per-user unique index
+
+Revision ID: 5c2e8f1b9d46
+Revises: 0b9d5e2f7a13
+Create Date: 2026-10-18 18:12:05.664019
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c2e8f1b9d46'
+down_revision = '0b9d5e2f7a13'
+branch_labels = None
+depends_on = None
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'spark_ledger' not in inspector.get_table_names():
+        return
+    if 'idempotency_key' not in {column['name'] for column in inspector.get_columns('spark_ledger')}:
+        with op.batch_alter_table('spark_ledger') as batch_op:
+            batch_op.add_column(sa.Column('idempotency_key', sa.String(length=100), nullable=True))
+
+    # Existing rows have no key, and NULLs never collide
+    with op.get_context().autocommit_block():
+        op.execute(
+            f'CREATE UNIQUE INDEX {_concurrently()}IF NOT EXISTS uq_spark_ledger_user_idempotency '
+            'ON spark_ledger ("user_sk", "idempotency_key")'
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f'DROP INDEX {_concurrently()}IF EXISTS uq_spark_ledger_user_idempotency')
+    with op.batch_alter_table('spark_ledger') as batch_op:
+        batch_op.drop_column('idempotency_key')
@@ -0,0 +1,66 @@
+"""Add geocoding_results.geocell for nearest and radius queries
+
+Revision ID: 6f1a8d3c5e92
+Revises: 9b4e2c7d1f30
+Create Date: 2026-10-18 20:41:37.229816
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from utils.geo import geocell
+
+
+# revision identifiers, used by Alembic.
+revision = '6f1a8d3c5e92'
+down_revision = '9b4e2c7d1f30'
+branch_labels = None
+depends_on = None
+
+_BATCH = 10000
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if 'geocoding_results' not in inspector.get_table_names():
+        return
+    if 'geocell' not in {column['name'] for column in inspector.get_columns('geocoding_results')}:
+        with op.batch_alter_table('geocoding_results') as batch_op:
+            batch_op.add_column(sa.Column('geocell', sa.BigInteger(), nullable=True))
+
+    # Backfill in id order, one batch per round trip
+    results = sa.table(
+        'geocoding_results', sa.column('id'), sa.column('latitude'), sa.column('longitude'), sa.column('geocell')
+    )
+    update = results.update().where(results.c.id == sa.bindparam('row_id')).values(geocell=sa.bindparam('cell'))
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(results.c.id, results.c.latitude, results.c.longitude)
+            .where(results.c.id > last_id, results.c.geocell.is_(None))
+            .order_by(results.c.id).limit(_BATCH)
+        ).all()
+        if not rows:
+            break
+        bind.execute(update, [
+            {'row_id': row_id, 'cell': geocell(latitude, longitude)} for row_id, latitude, longitude in rows
+        ])
+        last_id = rows[-1][0]
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            f'CREATE INDEX {_concurrently()}IF NOT EXISTS ix_geocoding_results_geocell '
+            'ON geocoding_results ("geocell", "latitude", "longitude", "id")'
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f'DROP INDEX {_concurrently()}IF EXISTS ix_geocoding_results_geocell')
+    with op.batch_alter_table('geocoding_results') as batch_op:
+        batch_op.drop_column('geocell')
@@ -0,0 +1,97 @@
+"""Add per-athlete weekly and monthly activity rollups
+
+Revision ID: 7a4c2e9d3f15
+Revises: 3c9d7e5a1b84
+Create Date: 2026-10-18 23:41:09.562208
+
+Rollups are backfilled from activities here; ``flask activity
+rebuild-rollups`` recomputes them at any time.
+
+"""
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4c2e9d3f15'
+down_revision = '3c9d7e5a1b84'
+branch_labels = None
+depends_on = None
+
+_METRICS = ('distance', 'moving_time', 'total_elevation_gain', 'calories')
+_BATCH = 5000
+
+
+def _period_starts(day):
+    return (('week', day - timedelta(days=day.weekday())), ('month', day.replace(day=1)))
+
+
+def upgrade():
+    bind = op.get_bind()
+    tables = sa.inspect(bind).get_table_names()
+    if 'activity_rollups' not in tables:
+        op.create_table(
+            'activity_rollups',
+            sa.Column('athlete_id', sa.Integer(), sa.ForeignKey('users.user_sk'), primary_key=True),
+            sa.Column('period_type', sa.String(length=10), primary_key=True),
+            sa.Column('period_start', sa.Date(), primary_key=True),
+            sa.Column('activity_count', sa.Integer(), nullable=False),
+            sa.Column('distance', sa.Float(), nullable=False),
+            sa.Column('moving_time', sa.Integer(), nullable=False),
+            sa.Column('total_elevation_gain', sa.Float(), nullable=False),
+            sa.Column('calories', sa.Float(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=True)
+        )
+    if 'activities' not in tables:
+        return
+
+    # Day totals come out of SQL; weeks and months are folded here, since
+    # week starts have no portable SQL spelling
+    activities = sa.table('activities', sa.column('athlete_id'), sa.column('start_date'),
+                          *(sa.column(metric) for metric in _METRICS))
+    rollups = sa.table('activity_rollups', sa.column('athlete_id'))
+    day = sa.func.date(activities.c.start_date)
+    rows = bind.execute(
+        sa.select(
+            activities.c.athlete_id,
+            day,
+            sa.func.count(),
+            *(sa.func.coalesce(sa.func.sum(activities.c[metric]), 0) for metric in _METRICS)
+        ).where(
+            activities.c.start_date.isnot(None),
+            activities.c.athlete_id.notin_(sa.select(rollups.c.athlete_id).distinct())
+        ).group_by(activities.c.athlete_id, day)
+    )
+    totals = defaultdict(lambda: [0] * (1 + len(_METRICS)))
+    for athlete_id, active_day, count, *sums in rows:
+        if isinstance(active_day, str):
+            active_day = date.fromisoformat(active_day)
+        for period_type, start in _period_starts(active_day):
+            total = totals[(athlete_id, period_type, start)]
+            for index, value in enumerate((count, *sums)):
+                total[index] += value
+
+    now = datetime.utcnow()
+    records = [
+        dict(zip(('activity_count',) + _METRICS, total),
+             athlete_id=athlete_id, period_type=period_type, period_start=start, updated_at=now)
+        for (athlete_id, period_type, start), total in totals.items()
+    ]
+    table = sa.table(
+        'activity_rollups',
+        sa.column('athlete_id', sa.Integer()),
+        sa.column('period_type', sa.String()),
+        sa.column('period_start', sa.Date()),
+        sa.column('activity_count', sa.Integer()),
+        *(sa.column(metric, sa.Float()) for metric in _METRICS),
+        sa.column('updated_at', sa.DateTime())
+    )
+    for offset in range(0, len(records), _BATCH):
+        op.bulk_insert(table, records[offset:offset + _BATCH])
+
+
+def downgrade():
+    op.drop_table('activity_rollups')
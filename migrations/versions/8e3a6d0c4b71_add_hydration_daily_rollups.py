@@ -0,0 +1,47 @@
+"""Add per-user daily hydration rollups
+
+Revision ID: 8e3a6d0c4b71
+Revises: 5c2e8f1b9d46
+Create Date: 2026-10-18 18:55:31.094127
+
+Rollups are backfilled from hydration_logs here; ``flask hydration
+rebuild-rollups`` recomputes them at any time.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e3a6d0c4b71'
+down_revision = '5c2e8f1b9d46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'hydration_daily_rollups' not in tables:
+        op.create_table(
+            'hydration_daily_rollups',
+            sa.Column('user_sk', sa.Integer(), sa.ForeignKey('users.user_sk'), primary_key=True),
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('total_intake', sa.Integer(), nullable=False),
+            sa.Column('log_count', sa.Integer(), nullable=False),
+            sa.Column('first_logged_at', sa.DateTime(), nullable=True),
+            sa.Column('last_logged_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True)
+        )
+    if 'hydration_logs' in tables:
+        op.execute(
+            'INSERT INTO hydration_daily_rollups '
+            '(user_sk, day, total_intake, log_count, first_logged_at, last_logged_at, updated_at) '
+            'SELECT user_sk, date(timestamp), SUM(water_intake), COUNT(id), MIN(timestamp), MAX(timestamp), '
+            'CURRENT_TIMESTAMP FROM hydration_logs WHERE timestamp IS NOT NULL '
+            'AND user_sk NOT IN (SELECT DISTINCT user_sk FROM hydration_daily_rollups) '
+            'GROUP BY user_sk, date(timestamp)'
+        )
+
+
+def downgrade():
+    op.drop_table('hydration_daily_rollups')
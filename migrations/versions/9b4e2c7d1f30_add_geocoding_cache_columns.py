@@ -0,0 +1,75 @@
+"""Add geocoding cache columns and the normalized-address index
+
+Revision ID: 9b4e2c7d1f30
+Revises: 2d7f4b9e1c58
+Create Date: 2026-10-18 19:58:12.507733
+
+Existing rows keep a NULL normalized_address and expires_at: they are
+never served as cache entries and the purge job leaves them alone.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e2c7d1f30'
+down_revision = '2d7f4b9e1c58'
+branch_labels = None
+depends_on = None
+
+
+def _columns():
+    return [
+        sa.Column('normalized_address', sa.String(length=255), nullable=True),
+        sa.Column('formatted_address', sa.String(length=255), nullable=True),
+        sa.Column('place_id', sa.String(length=255), nullable=True),
+        sa.Column('types', sa.JSON(), nullable=True),
+        sa.Column('address_components', sa.JSON(), nullable=True),
+        sa.Column('plus_code', sa.JSON(), nullable=True),
+        sa.Column('viewport', sa.JSON(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+    ]
+
+
+INDEXES = [
+    ('uq_geocoding_results_normalized_address', ['normalized_address'], True),
+    ('ix_geocoding_results_expires_at', ['expires_at'], False),
+]
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'geocoding_results' not in inspector.get_table_names():
+        return
+    existing = {column['name'] for column in inspector.get_columns('geocoding_results')}
+    with op.batch_alter_table('geocoding_results') as batch_op:
+        for column in _columns():
+            if column.name not in existing:
+                batch_op.add_column(column)
+        # Cached results are shared by every user
+        batch_op.alter_column('user_sk', existing_type=sa.Integer(), nullable=True)
+
+    with op.get_context().autocommit_block():
+        for name, columns, unique in INDEXES:
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            op.execute(
+                f'CREATE {"UNIQUE " if unique else ""}INDEX {_concurrently()}IF NOT EXISTS {name} '
+                f'ON geocoding_results ({column_list})'
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX {_concurrently()}IF EXISTS {name}')
+    # Rows cached without a user cannot satisfy NOT NULL again
+    op.execute('DELETE FROM geocoding_results WHERE user_sk IS NULL')
+    with op.batch_alter_table('geocoding_results') as batch_op:
+        batch_op.alter_column('user_sk', existing_type=sa.Integer(), nullable=False)
+        for column in reversed(_columns()):
+            batch_op.drop_column(column.name)
@@ -0,0 +1,57 @@
+"""Add indexes for every per-user lookup path
+
+Revision ID: a3f1c9e2b7d4
+Revises:
+Create Date: 2026-10-18 10:12:41.503318
+
+The schema itself is created with db.create_all() (see reset_db.py), so this
+revision only touches tables that already exist and uses IF NOT EXISTS;
+databases created from the current models already have these indexes.
+On PostgreSQL the indexes are built CONCURRENTLY so live tables stay writable.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c9e2b7d4'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns) matched to the query shapes in routes/
+INDEXES = [
+    # GET /activities keyset pages, date-range filters and export ordering
+    ('ix_activities_athlete_start', 'activities', ['athlete_id', 'start_date', 'activity_id']),
+    # GET /hydration by date and /hydration/summary ranges
+    ('ix_hydration_logs_user_timestamp', 'hydration_logs', ['user_sk', 'timestamp']),
+    # spark-points balance, latest entry and history (ORDER BY timestamp DESC)
+    ('ix_spark_ledger_user_timestamp', 'spark_ledger', ['user_sk', 'timestamp']),
+    ('ix_injury_reports_user_sk', 'injury_reports', ['user_sk']),
+    ('ix_user_supplements_user_sk', 'user_supplements', ['user_sk']),
+    ('ix_user_preferences_user_sk', 'user_preferences', ['user_sk']),
+    ('ix_geocoding_results_user_sk', 'geocoding_results', ['user_sk']),
+]
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def upgrade():
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            if table not in existing_tables:
+                continue
+            column_list = ', '.join(f'"{column}"' for column in columns)
+            op.execute(f'CREATE INDEX {_concurrently()}IF NOT EXISTS {name} ON {table} ({column_list})')
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f'DROP INDEX {_concurrently()}IF EXISTS {name}')
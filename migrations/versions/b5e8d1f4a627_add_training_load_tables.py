@@ -0,0 +1,46 @@
+"""Add cached training load series and per-athlete state
+
+Revision ID: b5e8d1f4a627
+Revises: 7a4c2e9d3f15
+Create Date: 2026-10-18 23:58:42.117930
+
+Nothing to backfill: an athlete without a state row is computed from
+their first activity on the first training-load read.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e8d1f4a627'
+down_revision = '7a4c2e9d3f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'training_load_days' not in tables:
+        op.create_table(
+            'training_load_days',
+            sa.Column('athlete_id', sa.Integer(), sa.ForeignKey('users.user_sk'), primary_key=True),
+            sa.Column('day', sa.Date(), primary_key=True),
+            sa.Column('load', sa.Float(), nullable=False),
+            sa.Column('atl', sa.Float(), nullable=False),
+            sa.Column('ctl', sa.Float(), nullable=False),
+            sa.Column('tsb', sa.Float(), nullable=False)
+        )
+    if 'training_load_state' not in tables:
+        op.create_table(
+            'training_load_state',
+            sa.Column('athlete_id', sa.Integer(), sa.ForeignKey('users.user_sk'), primary_key=True),
+            sa.Column('computed_through', sa.Date(), nullable=True),
+            sa.Column('dirty_from', sa.Date(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True)
+        )
+
+
+def downgrade():
+    op.drop_table('training_load_state')
+    op.drop_table('training_load_days')
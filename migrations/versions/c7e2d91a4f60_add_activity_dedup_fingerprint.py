@@ -0,0 +1,56 @@
+"""Add duplicate-activity fingerprint columns and index
+
+Revision ID: c7e2d91a4f60
+Revises: a3f1c9e2b7d4
+Create Date: 2026-10-18 15:41:09.118204
+
+Existing rows start without a fingerprint; run
+``flask activity find-duplicates --apply`` once after upgrading to key them
+(and flag the duplicates already stored).
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e2d91a4f60'
+down_revision = 'a3f1c9e2b7d4'
+branch_labels = None
+depends_on = None
+
+
+def _concurrently():
+    return 'CONCURRENTLY ' if op.get_bind().dialect.name == 'postgresql' else ''
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'activities' not in inspector.get_table_names():
+        return
+    columns = {column['name'] for column in inspector.get_columns('activities')}
+
+    with op.batch_alter_table('activities') as batch_op:
+        if 'dedup_key' not in columns:
+            batch_op.add_column(sa.Column('dedup_key', sa.String(length=40), nullable=True))
+        if 'duplicate_of' not in columns:
+            batch_op.add_column(sa.Column('duplicate_of', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(
+                'fk_activities_duplicate_of', 'activities',
+                ['duplicate_of'], ['activity_id'], ondelete='SET NULL'
+            )
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            f'CREATE INDEX {_concurrently()}IF NOT EXISTS ix_activities_athlete_dedup '
+            'ON activities ("athlete_id", "dedup_key")'
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute(f'DROP INDEX {_concurrently()}IF EXISTS ix_activities_athlete_dedup')
+    with op.batch_alter_table('activities') as batch_op:
+        batch_op.drop_constraint('fk_activities_duplicate_of', type_='foreignkey')
+        batch_op.drop_column('duplicate_of')
+        batch_op.drop_column('dedup_key')
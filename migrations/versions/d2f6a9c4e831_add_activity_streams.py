@@ -0,0 +1,35 @@
+"""Add encoded per-channel activity streams
+
+Revision ID: d2f6a9c4e831
+Revises: b5e8d1f4a627
+Create Date: 2026-10-19 00:09:27.804415
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2f6a9c4e831'
+down_revision = 'b5e8d1f4a627'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'activity_streams' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'activity_streams',
+        sa.Column('activity_id', sa.Integer(),
+                  sa.ForeignKey('activities.activity_id', ondelete='CASCADE'), primary_key=True),
+        sa.Column('channel', sa.String(length=20), primary_key=True),
+        sa.Column('point_count', sa.Integer(), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True)
+    )
+
+
+def downgrade():
+    op.drop_table('activity_streams')
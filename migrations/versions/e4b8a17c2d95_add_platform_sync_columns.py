@@ -0,0 +1,57 @@
+"""Add platform sync state to user_token and source ids to activities
+
+Revision ID: e4b8a17c2d95
+Revises: c7e2d91a4f60
+Create Date: 2026-10-18 16:02:37.512941
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8a17c2d95'
+down_revision = 'c7e2d91a4f60'
+branch_labels = None
+depends_on = None
+
+TOKEN_COLUMNS = (
+    ('expires_at', sa.DateTime()),
+    ('sync_cursor', sa.DateTime()),
+    ('last_synced_at', sa.DateTime()),
+    ('sync_error', sa.String(length=255)),
+)
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'user_token' in tables:
+        columns = {column['name'] for column in inspector.get_columns('user_token')}
+        with op.batch_alter_table('user_token') as batch_op:
+            for name, type_ in TOKEN_COLUMNS:
+                if name not in columns:
+                    batch_op.add_column(sa.Column(name, type_, nullable=True))
+
+    if 'activities' in tables:
+        columns = {column['name'] for column in inspector.get_columns('activities')}
+        constraints = {constraint['name'] for constraint in inspector.get_unique_constraints('activities')}
+        with op.batch_alter_table('activities') as batch_op:
+            if 'source' not in columns:
+                batch_op.add_column(sa.Column('source', sa.String(length=50), nullable=True))
+            if 'external_id' not in columns:
+                batch_op.add_column(sa.Column('external_id', sa.String(length=100), nullable=True))
+            if 'uq_activities_source_external_id' not in constraints:
+                # Existing rows have NULL source ids, which never conflict
+                batch_op.create_unique_constraint('uq_activities_source_external_id', ['source', 'external_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('activities') as batch_op:
+        batch_op.drop_constraint('uq_activities_source_external_id', type_='unique')
+        batch_op.drop_column('external_id')
+        batch_op.drop_column('source')
+    with op.batch_alter_table('user_token') as batch_op:
+        for name, _ in reversed(TOKEN_COLUMNS):
+            batch_op.drop_column(name)
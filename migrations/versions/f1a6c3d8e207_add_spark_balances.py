@@ -0,0 +1,43 @@
+"""Add maintained per-user spark-point balances
+
+Revision ID: f1a6c3d8e207
+Revises: e4b8a17c2d95
+Create Date: 2026-10-18 16:48:12.730514
+
+Balances are backfilled from spark_ledger here. Awards made while the
+upgrade runs are caught by ``flask spark_points reconcile-balances --fix``.
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1a6c3d8e207'
+down_revision = 'e4b8a17c2d95'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'spark_balances' not in tables:
+        op.create_table(
+            'spark_balances',
+            sa.Column('user_sk', sa.Integer(), sa.ForeignKey('users.user_sk'), primary_key=True),
+            sa.Column('total', sa.Integer(), nullable=False),
+            sa.Column('last_updated', sa.DateTime(), nullable=True),
+            sa.Column('last_ledger_id', sa.Integer(), nullable=True)
+        )
+    if 'spark_ledger' in tables:
+        op.execute(
+            'INSERT INTO spark_balances (user_sk, total, last_updated, last_ledger_id) '
+            'SELECT user_sk, SUM(points), MAX(timestamp), MAX(id) FROM spark_ledger '
+            'WHERE user_sk NOT IN (SELECT user_sk FROM spark_balances) '
+            'GROUP BY user_sk'
+        )
+
+
+def downgrade():
+    op.drop_table('spark_balances')
@@ -1,7 +1,11 @@
 from .user import User, UserToken, Photo
 from .activity import Activity
+from .activity_rollup import ActivityRollup
+from .activity_stream import ActivityStream
+from .training_load import TrainingLoadDay, TrainingLoadState
+from .spark_points import SparkLedger, SparkBalance
 from .injuries import Injuries, InjuryReport
-from .hydration import HydrationLog
+from .hydration import HydrationLog, HydrationDailyRollup
 from .user_preferences import UserPreferences
 from .supplements import Supplement
 from .shoe_type import ShoeType
@@ -11,9 +15,16 @@ __all__ = [
     'UserToken',
     'Photo',
     'Activity',
+    'ActivityRollup',
+    'ActivityStream',
+    'TrainingLoadDay',
+    'TrainingLoadState',
+    'SparkLedger',
+    'SparkBalance',
     'Injuries',
     'InjuryReport',
     'HydrationLog',
+    'HydrationDailyRollup',
     'UserPreferences',
     'Supplement',
     'ShoeType'
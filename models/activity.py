@@ -16,11 +16,27 @@ class Activity(db.Model):
     start_date = db.Column(db.DateTime, default=date.today)
     description = db.Column(db.Text)
     calories = db.Column(db.Float, default=0.0)
+    # Platform the activity was synced from and its id there
+    source = db.Column(db.String(50))
+    external_id = db.Column(db.String(100))
+    # Bucketed (start_date, distance, moving_time); see activity_dedup_controller
+    dedup_key = db.Column(db.String(40))
+    duplicate_of = db.Column(db.Integer, db.ForeignKey('activities.activity_id', ondelete='SET NULL'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    __table_args__ = (
+        # Keyset pagination and date-range filters on GET /activities
+        db.Index('ix_activities_athlete_start', 'athlete_id', 'start_date', 'activity_id'),
+        # Duplicate lookups on every insert
+        db.Index('ix_activities_athlete_dedup', 'athlete_id', 'dedup_key'),
+        # Idempotent upserts from platform sync
+        db.UniqueConstraint('source', 'external_id', name='uq_activities_source_external_id'),
+    )
+
     # Update relationship with unique backref
     user = db.relationship('models.user.User', backref='activities_rel', lazy=True)
+    streams = db.relationship('ActivityStream', backref='activity', lazy=True, cascade='all, delete-orphan')
 
     def to_dict(self):
         return {
@@ -35,6 +51,9 @@ class Activity(db.Model):
             'start_date': self.start_date,
             'description': self.description,
             'calories': self.calories,
+            'source': self.source,
+            'external_id': self.external_id,
+            'duplicate_of': self.duplicate_of,
             'created_at': self.created_at,
             'updated_at': self.updated_at
         }
\ No newline at end of file
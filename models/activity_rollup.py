@@ -0,0 +1,28 @@
+from datetime import datetime
+from extensions import db
+
+class ActivityRollup(db.Model):
+    """Per-athlete activity totals for one week (Monday start) or calendar month"""
+    __tablename__ = 'activity_rollups'
+    __module__ = 'models.activity_rollup'
+
+    athlete_id = db.Column(db.Integer, db.ForeignKey('users.user_sk'), primary_key=True)
+    period_type = db.Column(db.String(10), primary_key=True)  # 'week' or 'month'
+    period_start = db.Column(db.Date, primary_key=True)
+    activity_count = db.Column(db.Integer, nullable=False, default=0)
+    distance = db.Column(db.Float, nullable=False, default=0.0)
+    moving_time = db.Column(db.Integer, nullable=False, default=0)
+    total_elevation_gain = db.Column(db.Float, nullable=False, default=0.0)
+    calories = db.Column(db.Float, nullable=False, default=0.0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'period_type': self.period_type,
+            'period_start': self.period_start.isoformat() if self.period_start else None,
+            'activity_count': self.activity_count,
+            'distance': self.distance,
+            'moving_time': self.moving_time,
+            'total_elevation_gain': self.total_elevation_gain,
+            'calories': self.calories
+        }
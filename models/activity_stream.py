@@ -0,0 +1,14 @@
+from datetime import datetime
+from extensions import db
+
+class ActivityStream(db.Model):
+    """One sample channel of an activity, stored as a single encoded blob (see utils/streams.py)"""
+    __tablename__ = 'activity_streams'
+    __module__ = 'models.activity_stream'
+
+    activity_id = db.Column(db.Integer, db.ForeignKey('activities.activity_id', ondelete='CASCADE'), primary_key=True)
+    channel = db.Column(db.String(20), primary_key=True)  # time, lat, lng, altitude, heartrate, cadence, distance
+    point_count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -6,11 +6,32 @@ class GeocodingResult(db.Model):
     __module__ = 'models.geocoding'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False)
+    # Geocoding is shared across users; user_sk is only kept for legacy rows
+    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=True, index=True)
     address = db.Column(db.String(255), nullable=False)
+    # Cache key: see utils.geocoding_providers.normalize_address
+    normalized_address = db.Column(db.String(255), nullable=True)
+    formatted_address = db.Column(db.String(255), nullable=True)
     latitude = db.Column(db.Float, nullable=False)
     longitude = db.Column(db.Float, nullable=False)
+    # 52-bit integer geohash of (latitude, longitude), see utils.geo
+    geocell = db.Column(db.BigInteger, nullable=True)
+    place_id = db.Column(db.String(255), nullable=True)
+    types = db.Column(db.JSON, nullable=True)
+    address_components = db.Column(db.JSON, nullable=True)
+    plus_code = db.Column(db.JSON, nullable=True)
+    viewport = db.Column(db.JSON, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('uq_geocoding_results_normalized_address', 'normalized_address', unique=True),
+        # Purge job range scan
+        db.Index('ix_geocoding_results_expires_at', 'expires_at'),
+        # Nearest / radius queries scan a few geocell ranges; covering, so
+        # candidates are filtered without touching the table
+        db.Index('ix_geocoding_results_geocell', 'geocell', 'latitude', 'longitude', 'id'),
+    )
     
     # Define relationship with unique backref
     user = db.relationship('models.user.User', backref='geocoding_results_rel', lazy=True)
@@ -27,6 +48,7 @@ class GeocodingResult(db.Model):
             'plus_code': self.plus_code,
             'viewport': self.viewport,
             'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None,
             'user': {
                 'username': self.user.username,
                 'email': self.user.email
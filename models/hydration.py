@@ -8,6 +8,14 @@ class HydrationLog(db.Model):
     user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False)
     water_intake = db.Column(db.Integer, nullable=False)  # Changed from quantity to water_intake
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set by offline clients so a replayed sync cannot log the same entry twice
+    client_uuid = db.Column(db.String(36), nullable=True)
+
+    __table_args__ = (
+        # Per-user date / date-range lookups
+        db.Index('ix_hydration_logs_user_timestamp', 'user_sk', 'timestamp'),
+        db.Index('uq_hydration_logs_user_client_uuid', 'user_sk', 'client_uuid', unique=True),
+    )
     
     # Add relationship with User
     user = db.relationship('User', backref='hydration_logs')
@@ -17,5 +25,28 @@ class HydrationLog(db.Model):
             'id': self.id,
             'user_sk': self.user_sk,
             'water_intake': self.water_intake,
+            'client_uuid': self.client_uuid,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
-        }
\ No newline at end of file
+        }
+
+
+class HydrationDailyRollup(db.Model):
+    """Per-user totals for one UTC day, maintained with every HydrationLog write"""
+    __tablename__ = 'hydration_daily_rollups'
+
+    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    total_intake = db.Column(db.Integer, nullable=False, default=0)
+    log_count = db.Column(db.Integer, nullable=False, default=0)
+    first_logged_at = db.Column(db.DateTime, nullable=True)
+    last_logged_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'date': self.day.isoformat() if self.day else None,
+            'total_intake': self.total_intake,
+            'log_count': self.log_count,
+            'first_logged_at': self.first_logged_at.isoformat() if self.first_logged_at else None,
+            'last_logged_at': self.last_logged_at.isoformat() if self.last_logged_at else None
+        }
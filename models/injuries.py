@@ -28,7 +28,7 @@ class InjuryReport(db.Model):
     __module__ = 'models.injuries'
     
     id = db.Column(db.Integer, primary_key=True)
-    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False)
+    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False, index=True)
     injury_id = db.Column(db.Integer, db.ForeignKey('injuries.id'))
     injury_location = db.Column(db.String(100))
     injury_type = db.Column(db.String(100), nullable=False)
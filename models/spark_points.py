@@ -10,6 +10,16 @@ class SparkLedger(db.Model):
     points = db.Column(db.Integer, nullable=False)
     activity_type = db.Column(db.String(50), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Caller-chosen key that makes retried awards no-ops (unique per user)
+    idempotency_key = db.Column(db.String(100), nullable=True)
+
+    __table_args__ = (
+        # Balance, latest entry and history are all per user, newest first
+        db.Index('ix_spark_ledger_user_timestamp', 'user_sk', 'timestamp'),
+        # The weekly leaderboard sums everything since Monday
+        db.Index('ix_spark_ledger_timestamp', 'timestamp'),
+        db.Index('uq_spark_ledger_user_idempotency', 'user_sk', 'idempotency_key', unique=True),
+    )
     
     # Define relationship with unique backref
     user = db.relationship('models.user.User', backref='spark_points_rel', lazy=True)
@@ -20,5 +30,28 @@ class SparkLedger(db.Model):
             'user_sk': self.user_sk,
             'points': self.points,
             'activity_type': self.activity_type,
+            'idempotency_key': self.idempotency_key,
             'timestamp': self.timestamp.isoformat() if self.timestamp else None
-        }
\ No newline at end of file
+        }
+
+
+class SparkBalance(db.Model):
+    """Running spark-point total per user, maintained with every ledger insert.
+
+    ``last_ledger_id`` is the highest ledger id folded into ``total``, so the
+    reconcile job can spot ledger rows that never reached the total.
+    """
+    __tablename__ = 'spark_balances'
+    __module__ = 'models.spark_points'
+
+    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), primary_key=True)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    last_updated = db.Column(db.DateTime, nullable=True)  # newest ledger timestamp
+    last_ledger_id = db.Column(db.Integer, nullable=True)
+
+    def to_dict(self):
+        return {
+            'user_sk': self.user_sk,
+            'total_spark_points': self.total,
+            'last_updated': self.last_updated.isoformat() if self.last_updated else None
+        }
@@ -29,15 +29,23 @@ class SupplementPhoto(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     supplement_id = db.Column(db.Integer, db.ForeignKey('supplements.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
-    photo_data = db.Column(db.LargeBinary, nullable=False)
+    # Bytes live in the blob store; see models.user.Photo
+    photo_data = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    blob_sha256 = db.Column(db.String(64), nullable=True)
+    size_bytes = db.Column(db.Integer, nullable=True)
+    mime_type = db.Column(db.String(100), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_supplement_photos_blob_sha256', 'blob_sha256'),
+    )
+
 class UserSupplement(db.Model):
     __tablename__ = 'user_supplements'
     __module__ = 'models.supplements'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False)
+    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False, index=True)
     supplement_id = db.Column(db.Integer, db.ForeignKey('supplements.id'), nullable=False)
     dosage = db.Column(db.String(50))
     frequency = db.Column(db.String(50))
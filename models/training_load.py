@@ -0,0 +1,33 @@
+from datetime import datetime
+from extensions import db
+
+class TrainingLoadDay(db.Model):
+    """Cached daily training load with its acute/chronic averages and balance"""
+    __tablename__ = 'training_load_days'
+    __module__ = 'models.training_load'
+
+    athlete_id = db.Column(db.Integer, db.ForeignKey('users.user_sk'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    load = db.Column(db.Float, nullable=False, default=0.0)
+    atl = db.Column(db.Float, nullable=False, default=0.0)  # acute training load (fatigue)
+    ctl = db.Column(db.Float, nullable=False, default=0.0)  # chronic training load (fitness)
+    tsb = db.Column(db.Float, nullable=False, default=0.0)  # training stress balance (form)
+
+    def to_dict(self):
+        return {
+            'date': self.day.isoformat() if self.day else None,
+            'load': round(self.load, 2),
+            'atl': round(self.atl, 2),
+            'ctl': round(self.ctl, 2),
+            'tsb': round(self.tsb, 2)
+        }
+
+class TrainingLoadState(db.Model):
+    """How far an athlete's cached series is valid; activity writes move dirty_from back"""
+    __tablename__ = 'training_load_state'
+    __module__ = 'models.training_load'
+
+    athlete_id = db.Column(db.Integer, db.ForeignKey('users.user_sk'), primary_key=True)
+    computed_through = db.Column(db.Date, nullable=True)
+    dirty_from = db.Column(db.Date, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -17,10 +17,15 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     reset_token = db.Column(db.String(100), unique=True, nullable=True)
     reset_token_expires = db.Column(db.DateTime, nullable=True)
+    partner = db.Column(db.String(100), nullable=True)  # partner program the user joined through
     # Update relationships to use back_populates
     preferences = db.relationship('UserPreferences', back_populates='user', uselist=False)
     injuries = db.relationship('InjuryReport', back_populates='user')
 
+    __table_args__ = (
+        # Partner leaderboards load their members by partner
+        db.Index('ix_users_partner', 'partner'),
+    )
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -33,6 +38,7 @@ class User(db.Model):
             'user_sk': self.user_sk,
             'username': self.username,
             'email': self.email,
+            'partner': self.partner,
             'created_at': self.created_at.isoformat() if self.created_at else None,
             'updated_at': self.updated_at.isoformat() if self.updated_at else None,
             'preferences': self.preferences.to_dict() if self.preferences else None
@@ -46,6 +52,11 @@ class UserToken(db.Model):
     access_token = db.Column(db.String(255), nullable=False)
     access_token_secret = db.Column(db.String(255), nullable=False)
     refresh_token = db.Column(db.String(255))
+    # Activity sync state (see controllers/platform_sync_controller.py)
+    expires_at = db.Column(db.DateTime, nullable=True)
+    sync_cursor = db.Column(db.DateTime, nullable=True)  # start_date high-water mark
+    last_synced_at = db.Column(db.DateTime, nullable=True)
+    sync_error = db.Column(db.String(255), nullable=True)
 
 class UserInfo(db.Model):
     __tablename__ = 'user_info'
@@ -72,4 +83,23 @@ class Photo(db.Model):
     pid = db.Column(db.Integer, primary_key=True, autoincrement=True)
     user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
-    photo_data = db.Column(db.LargeBinary, nullable=False)
\ No newline at end of file
+    # Bytes live in the blob store under their SHA-256 (see utils.blob_store);
+    # photo_data only holds rows not yet moved by `flask photos migrate-blobs`
+    photo_data = db.deferred(db.Column(db.LargeBinary, nullable=True))
+    blob_sha256 = db.Column(db.String(64), nullable=True)
+    size_bytes = db.Column(db.Integer, nullable=True)
+    mime_type = db.Column(db.String(100), nullable=True)
+
+    __table_args__ = (
+        # Reference checks when collecting unreferenced blobs
+        db.Index('ix_photos_blob_sha256', 'blob_sha256'),
+    )
+
+    def to_dict(self):
+        return {
+            'pid': self.pid,
+            'filename': self.filename,
+            'mime_type': self.mime_type,
+            'size_bytes': self.size_bytes,
+            'sha256': self.blob_sha256
+        }
\ No newline at end of file
@@ -13,7 +13,7 @@ class UserPreferences(db.Model):
     __tablename__ = 'user_preferences'
 
     id = db.Column(db.Integer, primary_key=True)
-    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False)
+    user_sk = db.Column(db.Integer, db.ForeignKey('users.user_sk'), nullable=False, index=True)
     shoe_type_id = db.Column(db.Integer, db.ForeignKey('shoe_type.id'))
     injuries_id = db.Column(db.Integer, db.ForeignKey('injuries.id'))
     running_surface = db.Column(db.String(100), nullable=False)
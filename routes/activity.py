@@ -1,18 +1,127 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context
 from models.activity import Activity
 from extensions import db
+from sqlalchemy import update
 from middleware.auth import token_required
+from utils.pagination import keyset_page, parse_limit
+from controllers.activity_ingest_controller import ingest_activities, parse_start_date
+from controllers.activity_export_controller import export_ndjson, export_csv
+from controllers.activity_stream_controller import save_streams, get_streams
+from controllers.activity_rollup_controller import (
+    activity_snapshot, apply_rollup_changes, rebuild_rollups, get_rollups, METRICS, PERIOD_TYPES
+)
+from controllers.training_load_controller import get_training_load, mark_training_load_dirty
+from controllers.activity_dedup_controller import (
+    dedup_policy, fingerprint, match_existing, merge_into, scan_duplicates
+)
+from controllers.platform_sync_controller import sync_tokens
+from models.user import UserToken
+from config import Config
+from datetime import datetime, date, timedelta
+import click
 
 bp = Blueprint('activity', __name__)
 
+def _parse_datetime_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or datetime")
+
+def _parse_float_arg(name):
+    value = request.args.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be numeric")
+
+def _coerce_metrics(data):
+    """Convert the rollup metrics in a request body to numbers in place; raises ValueError"""
+    for metric in METRICS:
+        value = data.get(metric)
+        if value is None:
+            continue
+        try:
+            if isinstance(value, bool):
+                raise ValueError
+            number = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"{metric} must be numeric")
+        if Activity.__table__.c[metric].type.python_type is int:
+            if number != int(number):
+                raise ValueError(f"{metric} must be an integer")
+            number = int(number)
+        data[metric] = number
+    return data
+
+def activity_filters(athlete_id):
+    """WHERE clauses for the type / date range / distance range query args"""
+    filters = [Activity.athlete_id == athlete_id]
+
+    activity_types = request.args.get('type')
+    if activity_types:
+        filters.append(Activity.type.in_(activity_types.split(',')))
+
+    start_from = _parse_datetime_arg('start_date_from')
+    start_to = _parse_datetime_arg('start_date_to')
+    if start_from:
+        filters.append(Activity.start_date >= start_from)
+    if start_to:
+        filters.append(Activity.start_date <= start_to)
+
+    min_distance = _parse_float_arg('min_distance')
+    max_distance = _parse_float_arg('max_distance')
+    if min_distance is not None:
+        filters.append(Activity.distance >= min_distance)
+    if max_distance is not None:
+        filters.append(Activity.distance <= max_distance)
+
+    return filters
+
+def list_activities(athlete_id):
+    """One keyset page of an athlete's activities, newest first.
+
+    Pages are ordered by (start_date, activity_id) so each page is an index
+    range scan on ix_activities_athlete_start, however deep the cursor is.
+    Activities without a start_date come last, newest id first.
+    """
+    limit = parse_limit(request.args.get('limit'))
+    query = Activity.query.filter(*activity_filters(athlete_id))
+    rows, next_cursor = keyset_page(
+        query, Activity.start_date, Activity.activity_id, limit, request.args.get('cursor')
+    )
+    return {
+        'activities': [activity.to_dict() for activity in rows],
+        'next_cursor': next_cursor
+    }
+
 @bp.route('/activities', methods=['GET', 'POST'])
 @token_required
 def handle_activities(current_user):
     if request.method == 'GET':
-        activities = Activity.query.filter_by(athlete_id=current_user.user_sk).all()
-        return jsonify([activity.to_dict() for activity in activities])
+        try:
+            return jsonify(list_activities(current_user.user_sk))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    try:
+        policy = dedup_policy(request.args.get('on_duplicate'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
     data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    try:
+        _coerce_metrics(data)
+        start_date = parse_start_date(data.get('start_date'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     activity = Activity(
         athlete_id=current_user.user_sk,
         name=data.get('name'),
@@ -21,13 +130,81 @@ def handle_activities(current_user):
         elapsed_time=data.get('elapsed_time'),
         total_elevation_gain=data.get('total_elevation_gain'),
         type=data.get('type'),
+        start_date=start_date or date.today(),  # the column default when the client sends none
         description=data.get('description'),
         calories=data.get('calories')
     )
+
+    # A defaulted start says nothing about when the activity happened, so
+    # such an activity is neither checked for duplicates nor fingerprinted
+    original_id = None
+    if policy and start_date is not None:
+        original_id = match_existing(current_user.user_sk, [activity])[0]
+    if original_id is not None and policy == 'reject':
+        return jsonify({'error': 'Duplicate activity', 'duplicate_of': original_id}), 409
+    if original_id is not None and policy == 'merge':
+        original = db.session.get(Activity, original_id)
+        before = activity_snapshot(original)
+        merge_into(original, activity)
+        original.dedup_key = fingerprint(original)
+        db.session.flush()
+        apply_rollup_changes(current_user.user_sk, removed=[before], added=[original])
+        mark_training_load_dirty(current_user.user_sk, [before], [original])
+        db.session.commit()
+        return jsonify(dict(original.to_dict(), merged=True)), 200
+
+    activity.duplicate_of = original_id
+    activity.dedup_key = fingerprint(activity) if start_date is not None else None
     db.session.add(activity)
+    db.session.flush()
+    apply_rollup_changes(current_user.user_sk, added=[activity])
+    mark_training_load_dirty(current_user.user_sk, [activity])
     db.session.commit()
     return jsonify(activity.to_dict()), 201
 
+@bp.route('/activities/bulk', methods=['POST'])
+@token_required
+def bulk_ingest_activities(current_user):
+    """Stream an NDJSON body of activities (one JSON object per line) into the database."""
+    chunk_size = request.args.get('chunk_size', Config.ACTIVITY_INGEST_CHUNK_SIZE, type=int)
+    if chunk_size < 1:
+        return jsonify({'error': 'chunk_size must be positive'}), 400
+    chunk_size = min(chunk_size, Config.ACTIVITY_INGEST_MAX_CHUNK_SIZE)
+    try:
+        policy = dedup_policy(request.args.get('on_duplicate'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    result = ingest_activities(
+        request.stream, current_user.user_sk, chunk_size=chunk_size, on_duplicate=policy
+    )
+    status = 201 if result['accepted'] or result['merged'] else 400
+    return jsonify(result), status
+
+@bp.route('/activities/export', methods=['GET'])
+@token_required
+def export_activities(current_user):
+    """Stream the athlete's full activity history as NDJSON (default) or CSV.
+
+    Accepts the same type / date range / distance range filters as GET /activities.
+    """
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format must be ndjson or csv'}), 400
+    try:
+        filters = activity_filters(current_user.user_sk)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if fmt == 'csv':
+        body, mimetype = export_csv(filters), 'text/csv'
+    else:
+        body, mimetype = export_ndjson(filters), 'application/x-ndjson'
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=activities.{fmt}'
+    return response
+
 @bp.route('/activities/<int:activity_id>', methods=['GET', 'PUT', 'DELETE'])
 @token_required
 def handle_activity(current_user, activity_id):
@@ -43,69 +220,182 @@ def handle_activity(current_user, activity_id):
         return jsonify(activity.to_dict())
 
     elif request.method == 'PUT':
+        try:
+            policy = dedup_policy(request.args.get('on_duplicate'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
         data = request.get_json()
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        try:
+            _coerce_metrics(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        before = activity_snapshot(activity)
         for key, value in data.items():
             if hasattr(activity, key):
                 setattr(activity, key, value)
+
+        # An edit cannot be merged away, so 'merge' flags like 'flag' here
+        if policy:
+            original_id = match_existing(
+                current_user.user_sk, [activity], exclude_ids=[activity.activity_id]
+            )[0]
+            if original_id is not None and policy == 'reject':
+                db.session.rollback()
+                return jsonify({'error': 'Update would duplicate another activity',
+                                'duplicate_of': original_id}), 409
+            activity.duplicate_of = original_id
+        activity.dedup_key = fingerprint(activity)
+        db.session.flush()
+        apply_rollup_changes(current_user.user_sk, removed=[before], added=[activity])
+        mark_training_load_dirty(current_user.user_sk, [before], [activity])
         db.session.commit()
         return jsonify(activity.to_dict())
 
     elif request.method == 'DELETE':
+        apply_rollup_changes(current_user.user_sk, removed=[activity])
+        mark_training_load_dirty(current_user.user_sk, [activity])
         db.session.delete(activity)
         db.session.commit()
         return '', 204
 
+@bp.route('/activities/<int:activity_id>/streams', methods=['GET', 'PUT'])
+@token_required
+def handle_activity_streams(current_user, activity_id):
+    activity = Activity.query.filter_by(
+        activity_id=activity_id,
+        athlete_id=current_user.user_sk
+    ).first()
+
+    if not activity:
+        return jsonify({'error': 'Activity not found'}), 404
+
+    if request.method == 'PUT':
+        result, status_code = save_streams(activity_id, request.get_json())
+        return jsonify(result), status_code
+
+    max_points = request.args.get('points', type=int)
+    if max_points is not None and max_points < 2:
+        return jsonify({'error': 'points must be at least 2'}), 400
+    channels = request.args.get('channels')
+    result, status_code = get_streams(
+        activity_id,
+        channels=channels.split(',') if channels else None,
+        max_points=max_points
+    )
+    return jsonify(result), status_code
+
+# Fields a client may change through PUT /activities/update
+BULK_UPDATE_FIELDS = {
+    'name', 'distance', 'moving_time', 'elapsed_time',
+    'total_elevation_gain', 'type', 'description', 'calories'
+}
+
 @bp.route('/activities/update', methods=['PUT'])
 @token_required
 def update_activities(current_user):
+    """Apply a batch of partial activity updates.
+
+    Ownership is checked for the whole payload with one IN query and the
+    changes are written with a single executemany UPDATE keyed by primary
+    key, instead of a SELECT + flush per element. The new values are checked
+    for duplicates with one fingerprint lookup; 'merge' flags like 'flag'.
+    """
+    try:
+        policy = dedup_policy(request.args.get('on_duplicate'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
     try:
         data = request.get_json()
         if not isinstance(data, list):
             return jsonify({'error': 'Expected an array of activities'}), 400
 
-        updated_activities = []
         errors = []
-
+        requested = []
         for item in data:
-            activity_id = item.get('activity_id')
+            activity_id = item.get('activity_id') if isinstance(item, dict) else None
             if not activity_id:
                 errors.append({'error': 'activity_id is required', 'data': item})
                 continue
+            try:
+                requested.append((int(activity_id), item))
+            except (TypeError, ValueError):
+                errors.append({'error': f'Invalid activity_id {activity_id}', 'data': item})
 
-            activity = Activity.query.filter_by(
-                activity_id=activity_id,
-                athlete_id=current_user.user_sk
-            ).first()
+        owned = {}
+        if requested:
+            rows = Activity.query.filter(
+                Activity.athlete_id == current_user.user_sk,
+                Activity.activity_id.in_({activity_id for activity_id, _ in requested})
+            ).all()
+            owned = {activity.activity_id: activity.to_dict() for activity in rows}
 
-            if not activity:
+        # Later elements win when the same activity appears more than once
+        changes = {}
+        updated_ids = []
+        for activity_id, item in requested:
+            if activity_id not in owned:
                 errors.append({'error': f'Activity {activity_id} not found', 'data': item})
                 continue
+            fields = {key: value for key, value in item.items() if key in BULK_UPDATE_FIELDS}
+            try:
+                _coerce_metrics(fields)
+            except ValueError as e:
+                errors.append({'error': str(e), 'data': item})
+                continue
+            if fields:
+                changes.setdefault(activity_id, {}).update(fields)
+            updated_ids.append(activity_id)
 
-            # Define allowed fields
-            allowed_fields = {
-                'name', 'distance', 'moving_time', 'elapsed_time',
-                'total_elevation_gain', 'type', 'description', 'calories'
-            }
-
-            # Update fields
-            for key, value in item.items():
-                if key in allowed_fields and hasattr(activity, key):
-                    setattr(activity, key, value)
-            
-            updated_activities.append(activity)
+        if changes and policy:
+            changed_ids = list(changes)
+            originals = match_existing(
+                current_user.user_sk,
+                [dict(owned[activity_id], **changes[activity_id]) for activity_id in changed_ids],
+                exclude_ids=changed_ids
+            )
+            for activity_id, original_id in zip(changed_ids, originals):
+                if original_id is not None and policy == 'reject':
+                    errors.append({
+                        'error': f'Activity {activity_id} would duplicate activity {original_id}',
+                        'data': dict(changes.pop(activity_id), activity_id=activity_id)
+                    })
+                    updated_ids = [updated for updated in updated_ids if updated != activity_id]
+                else:
+                    changes[activity_id]['duplicate_of'] = original_id
 
-        if updated_activities:
+        if changes:
+            now = datetime.utcnow()
+            before = [activity_snapshot(owned[activity_id]) for activity_id in changes]
+            for activity_id, fields in changes.items():
+                owned[activity_id].update(fields, updated_at=now)
+                fields['dedup_key'] = fingerprint(owned[activity_id])
+            db.session.execute(update(Activity), [
+                dict(fields, activity_id=activity_id, updated_at=now)
+                for activity_id, fields in changes.items()
+            ])
+            apply_rollup_changes(
+                current_user.user_sk,
+                removed=before,
+                added=[owned[activity_id] for activity_id in changes]
+            )
+            mark_training_load_dirty(
+                current_user.user_sk, before, [owned[activity_id] for activity_id in changes]
+            )
             db.session.commit()
 
         response = {
-            'updated': [activity.to_dict() for activity in updated_activities],
-            'total_updated': len(updated_activities)
+            'updated': [owned[activity_id] for activity_id in updated_ids],
+            'total_updated': len(updated_ids)
         }
         
         if errors:
             response['errors'] = errors
 
-        return jsonify(response), 200 if updated_activities else 400
+        return jsonify(response), 200 if updated_ids else 400
 
     except Exception as e:
         db.session.rollback()
@@ -114,5 +404,93 @@ def update_activities(current_user):
             'details': str(e)
         }), 500
 
+@bp.route('/activities/stats', methods=['GET'])
+@token_required
+def activity_stats(current_user):
+    """Weekly or monthly totals, served from the rollup table only."""
+    period = request.args.get('period', 'week')
+    if period not in PERIOD_TYPES:
+        return jsonify({'error': 'period must be week or month'}), 400
+    try:
+        start = _parse_datetime_arg('from')
+        end = _parse_datetime_arg('to')
+        limit = parse_limit(request.args.get('limit'), default=12, maximum=520)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return jsonify({
+        'period': period,
+        'rollups': get_rollups(
+            current_user.user_sk,
+            period,
+            start=start.date() if start else None,
+            end=end.date() if end else None,
+            limit=limit
+        )
+    })
+
+@bp.route('/activities/training-load', methods=['GET'])
+@token_required
+def training_load(current_user):
+    """Daily load with acute (ATL), chronic (CTL) training load and balance (TSB).
+
+    Defaults to the last 90 days; the series is cached per athlete and only
+    recomputed from the earliest activity date changed since the last read.
+    """
+    try:
+        end = _parse_datetime_arg('to')
+        start = _parse_datetime_arg('from')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    end = end.date() if end else datetime.utcnow().date()
+    start = start.date() if start else end - timedelta(days=89)
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+
+    return jsonify({
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'series': get_training_load(current_user.user_sk, start, end)
+    })
+
+@bp.cli.command('find-duplicates')
+@click.option('--athlete-id', type=int, help='Only scan this athlete (default: everyone)')
+@click.option('--apply', is_flag=True, help='Flag duplicates and (re)write fingerprints instead of only counting')
+def find_duplicates_command(athlete_id, apply):
+    """Scan stored activities for duplicates, one athlete at a time."""
+    totals = scan_duplicates(athlete_id, apply=apply)
+    click.echo(
+        f"Scanned {totals['scanned']} activities of {totals['athletes']} athletes: "
+        f"{totals['duplicates']} new duplicates, {totals['updated']} rows updated"
+    )
+
+@bp.cli.command('sync')
+@click.option('--platform', help='Only tokens of this platform')
+@click.option('--user-sk', type=int, help='Only this user\'s tokens')
+@click.option('--workers', type=int, help='Concurrent fetch threads (default: SYNC_WORKERS)')
+@click.option('--batch-size', type=int, help='Activities per upsert transaction (default: SYNC_BATCH_SIZE)')
+def sync_command(platform, user_sk, workers, batch_size):
+    """Pull new activities for every connected platform account."""
+    query = UserToken.query
+    if platform:
+        query = query.filter(db.func.lower(UserToken.platform) == platform.lower())
+    if user_sk:
+        query = query.filter(UserToken.user_sk == user_sk)
+    totals = sync_tokens(query, workers=workers, batch_size=batch_size)
+    click.echo(
+        f"{totals['tokens']} tokens: {totals['synced']} synced, {totals['failed']} failed, "
+        f"{totals['unsupported']} unsupported, {totals['refreshed']} refreshed; "
+        f"{totals['fetched']} activities fetched, {totals['inserted']} new, {totals['flagged']} flagged as duplicates"
+    )
+    for error in totals['write_errors']:
+        click.echo(f'Write failed: {error}', err=True)
+
+@bp.cli.command('rebuild-rollups')
+@click.option('--athlete-id', type=int, help='Only rebuild this athlete (default: everyone)')
+def rebuild_rollups_command(athlete_id):
+    """Recompute weekly/monthly activity rollups from the activities table."""
+    written = rebuild_rollups(athlete_id)
+    click.echo(f'Rebuilt {written} rollup rows')
+
 def init_app(app):
     app.register_blueprint(bp)
\ No newline at end of file
@@ -4,12 +4,16 @@ from extensions import db
 import jwt
 from datetime import datetime, timedelta
 import secrets
-from config import Config
-from google.oauth2 import id_token
-from google.auth.transport import requests
+from utils.google_token_verifier import google_verifier
+from utils.password_hashing import hash_password, verify_password, HashingPoolBusy
 
 bp = Blueprint('auth', __name__)
 
+def hashing_busy_response():
+    response = jsonify({'error': 'Server is busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @bp.route('/auth/google', methods=['POST'])
 def google_auth():
     data = request.get_json()
@@ -17,11 +21,7 @@ def google_auth():
     
     try:
         # Verify the token
-        idinfo = id_token.verify_oauth2_token(
-            token, 
-            requests.Request(), 
-            Config.GOOGLE_CLIENT_ID
-        )
+        idinfo = google_verifier.verify(token)
 
         # Get user info from token
         email = idinfo['email']
@@ -68,8 +68,11 @@ def login():
     if not user:
         return jsonify({'error': 'Invalid credentials'}), 401
         
-    if not user.check_password(data['password']):
-        return jsonify({'error': 'Invalid credentials'}), 401
+    try:
+        if not verify_password(user.password_hash, data['password']):
+            return jsonify({'error': 'Invalid credentials'}), 401
+    except HashingPoolBusy:
+        return hashing_busy_response()
 
     token = jwt.encode({
         'user_sk': user.user_sk,
@@ -101,11 +104,14 @@ def register():
         user = User()
         user.username = data.get('username')
         user.email = data.get('email')
-        user.set_password(data.get('password'))
+        user.password_hash = hash_password(data.get('password'))
         
         db.session.add(user)
         db.session.commit()
         return jsonify({'message': 'User registered successfully'})
+    except HashingPoolBusy:
+        db.session.rollback()
+        return hashing_busy_response()
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 400
@@ -150,7 +156,10 @@ def reset_password():
     if not user or not user.reset_token_expires or user.reset_token_expires < datetime.utcnow():
         return jsonify({'error': 'Invalid or expired reset token'}), 400
     
-    user.set_password(new_password)
+    try:
+        user.password_hash = hash_password(new_password)
+    except HashingPoolBusy:
+        return hashing_busy_response()
     user.reset_token = None
     user.reset_token_expires = None
     
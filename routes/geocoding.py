@@ -1,16 +1,52 @@
 from flask import Blueprint, request, jsonify
 from controllers import geocoding_controller
 from middleware.auth_middleware import login_required
+from utils.geocoding_providers import address_key
+from utils.pagination import parse_limit
+from config import Config
+import click
 
 bp = Blueprint('geocoding', __name__)
 
+def _parse_point():
+    """(lat, lng) from the query string; raises ValueError when missing or out of range"""
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    if lat is None or lng is None:
+        raise ValueError("lat and lng are required numbers")
+    if not -90 <= lat <= 90 or not -180 <= lng <= 180:
+        raise ValueError("lat must be within [-90, 90] and lng within [-180, 180]")
+    return lat, lng
+
 @bp.route('/geocode', methods=['POST'])
 def geocode():
     data = request.json
     if not data or not data.get('address'):
         return jsonify({"error": "Address is required."}), 400
+    address = data.get('address')
+    try:
+        address_key(address)
+    except ValueError as e:
+        return jsonify({"error": f"{e}."}), 400
     
-    result, status_code = geocoding_controller.geocode_address(data.get('address'))
+    result, status_code = geocoding_controller.geocode_address(address)
+    return jsonify(result), status_code
+
+@bp.route('/geocode/batch', methods=['POST'])
+@login_required
+def geocode_batch(current_user_sk):
+    """Geocode a list of addresses (or {"addresses": [...]}) in one request; repeats are resolved once.
+
+    Signed-in users only: one request can spend hundreds of provider calls.
+    """
+    data = request.get_json(silent=True)
+    addresses = data.get('addresses') if isinstance(data, dict) else data
+    if not isinstance(addresses, list) or not addresses:
+        return jsonify({"error": "Expected a non-empty list of addresses."}), 400
+    if len(addresses) > Config.GEOCODING_BATCH_MAX_ADDRESSES:
+        return jsonify({"error": f"At most {Config.GEOCODING_BATCH_MAX_ADDRESSES} addresses per request."}), 413
+
+    result, status_code = geocoding_controller.geocode_batch(addresses)
     return jsonify(result), status_code
 
 @bp.route('/geocode', methods=['GET'])
@@ -24,9 +60,44 @@ def get_geocoding_result():
     result, status_code = geocoding_controller.get_geocoding_result(place_id, lat, lng, formatted_address)
     return jsonify(result), status_code
 
+@bp.route('/geocode/nearest', methods=['GET'])
+def get_nearest_result():
+    """The stored geocoding result closest to ?lat=&lng=, optionally within ?max_distance= metres."""
+    try:
+        lat, lng = _parse_point()
+        max_distance = request.args.get('max_distance', type=float)
+        if max_distance is not None and max_distance < 0:
+            raise ValueError("max_distance must not be negative")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result, status_code = geocoding_controller.find_nearest(lat, lng, max_distance)
+    return jsonify(result), status_code
+
+@bp.route('/geocode/within', methods=['GET'])
+def get_results_within():
+    """Stored geocoding results within ?radius= metres of ?lat=&lng=, closest first."""
+    try:
+        lat, lng = _parse_point()
+        radius = request.args.get('radius', type=float)
+        if radius is None or not 0 < radius <= Config.GEOCODING_MAX_RADIUS_M:
+            raise ValueError(f"radius must be a number of metres in (0, {Config.GEOCODING_MAX_RADIUS_M}]")
+        limit = parse_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result, status_code = geocoding_controller.find_within(lat, lng, radius, limit)
+    return jsonify(result), status_code
+
 @bp.route('/geocode/<int:id>', methods=['DELETE'])
 @login_required
-def delete_address(id):
+def delete_address(current_user_sk, id):
     """Delete an address by its ID."""
     result, status_code = geocoding_controller.delete_geocoding_result(id)
-    return jsonify(result), status_code
\ No newline at end of file
+    return jsonify(result), status_code
+
+@bp.cli.command('purge-cache')
+def purge_cache_command():
+    """Delete geocoding results past their expiry."""
+    deleted = geocoding_controller.geocoding_cache.purge()
+    click.echo(f'Purged {deleted} expired geocoding results')
@@ -1,6 +1,11 @@
 from flask import Blueprint, jsonify
 from extensions import db
 from sqlalchemy import text
+from middleware.identity_cache import identity_cache
+from utils.google_token_verifier import google_verifier
+from controllers.leaderboard_controller import leaderboards
+from controllers.geocoding_controller import geocoding_cache
+from utils.http_client import http_client
 
 bp = Blueprint('health', __name__)
 
@@ -19,3 +24,13 @@ def health_check():
             'database': 'disconnected',
             'error': str(e)
         }), 503
+
+@bp.route('/health/metrics')
+def metrics():
+    return jsonify({
+        'auth_identity_cache': identity_cache.stats(),
+        'google_signing_keys': google_verifier.stats(),
+        'spark_leaderboards': leaderboards.stats(),
+        'geocoding_cache': geocoding_cache.stats(),
+        'outbound_http': http_client.stats()
+    }), 200
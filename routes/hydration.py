@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from controllers import hydration_controller
 from middleware.auth_middleware import login_required
+from config import Config
 from datetime import datetime
+import click
 
 bp = Blueprint('hydration', __name__)
 
@@ -23,6 +25,23 @@ def log_hydration(current_user_sk):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bp.route('/hydration/sync', methods=['POST'])
+@login_required
+def sync_hydration_logs(current_user_sk):
+    """Replay offline logs in one request; client_uuids already stored are skipped."""
+    try:
+        data = request.get_json(silent=True)
+        entries = data.get('logs') if isinstance(data, dict) else data
+        if not isinstance(entries, list) or not entries:
+            return jsonify({"error": "Expected a non-empty list of logs"}), 400
+        if len(entries) > Config.HYDRATION_SYNC_MAX_ENTRIES:
+            return jsonify({"error": f"At most {Config.HYDRATION_SYNC_MAX_ENTRIES} logs per request"}), 413
+
+        result, status_code = hydration_controller.sync_hydration_logs(current_user_sk, entries)
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @bp.route('/hydration', methods=['GET'])
 @login_required
 def get_hydration_logs(current_user_sk):
@@ -63,7 +82,7 @@ def update_hydration_log(current_user_sk, log_id):
 def delete_hydration_log(current_user_sk, log_id):
     try:
         result, status_code = hydration_controller.delete_hydration_log(current_user_sk, log_id)
-        return jsonify(result) if status_code != 204 else ('', 204)
+        return (jsonify(result), status_code) if status_code != 204 else ('', 204)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -95,3 +114,9 @@ def get_hydration_summary(current_user_sk):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@bp.cli.command('rebuild-rollups')
+@click.option('--user-sk', type=int, help='Only rebuild this user (default: everyone)')
+def rebuild_rollups_command(user_sk):
+    """Recompute daily hydration rollups from the hydration logs."""
+    written = hydration_controller.rebuild_hydration_rollups(user_sk)
+    click.echo(f'Rebuilt {written} daily hydration rollups')
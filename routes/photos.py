@@ -0,0 +1,86 @@
+from flask import Blueprint, request, jsonify, send_file
+from controllers import photo_controller
+from middleware.auth_middleware import login_required
+from utils.blob_store import BlobNotFound
+import click
+
+bp = Blueprint('photos', __name__)
+
+# Blobs never change under a digest, so clients may cache a photo for good
+PHOTO_MAX_AGE = 365 * 24 * 3600
+
+@bp.route('/photos', methods=['POST'])
+@login_required
+def upload_photo(current_user_sk):
+    """Upload an image as multipart form field 'photo'."""
+    upload = request.files.get('photo')
+    if upload is None:
+        return jsonify({"error": "No 'photo' file provided"}), 400
+
+    result, status_code = photo_controller.save_photo(current_user_sk, upload)
+    return jsonify(result), status_code
+
+@bp.route('/photos', methods=['GET'])
+@login_required
+def get_photos(current_user_sk):
+    try:
+        result, status_code = photo_controller.get_photos(current_user_sk)
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.route('/photos/<int:pid>', methods=['GET'])
+@login_required
+def get_photo(current_user_sk, pid):
+    photo = photo_controller.get_photo(current_user_sk, pid)
+    if photo is None:
+        return jsonify({"error": "Photo not found"}), 404
+    try:
+        data = photo_controller.open_photo(photo)
+    except BlobNotFound:
+        return jsonify({"error": "Photo data is missing"}), 410
+
+    response = send_file(
+        data,
+        mimetype=photo.mime_type or 'application/octet-stream',
+        download_name=photo.filename,
+        etag=photo.blob_sha256 or False,
+        conditional=True,
+        max_age=PHOTO_MAX_AGE if photo.blob_sha256 else None
+    )
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
+
+@bp.route('/photos/<int:pid>', methods=['DELETE'])
+@login_required
+def delete_photo(current_user_sk, pid):
+    try:
+        result, status_code = photo_controller.delete_photo(current_user_sk, pid)
+        return jsonify(result), status_code
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.cli.command('migrate-blobs')
+@click.option('--batch-size', type=int, help='Rows per transaction (default: BLOB_MIGRATION_BATCH_SIZE)')
+@click.option('--limit', type=int, help='Stop after this many rows per table')
+def migrate_blobs_command(batch_size, limit):
+    """Move photo bytes out of the photo tables into the blob store."""
+    try:
+        moved = photo_controller.migrate_photo_blobs(
+            batch_size, limit, progress=lambda table, count: click.echo(f'{table}: {count} rows moved')
+        )
+    except RuntimeError as e:
+        raise click.ClickException(str(e))
+    for table, count in moved.items():
+        click.echo(f'{table}: done, {count} rows moved')
+
+@bp.cli.command('gc-blobs')
+@click.option('--grace-hours', type=float, default=24.0, show_default=True,
+              help='Only delete blobs written at least this long ago')
+@click.option('--dry-run', is_flag=True, help='Count unreferenced blobs without deleting them')
+def gc_blobs_command(grace_hours, dry_run):
+    """Delete blobs no photo row references any more."""
+    result = photo_controller.collect_unreferenced_blobs(grace_hours * 3600, dry_run)
+    click.echo(f"Scanned {result['scanned']} blobs, {result['unreferenced']} unreferenced, "
+               f"{result['deleted']} deleted")
@@ -1,49 +1,130 @@
 from flask import Blueprint, request, jsonify
-from models.spark_points import SparkLedger  # Fixed import path
-from extensions import db
 from middleware.auth import token_required
+from controllers.spark_points_controller import (
+    DEFAULT_BUCKET_WINDOWS, HISTORY_BUCKETS, award_batch, award_spark_points, bucket_history, get_balance,
+    list_history, reconcile_balances
+)
+from controllers.leaderboard_controller import BOARDS, get_leaderboard, get_leaderboard_position
+from config import Config
+from utils.pagination import parse_limit
 from datetime import datetime
+import click
 
 bp = Blueprint('spark_points', __name__, url_prefix='/user')  # Add url_prefix
 
+def _parse_date_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO 8601 date or datetime")
+
 @bp.route('/spark-points', methods=['GET', 'POST'])
 @token_required
 def handle_spark_points(current_user):
     if request.method == 'GET':
-        # Get total points from all records
-        total_points = db.session.query(db.func.sum(SparkLedger.points)).filter_by(
-            user_sk=current_user.user_sk
-        ).scalar() or 0
-        
-        # Get latest record for timestamp
-        latest_record = SparkLedger.query.filter_by(
-            user_sk=current_user.user_sk
-        ).order_by(SparkLedger.timestamp.desc()).first()
-        
-        return jsonify({
-            'total_spark_points': total_points,
-            'last_updated': latest_record.timestamp.isoformat() if latest_record else None,
-            'user_sk': current_user.user_sk
-        })
+        # Maintained balance row: a primary-key read however long the ledger gets
+        return jsonify(get_balance(current_user.user_sk))
     
     elif request.method == 'POST':
         data = request.get_json()
-        new_spark = SparkLedger(
-            user_sk=current_user.user_sk,
-            points=data.get('points', 0),
-            activity_type=data.get('activity_type', 'general'),
-            timestamp=datetime.utcnow()
+        try:
+            points = int(data.get('points', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'points must be an integer'}), 400
+        new_spark = award_spark_points(
+            current_user.user_sk,
+            points,
+            activity_type=data.get('activity_type', 'general')
         )
-        db.session.add(new_spark)
-        db.session.commit()
         return jsonify(new_spark.to_dict()), 201
 
+@bp.route('/spark-points/batch', methods=['POST'])
+@token_required
+def award_spark_points_batch(current_user):
+    """Award points to many users at once; retried entries with a known idempotency_key are skipped.
+
+    Awards may name any user, so only SPARK_BATCH_ACCOUNTS may call this.
+    """
+    if current_user is None or current_user.username not in Config.SPARK_BATCH_ACCOUNTS:
+        return jsonify({'error': 'Not allowed to award spark points in bulk'}), 403
+
+    data = request.get_json(silent=True)
+    entries = data.get('awards') if isinstance(data, dict) else data
+    if not isinstance(entries, list) or not entries:
+        return jsonify({'error': 'Expected a non-empty list of awards'}), 400
+    if len(entries) > Config.SPARK_BATCH_MAX_ENTRIES:
+        return jsonify({'error': f'At most {Config.SPARK_BATCH_MAX_ENTRIES} awards per request'}), 413
+    return jsonify(award_batch(entries)), 200
+
 @bp.route('/spark-points/history', methods=['GET'])
 @token_required
 def get_spark_points_history(current_user):
-    spark_history = SparkLedger.query.filter_by(user_sk=current_user.user_sk)\
-        .order_by(SparkLedger.timestamp.desc()).all()
-    return jsonify([entry.to_dict() for entry in spark_history])
+    """Keyset-paged ledger entries, or totals per ?bucket=day|week|month and activity type."""
+    bucket = request.args.get('bucket')
+    try:
+        if not bucket:
+            limit = parse_limit(request.args.get('limit'))
+            return jsonify(list_history(current_user.user_sk, limit, request.args.get('cursor')))
+
+        if bucket not in HISTORY_BUCKETS:
+            return jsonify({'error': f"bucket must be one of {', '.join(HISTORY_BUCKETS)}"}), 400
+        end = _parse_date_arg('to') or datetime.utcnow().date()
+        start = _parse_date_arg('from') or end - DEFAULT_BUCKET_WINDOWS[bucket]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if start > end:
+        return jsonify({'error': 'from must not be after to'}), 400
+
+    return jsonify({
+        'bucket': bucket,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'buckets': bucket_history(current_user.user_sk, bucket, start, end)
+    })
+
+def _board_args(current_user):
+    """(board, partner, error response) from ?board=global|weekly|partner"""
+    board = request.args.get('board', 'global')
+    if board not in BOARDS:
+        return None, None, (jsonify({'error': f"board must be one of {', '.join(BOARDS)}"}), 400)
+    if board == 'partner' and not current_user.partner:
+        return None, None, (jsonify({'error': 'User is not part of a partner program'}), 404)
+    return board, current_user.partner if board == 'partner' else None, None
+
+@bp.route('/spark-points/leaderboard', methods=['GET'])
+@token_required
+def get_spark_points_leaderboard(current_user):
+    board, partner, error = _board_args(current_user)
+    if error:
+        return error
+    limit = max(1, min(request.args.get('limit', 10, type=int), Config.LEADERBOARD_MAX_LIMIT))
+    offset = max(0, request.args.get('offset', 0, type=int))
+    return jsonify(get_leaderboard(board, limit, offset, partner=partner))
+
+@bp.route('/spark-points/leaderboard/me', methods=['GET'])
+@token_required
+def get_spark_points_rank(current_user):
+    board, partner, error = _board_args(current_user)
+    if error:
+        return error
+    neighbours = max(0, min(request.args.get('neighbours', 5, type=int), Config.LEADERBOARD_MAX_LIMIT // 2))
+    return jsonify(get_leaderboard_position(board, current_user.user_sk, neighbours, partner=partner))
+
+@bp.cli.command('reconcile-balances')
+@click.option('--user-sk', type=int, help='Only check this user (default: everyone)')
+@click.option('--fix', is_flag=True, help='Rewrite drifted balances from the ledger')
+def reconcile_balances_command(user_sk, fix):
+    """Check maintained spark-point balances against the ledger."""
+    totals = reconcile_balances(user_sk, fix=fix)
+    for item in totals['mismatches']:
+        unfolded = f", {item['unfolded']} ledger rows not in the balance" if item['unfolded'] else ''
+        click.echo(f"user {item['user_sk']}: balance {item['balance']}, ledger {item['ledger']}{unfolded}")
+    click.echo(
+        f"Checked {totals['checked']} balances: {totals['mismatched']} mismatched, {totals['fixed']} fixed"
+    )
 
 def init_app(app):
     app.register_blueprint(bp)
\ No newline at end of file
@@ -2,6 +2,12 @@ from flask import Blueprint, request, jsonify
 from models.user import User, UserInfo
 from extensions import db
 from utils.validators import validate_email, validate_phone_number
+from controllers.onboarding_controller import parse_roster, onboard_users
+from middleware.auth import token_required
+from config import Config
+import click
+import io
+import json
 import re
 
 bp = Blueprint('user', __name__)
@@ -131,5 +137,57 @@ def update_user_profile():
     db.session.commit()
     return jsonify({"message": "User profile updated successfully"}), 200
 
+@bp.route('/onboard', methods=['POST'])
+@token_required
+def bulk_onboard_users(current_user):
+    """Onboard a partner roster (CSV or NDJSON, raw body or 'roster' file upload).
+
+    Only ONBOARDING_ACCOUNTS may call this; a partner account's roster joins
+    its own partner program. Users are created without a password and set
+    one through /request-password-reset; use `flask user onboard` to
+    import roster passwords.
+    """
+    if current_user is None or current_user.username not in Config.ONBOARDING_ACCOUNTS:
+        return jsonify({"message": "Not allowed to onboard users"}), 403
+
+    fmt = request.args.get('format')
+    upload = request.files.get('roster')
+    if upload:
+        stream = upload.stream
+        fmt = fmt or ('csv' if upload.filename.lower().endswith('.csv') else 'ndjson')
+    else:
+        stream = request.stream
+        if not fmt:
+            fmt = 'csv' if request.mimetype == 'text/csv' else 'ndjson'
+
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({"message": "format must be csv or ndjson"}), 400
+
+    batch_size = request.args.get('batch_size', Config.ONBOARDING_BATCH_SIZE, type=int)
+    batch_size = max(1, min(batch_size, Config.ONBOARDING_BATCH_SIZE))
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    result = onboard_users(
+        parse_roster(text, fmt), batch_size=batch_size, set_passwords=False, partner=current_user.partner
+    )
+    return jsonify(result), 200
+
+@bp.cli.command('onboard')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), help='Defaults to the file extension')
+@click.option('--batch-size', default=Config.ONBOARDING_BATCH_SIZE, show_default=True)
+@click.option('--report', type=click.Path(dir_okay=False), help='Write the per-row report as NDJSON')
+def onboard_command(path, fmt, batch_size, report):
+    """Bulk-create users from a CSV or NDJSON roster file."""
+    fmt = fmt or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+    with open(path, encoding='utf-8-sig', newline='') as roster:
+        result = onboard_users(parse_roster(roster, fmt), batch_size=batch_size)
+
+    if report:
+        with open(report, 'w') as out:
+            for row in result['results']:
+                out.write(json.dumps(row, default=str) + '\n')
+    click.echo(f"{result['created']} created, {result['rejected']} rejected of {result['total']} rows")
+
 def init_app(app):
     app.register_blueprint(bp, url_prefix='/users')
\ No newline at end of file
@@ -0,0 +1,51 @@
+import os
+import secrets
+import tempfile
+from datetime import datetime, timedelta
+
+# Config reads the environment at import time, so point it at a throwaway
+# database before the app is imported
+_db_dir = tempfile.mkdtemp(prefix='app-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_db_dir, 'test.db')}"
+os.environ.setdefault('BLOB_STORE_PATH', os.path.join(_db_dir, 'blobs'))
+
+import jwt
+import pytest
+
+from app import create_app
+from extensions import db
+from models.user import User
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    with app.app_context():
+        yield app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    def make_user():
+        name = f'test_{secrets.token_hex(6)}'
+        user = User(username=name, email=f'{name}@example.com')
+        db.session.add(user)
+        db.session.commit()
+        return user
+    return make_user
+
+
+@pytest.fixture
+def auth_header(app):
+    def auth_header(user):
+        token = jwt.encode({'user_sk': user.user_sk, 'exp': datetime.utcnow() + timedelta(hours=1)},
+                           app.config['SECRET_KEY'])
+        return {'Authorization': f'Bearer {token}'}
+    return auth_header
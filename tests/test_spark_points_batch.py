@@ -0,0 +1,24 @@
+from config import Config
+from models.spark_points import SparkLedger
+
+
+def test_batch_award_forbidden_without_allowlist(client, make_user, auth_header, monkeypatch):
+    monkeypatch.setattr(Config, 'SPARK_BATCH_ACCOUNTS', set())
+    caller, target = make_user(), make_user()
+
+    response = client.post('/user/spark-points/batch', headers=auth_header(caller),
+                           json=[{'user_sk': target.user_sk, 'points': 1000, 'idempotency_key': 'forged'}])
+
+    assert response.status_code == 403
+    assert SparkLedger.query.filter_by(user_sk=target.user_sk).count() == 0
+
+
+def test_batch_award_allowed_for_listed_account(client, make_user, auth_header, monkeypatch):
+    caller, target = make_user(), make_user()
+    monkeypatch.setattr(Config, 'SPARK_BATCH_ACCOUNTS', {caller.username})
+
+    response = client.post('/user/spark-points/batch', headers=auth_header(caller),
+                           json=[{'user_sk': target.user_sk, 'points': 5, 'idempotency_key': 'award-1'}])
+
+    assert response.status_code == 200
+    assert SparkLedger.query.filter_by(user_sk=target.user_sk).count() == 1
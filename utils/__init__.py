@@ -2,20 +2,55 @@
 
 This package contains various utility modules:
 - helpers: General helper functions for API requests and system operations
+- http_client: Pooled outbound HTTP client with timeouts, retries and per-host metrics
 - validators: Input validation functions
 - file_handlers: File processing and validation utilities
+- password_hashing: Bounded off-worker password hashing pool
+- pagination: Opaque keyset cursors and limit parsing
+- rate_limit: Thread-safe sliding-window rate limiter for outbound API calls
+- ranked_scores: In-memory score table with O(log n) rank lookups
+- geo: Integer geohash cells and vectorized haversine distances
+- blob_store: Content-addressed (SHA-256) blob storage for photos
+- metrics: Latency percentiles for stats() and the benchmarks
 """
 
 from .helpers import ping_server, make_api_request
+from .http_client import HttpClient, http_client
 from .validators import validate_email, validate_password, validate_phone_number
 from .file_handlers import allowed_file, get_mime_type
+from .password_hashing import hash_password, verify_password, HashingPoolBusy
+from .pagination import encode_cursor, decode_cursor, keyset_page, parse_limit
+from .rate_limit import RateLimiter
+from .ranked_scores import RankedScores
+from .geo import geocell, cell_ranges, haversine_m
+from .blob_store import BlobStore, LocalBlobStore, BlobNotFound, blob_store
+from .metrics import percentile
 
 __all__ = [
     'ping_server',
     'make_api_request',
+    'HttpClient',
+    'http_client',
     'validate_email',
     'validate_password',
     'validate_phone_number',
     'allowed_file',
-    'get_mime_type'
+    'get_mime_type',
+    'hash_password',
+    'verify_password',
+    'HashingPoolBusy',
+    'encode_cursor',
+    'decode_cursor',
+    'keyset_page',
+    'parse_limit',
+    'RateLimiter',
+    'RankedScores',
+    'geocell',
+    'cell_ranges',
+    'haversine_m',
+    'BlobStore',
+    'LocalBlobStore',
+    'BlobNotFound',
+    'blob_store',
+    'percentile'
 ]
\ No newline at end of file
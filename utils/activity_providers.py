@@ -0,0 +1,206 @@
+"""Third-party platforms the activity sync pulls from.
+
+A provider turns a user's OAuth tokens into normalized activity dicts
+(the Activity columns plus ``external_id``, ``start_date`` as naive UTC).
+``FakeActivityProvider`` serves deterministic data with simulated latency
+so the whole sync pipeline can be run and benchmarked offline.
+"""
+import time
+import zlib
+from datetime import datetime, timedelta
+
+import requests
+
+from config import Config
+from utils.http_client import http_client, parse_retry_after
+
+STRAVA_API_URL = 'https://www.strava.com/api/v3'
+STRAVA_TOKEN_URL = 'https://www.strava.com/oauth/token'
+
+
+class ProviderError(Exception):
+    """The platform call failed; the token is retried on the next sync"""
+
+
+class ProviderAuthError(ProviderError):
+    """The tokens were rejected (revoked access or refresh token)"""
+
+
+class ProviderRateLimited(ProviderError):
+    def __init__(self, retry_after):
+        super().__init__(f'Rate limited, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class ActivityProvider:
+    """Interface every platform implements.
+
+    ``rate_limit`` is the default (requests, period seconds) budget shared
+    by all sync workers; SYNC_RATE_LIMITS can override it per platform.
+    """
+    name = None
+    rate_limit = (100, 60)
+
+    def refresh(self, refresh_token):
+        """Returns {'access_token', 'refresh_token', 'expires_at'}"""
+        raise NotImplementedError
+
+    def fetch_activities(self, access_token, after, page, per_page):
+        """One page (1-based) of activities that started after ``after`` (a naive UTC datetime), oldest first"""
+        raise NotImplementedError
+
+
+class StravaProvider(ActivityProvider):
+    name = 'strava'
+    # Strava's default application limit is 200 requests per 15 minutes
+    rate_limit = (200, 900)
+
+    def __init__(self, client_id, client_secret, timeout=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.timeout = timeout
+
+    def _check(self, response):
+        if response.status_code == 429:
+            raise ProviderRateLimited(parse_retry_after(response, 60))
+        if response.status_code in (400, 401, 403):
+            raise ProviderAuthError(f'Strava rejected the token ({response.status_code})')
+        if response.status_code >= 300:
+            raise ProviderError(f'Strava returned {response.status_code}')
+        return response.json()
+
+    def refresh(self, refresh_token):
+        try:
+            response = http_client.post(STRAVA_TOKEN_URL, data={
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+                'grant_type': 'refresh_token',
+                'refresh_token': refresh_token
+            }, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            raise ProviderError(str(e))
+        data = self._check(response)
+        return {
+            'access_token': data['access_token'],
+            'refresh_token': data.get('refresh_token', refresh_token),
+            'expires_at': datetime.utcfromtimestamp(data['expires_at']) if data.get('expires_at') else None
+        }
+
+    def fetch_activities(self, access_token, after, page, per_page):
+        # With `after` Strava returns activities oldest first, which is what
+        # lets the sync resume from a start_date high-water mark
+        params = {
+            'after': int((after - datetime(1970, 1, 1)).total_seconds()),
+            'page': page,
+            'per_page': per_page
+        }
+        try:
+            response = http_client.get(
+                f'{STRAVA_API_URL}/athlete/activities',
+                params=params,
+                headers={'Authorization': f'Bearer {access_token}'},
+                timeout=self.timeout
+            )
+        except requests.exceptions.RequestException as e:
+            raise ProviderError(str(e))
+        return [self._normalize(item) for item in self._check(response)]
+
+    @staticmethod
+    def _normalize(item):
+        start = datetime.fromisoformat(item['start_date'].replace('Z', '+00:00'))
+        return {
+            'external_id': str(item['id']),
+            'name': (item.get('name') or '')[:255] or None,
+            'distance': item.get('distance'),
+            'moving_time': item.get('moving_time'),
+            'elapsed_time': item.get('elapsed_time'),
+            'total_elevation_gain': item.get('total_elevation_gain'),
+            'type': (item.get('sport_type') or item.get('type') or '')[:50] or None,
+            'start_date': (start - start.utcoffset()).replace(tzinfo=None),
+            'description': item.get('description'),
+            'calories': item.get('calories')
+        }
+
+
+class FakeActivityProvider(ActivityProvider):
+    """Deterministic local platform.
+
+    Access tokens look like ``<user key>:<expiry epoch>``; every user key
+    owns ``activities_per_user`` activities, one a day from ``start``, with
+    distances and times derived from the key. Raise ``activities_per_user``
+    between runs to simulate new uploads. ``latency`` is slept on every call.
+    """
+    name = 'fake'
+
+    def __init__(self, activities_per_user=30, start=None, latency=0.0, token_lifetime=3600,
+                 rate_limit=(1000, 1)):
+        self.activities_per_user = activities_per_user
+        self.start = start or datetime(2024, 1, 1, 6, 0)
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.rate_limit = rate_limit
+
+    def issue(self, user_key, expires_at=None):
+        """Tokens for a user key, as an OAuth exchange would return them"""
+        expires_at = expires_at or datetime.utcnow() + timedelta(seconds=self.token_lifetime)
+        epoch = int((expires_at - datetime(1970, 1, 1)).total_seconds())
+        return {
+            'access_token': f'{user_key}:{epoch}',
+            'refresh_token': f'{user_key}:refresh',
+            'expires_at': expires_at.replace(microsecond=0)
+        }
+
+    def refresh(self, refresh_token):
+        if self.latency:
+            time.sleep(self.latency)
+        user_key, _, kind = refresh_token.rpartition(':')
+        if kind != 'refresh':
+            raise ProviderAuthError('Unknown refresh token')
+        return self.issue(user_key)
+
+    def fetch_activities(self, access_token, after, page, per_page):
+        if self.latency:
+            time.sleep(self.latency)
+        user_key, _, expiry = access_token.rpartition(':')
+        if not expiry.isdigit() or int(expiry) < time.time():
+            raise ProviderAuthError('Access token expired')
+
+        seed = zlib.crc32(user_key.encode('utf-8'))
+        offset = timedelta(seconds=seed % 3600)
+        # Index of the first activity starting strictly after `after`
+        first = max(0, (after - self.start - offset) // timedelta(days=1) + 1)
+        begin = first + (page - 1) * per_page
+        end = min(begin + per_page, self.activities_per_user)
+
+        activities = []
+        for index in range(begin, end):
+            variation = (seed >> (index % 16)) % 1000
+            moving_time = 1800 + variation * 3
+            activities.append({
+                'external_id': f'{user_key}-{index}',
+                'name': f'Fake run {index}',
+                'distance': 5000.0 + variation * 10,
+                'moving_time': moving_time,
+                'elapsed_time': moving_time + 120,
+                'total_elevation_gain': float(variation % 200),
+                'type': 'Run',
+                'start_date': self.start + offset + timedelta(days=index),
+                'description': None,
+                'calories': 300.0 + variation / 2
+            })
+        return activities
+
+
+_PROVIDERS = {}
+
+
+def register_provider(provider):
+    _PROVIDERS[provider.name] = provider
+
+
+def get_provider(platform):
+    """The provider for a UserToken.platform value, or None if it is not supported"""
+    return _PROVIDERS.get((platform or '').lower())
+
+
+register_provider(StravaProvider(Config.CLIENT_ID, Config.CLIENT_SECRET))
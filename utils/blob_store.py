@@ -0,0 +1,161 @@
+"""Content-addressed blob storage for uploaded photos.
+
+A blob is stored under the hex SHA-256 of its bytes, so identical uploads
+share one copy and a stored blob never changes: rows keep only the digest,
+size and MIME type, and the digest doubles as a permanent ETag. Backends
+implement ``BlobStore``; ``LocalBlobStore`` keeps files on disk, fanned
+out as ``ab/cd/abcd...`` so no directory grows too large. Writes go to a
+temp file first and are renamed into place, so a reader never sees a
+partial blob and concurrent uploads of the same bytes are harmless.
+"""
+import hashlib
+import io
+import os
+import re
+import tempfile
+
+from config import Config
+
+_DIGEST = re.compile(r'^[0-9a-f]{64}$')
+_CHUNK = 1 << 20
+# Where LocalBlobStore writes when BLOB_STORE_PATH is unset; inside the app
+# directory, so not durable across container redeploys
+DEFAULT_LOCAL_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'instance', 'blobs')
+
+
+class BlobNotFound(Exception):
+    """No blob is stored under this digest"""
+
+
+def _check_digest(digest):
+    if not isinstance(digest, str) or not _DIGEST.match(digest):
+        raise ValueError(f'Not a SHA-256 hex digest: {digest!r}')
+    return digest
+
+
+class BlobStore:
+    """Interface every blob backend implements"""
+    name = None
+
+    def put(self, source):
+        """Store bytes or a binary file object; returns (sha256 hex digest, size in bytes)"""
+        raise NotImplementedError
+
+    def open(self, digest):
+        """A readable binary file object for the blob; raises BlobNotFound"""
+        raise NotImplementedError
+
+    def get(self, digest):
+        with self.open(digest) as blob:
+            return blob.read()
+
+    def exists(self, digest):
+        raise NotImplementedError
+
+    def delete(self, digest, older_than=None):
+        """Remove the blob; returns False if it was not there.
+
+        With ``older_than`` (epoch seconds), a blob written or re-put since
+        then is kept and False returned, so a collector never removes bytes
+        an upload has just deduplicated against.
+        """
+        raise NotImplementedError
+
+    def iter_blobs(self):
+        """Yield (digest, last modified epoch seconds) for every stored blob"""
+        raise NotImplementedError
+
+
+class LocalBlobStore(BlobStore):
+    name = 'local'
+
+    def __init__(self, root, fsync=True):
+        self.root = os.path.abspath(root)
+        self.fsync = fsync
+
+    def _path(self, digest):
+        _check_digest(digest)
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, source):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            source = io.BytesIO(source)
+        staging = os.path.join(self.root, 'tmp')
+        os.makedirs(staging, exist_ok=True)
+
+        sha256 = hashlib.sha256()
+        size = 0
+        fd, temp_path = tempfile.mkstemp(dir=staging)
+        try:
+            with os.fdopen(fd, 'wb') as temp:
+                for chunk in iter(lambda: source.read(_CHUNK), b''):
+                    sha256.update(chunk)
+                    size += len(chunk)
+                    temp.write(chunk)
+                if self.fsync:
+                    temp.flush()
+                    os.fsync(temp.fileno())
+            digest = sha256.hexdigest()
+            path = self._path(digest)
+            try:
+                # Deduplicated: the same bytes are already stored. Touch them
+                # so a concurrent gc-blobs sees a fresh blob and leaves it
+                os.utime(path)
+                os.unlink(temp_path)
+            except FileNotFoundError:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return digest, size
+
+    def open(self, digest):
+        try:
+            return open(self._path(digest), 'rb')
+        except FileNotFoundError:
+            raise BlobNotFound(digest)
+
+    def exists(self, digest):
+        return os.path.exists(self._path(digest))
+
+    def delete(self, digest, older_than=None):
+        path = self._path(digest)
+        try:
+            if older_than is not None and os.path.getmtime(path) >= older_than:
+                return False
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def iter_blobs(self):
+        if not os.path.isdir(self.root):
+            return
+        for directory, _, files in os.walk(self.root):
+            for filename in files:
+                if _DIGEST.match(filename):
+                    yield filename, os.path.getmtime(os.path.join(directory, filename))
+
+
+_BACKENDS = {}
+
+
+def register_backend(name, factory):
+    """``factory(config)`` builds the backend from the Config class"""
+    _BACKENDS[name] = factory
+
+
+def create_blob_store(config=Config):
+    name = (config.BLOB_STORE or '').lower()
+    if name not in _BACKENDS:
+        raise ValueError(f'Unknown BLOB_STORE {config.BLOB_STORE!r}; expected one of {sorted(_BACKENDS)}')
+    return _BACKENDS[name](config)
+
+
+register_backend('local', lambda config: LocalBlobStore(
+    config.BLOB_STORE_PATH or DEFAULT_LOCAL_PATH, fsync=config.BLOB_STORE_FSYNC
+))
+
+blob_store = create_blob_store()
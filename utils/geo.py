@@ -0,0 +1,103 @@
+"""Integer geohash cells and vectorized great-circle distances.
+
+A point's cell is its 52-bit geohash as an integer: 26 longitude and 26
+latitude bits interleaved, longitude first, which resolves to about 0.6 m.
+Points sharing the top k bits share a geohash cell of depth k, and every
+cell is one contiguous integer range, so a plain B-tree index on the column
+answers "points in these cells" with a few range scans. Radius queries
+cover the circle's bounding box with a handful of cells, filter on the box
+itself, and refine the candidates with ``haversine_m``.
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371008.8
+CELL_BITS = 52
+_AXIS_BITS = CELL_BITS // 2
+# Finest cells a radius query is split into before the ranges get too many
+_MAX_COVER_CELLS = 16
+
+
+def _spread(value):
+    """Move bit i of a 26-bit int to bit 2i"""
+    value = (value | (value << 16)) & 0x0000FFFF0000FFFF
+    value = (value | (value << 8)) & 0x00FF00FF00FF00FF
+    value = (value | (value << 4)) & 0x0F0F0F0F0F0F0F0F
+    value = (value | (value << 2)) & 0x3333333333333333
+    return (value | (value << 1)) & 0x5555555555555555
+
+
+def _axis(value, low, span, bits):
+    return min(int((value - low) / span * (1 << bits)), (1 << bits) - 1)
+
+
+def geocell(latitude, longitude):
+    """The 52-bit integer geohash of a point"""
+    lat_index = _axis(max(-90.0, min(latitude, 90.0)), -90.0, 180.0, _AXIS_BITS)
+    lng_index = _axis(max(-180.0, min(longitude, 180.0)), -180.0, 360.0, _AXIS_BITS)
+    return (_spread(lng_index) << 1) | _spread(lat_index)
+
+
+def _cover_depth(lat_min, lat_max, lng_span):
+    """Deepest cell depth whose cells cover the box in at most _MAX_COVER_CELLS cells"""
+    for depth in range(CELL_BITS, 0, -1):
+        lat_bits, lng_bits = depth // 2, depth - depth // 2
+        height, width = 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+        rows = int((lat_max + 90.0) / height) - int((lat_min + 90.0) / height) + 1
+        columns = min(int(lng_span / width) + 2, 1 << lng_bits)
+        if rows * columns <= _MAX_COVER_CELLS:
+            return depth
+    return 0
+
+
+def bounding_box(latitude, longitude, radius_m):
+    """(lat_min, lat_max, lng_min, lng_span) enclosing every point within ``radius_m``.
+
+    The longitude interval runs past -180 or 180 when the box crosses the
+    antimeridian; a lng_span of 360 means every longitude (the circle
+    reaches a pole).
+    """
+    angle = math.degrees(radius_m / EARTH_RADIUS_M)
+    lat_min, lat_max = max(latitude - angle, -90.0), min(latitude + angle, 90.0)
+    widest = math.cos(math.radians(max(abs(lat_min), abs(lat_max))))
+    if lat_min <= -90.0 or lat_max >= 90.0 or angle >= 90.0 or angle >= 180.0 * widest:
+        return lat_min, lat_max, -180.0, 360.0
+    return lat_min, lat_max, longitude - angle / widest, 2 * angle / widest
+
+
+def cell_ranges(latitude, longitude, radius_m):
+    """Sorted, merged [(low, high)] geocell ranges covering every point within ``radius_m``"""
+    lat_min, lat_max, lng_min, lng_span = bounding_box(latitude, longitude, radius_m)
+    depth = _cover_depth(lat_min, lat_max, lng_span)
+    if depth == 0:
+        return [(0, (1 << CELL_BITS) - 1)]
+    lat_bits, lng_bits = depth // 2, depth - depth // 2
+    height, width = 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+    size = 1 << (CELL_BITS - depth)
+
+    first_column = math.floor((lng_min + 180.0) / width)
+    last_column = math.floor((lng_min + lng_span + 180.0) / width)
+    columns = {column % (1 << lng_bits) for column in range(first_column, last_column + 1)}
+    rows = range(_axis(lat_min, -90.0, 180.0, lat_bits), _axis(lat_max, -90.0, 180.0, lat_bits) + 1)
+
+    starts = sorted(
+        (_spread(column << (_AXIS_BITS - lng_bits)) << 1) | _spread(row << (_AXIS_BITS - lat_bits))
+        for row in rows for column in columns
+    )
+    ranges = []
+    for start in starts:
+        if ranges and ranges[-1][1] + 1 == start:
+            ranges[-1][1] = start + size - 1
+        else:
+            ranges.append([start, start + size - 1])
+    return [tuple(cell_range) for cell_range in ranges]
+
+
+def haversine_m(latitude, longitude, latitudes, longitudes):
+    """Great-circle distances in metres from one point to arrays of points"""
+    lat1, lng1 = math.radians(latitude), math.radians(longitude)
+    lat2 = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lng2 = np.radians(np.asarray(longitudes, dtype=np.float64))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
@@ -0,0 +1,167 @@
+"""Address geocoding backends behind the geocoding cache.
+
+A provider turns an address into one normalized result dict (the
+GeocodingResult columns: formatted_address, latitude, longitude, place_id,
+types, address_components, plus_code, viewport), or None when the address
+does not resolve. ``FakeGeocodingProvider`` answers deterministically and
+offline, with optional simulated latency, for tests and benchmarks.
+"""
+import re
+import threading
+import time
+import unicodedata
+import zlib
+
+import requests
+
+from config import Config
+from utils.http_client import http_client, parse_retry_after
+
+GOOGLE_GEOCODE_URL = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+_NON_WORD = re.compile(r'[\W_]+')
+# Length of the address and normalized_address columns
+MAX_ADDRESS_LENGTH = 255
+
+
+def normalize_address(address):
+    """Cache key for an address: Unicode-normalized, case-folded, punctuation and spacing collapsed.
+
+    "12  Main St., Springfield" and "12 main st springfield" share a key.
+    """
+    text = unicodedata.normalize('NFKC', address).casefold()
+    return ' '.join(_NON_WORD.sub(' ', text).split())
+
+
+def address_key(address):
+    """normalize_address() for a client-supplied address; ValueError unless the key is non-empty and fits its column.
+
+    NFKC can lengthen text (one ligature becomes several letters), so the
+    key is checked as well as the raw address.
+    """
+    if isinstance(address, str) and len(address) <= MAX_ADDRESS_LENGTH:
+        key = normalize_address(address)
+        if key and len(key) <= MAX_ADDRESS_LENGTH:
+            return key
+    raise ValueError(f'Address must be a non-empty string of at most {MAX_ADDRESS_LENGTH} characters')
+
+
+class GeocodingError(Exception):
+    """The provider could not answer; nothing is cached"""
+
+
+class GeocodingRateLimited(GeocodingError):
+    def __init__(self, retry_after):
+        super().__init__(f'Rate limited, retry after {retry_after}s')
+        self.retry_after = retry_after
+
+
+class GeocodingProvider:
+    """Interface every geocoding backend implements.
+
+    ``rate_limit`` is the default (requests, period seconds) budget shared
+    by every caller in the process; GEOCODING_RATE_LIMIT can override it.
+    """
+    name = None
+    rate_limit = (50, 1)
+
+    def geocode(self, address):
+        """The best result for ``address`` as a dict, or None if it does not resolve"""
+        raise NotImplementedError
+
+
+class GoogleGeocodingProvider(GeocodingProvider):
+    name = 'google'
+
+    def __init__(self, api_key, timeout=None):
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def geocode(self, address):
+        try:
+            response = http_client.get(
+                GOOGLE_GEOCODE_URL,
+                params={'address': address, 'key': self.api_key},
+                timeout=self.timeout
+            )
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            raise GeocodingError(str(e))
+
+        if response.status_code == 429 or data.get('status') == 'OVER_QUERY_LIMIT':
+            raise GeocodingRateLimited(parse_retry_after(response, 2))
+        if data.get('status') == 'ZERO_RESULTS':
+            return None
+        if data.get('status') != 'OK':
+            raise GeocodingError(f"Geocoding API error: {data.get('status')}")
+
+        result = data['results'][0]
+        return {
+            'formatted_address': result['formatted_address'][:255],
+            'latitude': result['geometry']['location']['lat'],
+            'longitude': result['geometry']['location']['lng'],
+            'place_id': result.get('place_id'),
+            'types': result.get('types'),
+            'address_components': result.get('address_components'),
+            'plus_code': result.get('plus_code'),
+            'viewport': result['geometry'].get('viewport')
+        }
+
+
+class FakeGeocodingProvider(GeocodingProvider):
+    """Deterministic local geocoder.
+
+    Every address resolves to a point derived from its normalized form,
+    except those listed in ``unknown``. ``latency`` is slept on every call
+    and ``calls`` counts them, so tests can tell cache hits from misses.
+    """
+    name = 'fake'
+
+    def __init__(self, latency=0.0, unknown=(), rate_limit=(1000, 1)):
+        self.latency = latency
+        self.unknown = {normalize_address(address) for address in unknown}
+        self.rate_limit = rate_limit
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def geocode(self, address):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        key = normalize_address(address)
+        if key in self.unknown:
+            return None
+
+        seed = zlib.crc32(key.encode('utf-8'))
+        latitude = round(seed % 1800000 / 10000 - 90, 6)
+        longitude = round(zlib.crc32(f'lng {key}'.encode('utf-8')) % 3600000 / 10000 - 180, 6)
+        return {
+            'formatted_address': address.strip()[:255],
+            'latitude': latitude,
+            'longitude': longitude,
+            'place_id': f'fake-{seed:08x}',
+            'types': ['street_address'],
+            'address_components': [],
+            'plus_code': None,
+            'viewport': {
+                'northeast': {'lat': latitude + 0.001, 'lng': longitude + 0.001},
+                'southwest': {'lat': latitude - 0.001, 'lng': longitude - 0.001}
+            }
+        }
+
+
+_PROVIDERS = {}
+
+
+def register_provider(provider):
+    _PROVIDERS[provider.name] = provider
+
+
+def get_provider(name):
+    """The registered provider called ``name``, or None"""
+    return _PROVIDERS.get((name or '').lower())
+
+
+register_provider(GoogleGeocodingProvider(Config.GOOGLE_API_KEY))
+register_provider(FakeGeocodingProvider())
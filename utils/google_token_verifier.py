@@ -0,0 +1,176 @@
+"""Google ID token verification with in-process signing-key caching.
+
+``google.oauth2.id_token.verify_oauth2_token`` downloads Google's certs on
+every call. ``GoogleTokenVerifier`` keeps them in memory for as long as the
+cert response's ``Cache-Control: max-age`` allows, refreshes them in the
+background shortly before they expire, and refetches once when a token is
+signed with a key id it has not seen yet (key rotation).
+"""
+import base64
+import json
+import re
+import threading
+import time
+
+from google.auth import jwt as google_jwt
+
+from config import Config
+from utils.http_client import http_client
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+_MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+
+class CertSource:
+    """Where signing certificates come from.
+
+    ``fetch`` returns ``(certs, max_age)`` where ``certs`` maps key id to a
+    PEM certificate and ``max_age`` is how long, in seconds, they may be cached.
+    """
+
+    def fetch(self):
+        raise NotImplementedError
+
+
+class HttpCertSource(CertSource):
+    """Fetches certs from an HTTP endpoint (Google's, or a local stub server)"""
+
+    def __init__(self, url=GOOGLE_CERTS_URL, timeout=None, default_max_age=300):
+        self.url = url
+        self.timeout = timeout
+        self.default_max_age = default_max_age
+
+    def fetch(self):
+        response = http_client.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json(), self._max_age(response.headers)
+
+    def _max_age(self, headers):
+        match = _MAX_AGE_RE.search(headers.get('Cache-Control', ''))
+        if not match:
+            return self.default_max_age
+        # Age is how long the response already sat in an upstream cache
+        age = int(headers.get('Age', 0) or 0)
+        return max(int(match.group(1)) - age, 0)
+
+
+class StaticCertSource(CertSource):
+    """Serves a fixed set of certs; handy for local development"""
+
+    def __init__(self, certs, max_age=3600):
+        self.certs = certs
+        self.max_age = max_age
+
+    def fetch(self):
+        return dict(self.certs), self.max_age
+
+
+class GoogleTokenVerifier:
+    def __init__(self, audience, source=None, refresh_margin=60, min_refetch_interval=30, clock_skew=10):
+        self.audience = audience
+        self.source = source or HttpCertSource()
+        self.refresh_margin = refresh_margin
+        self.min_refetch_interval = min_refetch_interval
+        self.clock_skew = clock_skew
+
+        self._certs = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.fetches = 0
+
+    def verify(self, token):
+        """Verify a Google ID token and return its claims; raises ValueError if invalid"""
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        if not token:
+            raise ValueError('Token is missing')
+
+        kid = self._key_id(token)
+        certs = self._current_certs()
+
+        if kid and kid not in certs:
+            # Google may have rotated keys ahead of our cache expiry
+            certs = self._refetch_for_unknown_kid()
+            if kid not in certs:
+                raise ValueError(f'Unknown signing key id {kid}')
+
+        claims = google_jwt.decode(
+            token,
+            certs=certs,
+            audience=self.audience,
+            clock_skew_in_seconds=self.clock_skew
+        )
+        if claims.get('iss') not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer: {claims.get('iss')}")
+        return claims
+
+    def _key_id(self, token):
+        try:
+            header_segment = token.split(b'.', 1)[0]
+            padded = header_segment + b'=' * (-len(header_segment) % 4)
+            header = json.loads(base64.urlsafe_b64decode(padded))
+        except (ValueError, TypeError):
+            raise ValueError('Malformed token header')
+        if not isinstance(header, dict):
+            raise ValueError('Malformed token header')
+        return header.get('kid')
+
+    def _current_certs(self):
+        now = time.monotonic()
+        if now >= self._expires_at:
+            with self._lock:
+                if time.monotonic() >= self._expires_at:
+                    self._refresh_locked()
+        elif now >= self._expires_at - self.refresh_margin:
+            self._refresh_in_background()
+        return self._certs
+
+    def _refetch_for_unknown_kid(self):
+        with self._lock:
+            # Don't let a stream of forged kids turn into a stream of fetches
+            if time.monotonic() - self._fetched_at >= self.min_refetch_interval:
+                self._refresh_locked()
+        return self._certs
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                self._refresh_locked()
+        except Exception:
+            # Keep serving the current certs; the next request past expiry retries inline
+            pass
+        finally:
+            self._refreshing = False
+
+    def _refresh_locked(self):
+        certs, max_age = self.source.fetch()
+        now = time.monotonic()
+        self._certs = certs
+        self._fetched_at = now
+        self._expires_at = now + max_age
+        self.fetches += 1
+
+    def stats(self):
+        return {
+            'keys': len(self._certs),
+            'expires_in': round(max(self._expires_at - time.monotonic(), 0), 1),
+            'fetches': self.fetches
+        }
+
+
+# Shared per worker so Google's signing keys are fetched once per cache lifetime
+google_verifier = GoogleTokenVerifier(
+    audience=Config.GOOGLE_CLIENT_ID,
+    source=HttpCertSource(Config.GOOGLE_CERTS_URL)
+)
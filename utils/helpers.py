@@ -4,6 +4,8 @@ import json
 import platform
 import subprocess
 
+from utils.http_client import http_client
+
 def ping_server(host):
     """
     Returns True if host (str) responds to a ping request.
@@ -18,17 +20,17 @@ def ping_server(host):
 
 def make_api_request(url, method='GET', data=None, headers=None):
     """
-    Helper function to make API requests
+    Helper function to make API requests through the shared pooled client
     """
     try:
         if method.upper() == 'GET':
-            response = requests.get(url, headers=headers)
+            response = http_client.get(url, headers=headers)
         elif method.upper() == 'POST':
-            response = requests.post(url, json=data, headers=headers)
+            response = http_client.post(url, json=data, headers=headers)
         elif method.upper() == 'PUT':
-            response = requests.put(url, json=data, headers=headers)
+            response = http_client.put(url, json=data, headers=headers)
         elif method.upper() == 'DELETE':
-            response = requests.delete(url, headers=headers)
+            response = http_client.delete(url, headers=headers)
         else:
             return {'error': 'Invalid method specified'}, 400
         
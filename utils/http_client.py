@@ -0,0 +1,163 @@
+"""Shared outbound HTTP client: pooled connections, timeouts, retries and per-host metrics.
+
+Module-level ``requests.get`` opens a new connection (TCP and TLS
+handshake) per call and waits forever on a silent upstream. ``HttpClient``
+keeps one ``requests.Session`` whose adapter holds a keep-alive pool per
+host, always sends a (connect, read) timeout, and retries connection
+failures and 502/503/504 answers with exponential backoff, but only for
+idempotent methods, so a POST is never sent twice. 429s are returned to
+the caller, whose rate limiter decides how long to back off.
+
+Every call site outside the app goes through the ``http_client``
+singleton; it raises the usual ``requests.exceptions.RequestException``.
+"""
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import Config
+from utils.metrics import percentile
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+RETRY_STATUSES = frozenset({502, 503, 504})
+# Recent calls per host kept for the latency percentiles in stats()
+_LATENCY_SAMPLES = 1000
+
+
+def parse_retry_after(response, default):
+    """Seconds to wait from a response's Retry-After header (delay or HTTP-date), else ``default``"""
+    value = (response.headers.get('Retry-After') or '').strip()
+    if not value:
+        return default
+    try:
+        return max(0, int(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return default
+    if when is None:
+        return default
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0, int((when - datetime.now(timezone.utc)).total_seconds()))
+
+
+class _HostStats:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.statuses = {}
+        self.latencies = deque(maxlen=_LATENCY_SAMPLES)
+
+
+class HttpClient:
+    """A pooled session with default timeouts and retries, safe to share between threads.
+
+    ``timeout`` on a call overrides the default: a number bounds the
+    connect and the read separately, as in requests, or pass a
+    (connect, read) tuple.
+    """
+
+    def __init__(self, connect_timeout=3.05, read_timeout=10, retries=2, backoff=0.3,
+                 pool_connections=10, pool_maxsize=32):
+        self.timeout = (connect_timeout, read_timeout)
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=IDEMPOTENT_METHODS,
+            # Hand the last 5xx back to the caller instead of raising
+            raise_on_status=False,
+            # A long Retry-After would pin the worker; back off briefly instead
+            respect_retry_after_header=False
+        )
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, timeout=None, **kwargs):
+        """Send a request through the pool; returns the requests.Response"""
+        host = urlsplit(url).netloc
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+        except requests.exceptions.RequestException:
+            self._record(host, started, None, 0)
+            raise
+        retries = response.raw.retries if response.raw is not None else None
+        self._record(host, started, response.status_code, len(retries.history) if retries else 0)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def _record(self, host, started, status_code, retries):
+        elapsed = (time.perf_counter() - started) * 1000
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = _HostStats()
+            stats.requests += 1
+            stats.retries += retries
+            stats.latencies.append(elapsed)
+            if status_code is None:
+                stats.errors += 1
+            else:
+                bucket = f'{status_code // 100}xx'
+                stats.statuses[bucket] = stats.statuses.get(bucket, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'timeout': {'connect': self.timeout[0], 'read': self.timeout[1]},
+                'hosts': {
+                    host: {
+                        'requests': stats.requests,
+                        'errors': stats.errors,
+                        'retries': stats.retries,
+                        'statuses': dict(stats.statuses),
+                        'latency_ms': {
+                            'p50': round(percentile(stats.latencies, 50), 3),
+                            'p99': round(percentile(stats.latencies, 99), 3)
+                        } if stats.latencies else None
+                    }
+                    for host, stats in self._hosts.items()
+                }
+            }
+
+    def close(self):
+        self.session.close()
+
+
+http_client = HttpClient(
+    connect_timeout=Config.HTTP_CONNECT_TIMEOUT,
+    read_timeout=Config.HTTP_READ_TIMEOUT,
+    retries=Config.HTTP_RETRIES,
+    backoff=Config.HTTP_RETRY_BACKOFF,
+    pool_maxsize=Config.HTTP_POOL_MAXSIZE
+)
@@ -0,0 +1,10 @@
+"""Small helpers for the latency figures in stats() endpoints and benchmarks."""
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile (0-100) of a sequence of numbers; None when it is empty"""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
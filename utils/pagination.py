@@ -0,0 +1,77 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row on a page into an opaque token"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, *types):
+    """Unpack a token from encode_cursor (None values pass through); raises ValueError if it was tampered with"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, list) or len(payload) != len(types):
+        raise ValueError('Invalid cursor')
+    try:
+        return tuple(
+            None if value is None else datetime.fromisoformat(value) if kind is datetime else kind(value)
+            for value, kind in zip(payload, types)
+        )
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def keyset_page(query, key, tiebreak, limit, cursor=None):
+    """One newest-first page of ``query`` ordered by (key, tiebreak); returns (rows, next cursor).
+
+    ``key`` may be NULL and ``tiebreak`` (the primary key) may not. Rows with
+    a key come first, then the NULL-key rows by tiebreak alone: the cursor
+    carries a None key once paging reaches them. Keeping the two parts
+    apart lets each stay a range scan on an index over the key, where one
+    NULLS LAST ordering would not match the index on every database.
+    """
+    last_key = last_id = None
+    if cursor:
+        last_key, last_id = decode_cursor(cursor, datetime, int)
+        if last_id is None:
+            raise ValueError('Invalid cursor')
+
+    # One extra row tells whether another page exists
+    rows = []
+    if last_id is None or last_key is not None:
+        keyed = query.filter(key.isnot(None))
+        if last_id is not None:
+            keyed = keyed.filter(tuple_(key, tiebreak) < (last_key, last_id))
+        rows = keyed.order_by(key.desc(), tiebreak.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        unkeyed = query.filter(key.is_(None))
+        if last_key is None and last_id is not None:
+            unkeyed = unkeyed.filter(tiebreak < last_id)
+        rows += unkeyed.order_by(tiebreak.desc()).limit(limit + 1 - len(rows)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(getattr(rows[-1], key.key), getattr(rows[-1], tiebreak.key))
+    return rows, next_cursor
+
+
+def parse_limit(value, default=50, maximum=500):
+    """Clamp a ?limit= query argument"""
+    if value is None:
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1:
+        raise ValueError('limit must be positive')
+    return min(limit, maximum)
@@ -0,0 +1,86 @@
+"""Bounded off-worker password hashing.
+
+werkzeug's password hashing is deliberately slow and CPU-bound. Running it
+inline holds the GIL inside a web worker, so a burst of logins stalls every
+other request served by that worker. This module pushes the work onto a small
+process pool and caps the number of pending jobs; once the cap is reached
+callers get ``HashingPoolBusy`` immediately and should answer 503.
+"""
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash
+from config import Config
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing pool is saturated or too slow to answer"""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(Config.PASSWORD_HASH_MAX_PENDING)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                # spawn: gunicorn workers may be multi-threaded, forking them is unsafe
+                _executor = ProcessPoolExecutor(
+                    max_workers=Config.PASSWORD_HASH_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+    return _executor
+
+
+def _run(fn, *args):
+    if not Config.PASSWORD_HASH_POOL_ENABLED:
+        return fn(*args)
+
+    if not _pending.acquire(blocking=False):
+        raise HashingPoolBusy('Password hashing pool is full')
+    try:
+        future = _get_executor().submit(fn, *args)
+    except Exception:
+        _pending.release()
+        raise
+    # The slot is held until the job really finishes, even if we stop waiting
+    future.add_done_callback(lambda _: _pending.release())
+
+    try:
+        return future.result(timeout=Config.PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        future.cancel()
+        raise HashingPoolBusy('Password hashing timed out')
+
+
+def hash_password(password):
+    """Hash a password off the request worker"""
+    return _run(generate_password_hash, password)
+
+
+def verify_password(password_hash, password):
+    """Check a password against its hash off the request worker"""
+    if not password_hash or password is None:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def hash_passwords(passwords):
+    """Hash many passwords across the whole pool (bulk jobs, not request paths)"""
+    if not Config.PASSWORD_HASH_POOL_ENABLED:
+        return [generate_password_hash(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (Config.PASSWORD_HASH_POOL_WORKERS * 4))
+    return list(_get_executor().map(generate_password_hash, passwords, chunksize=chunksize))
+
+
+def shutdown():
+    """Stop the pool; called from the gunicorn worker_exit hook"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
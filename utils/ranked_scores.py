@@ -0,0 +1,138 @@
+"""In-memory score table ordered by score, with O(log n) rank lookups."""
+from bisect import bisect_left, bisect_right, insort
+from itertools import accumulate
+
+# Member ids share an int key with their score: (-score << 32) + member, so
+# keys sort by score descending, then member ascending, without tuples
+_MEMBER_BITS = 32
+_MEMBER_MASK = (1 << _MEMBER_BITS) - 1
+
+
+def _key(member, score):
+    return (-score << _MEMBER_BITS) + member
+
+
+def _decode(key):
+    return key & _MEMBER_MASK, -(key >> _MEMBER_BITS)
+
+
+class RankedScores:
+    """Scores of non-negative int members (< 2**32), kept sorted highest first.
+
+    Keys live in a list of sorted blocks of roughly ``load`` entries, as in a
+    B-tree leaf level: an update touches one block (O(log n + load)), and a
+    rank is a bisect over the block maxima plus a prefix sum of block sizes,
+    rebuilt (O(n / load)) on the first read after a write. Ranks are
+    competition style: tied scores share a rank, the next score skips.
+    Not thread-safe; callers serialize access.
+    """
+
+    def __init__(self, scores=(), load=1000):
+        self._load = load
+        self._scores = dict(scores)
+        self._blocks = []
+        self._maxes = []
+        self._offsets = None
+        keys = sorted(_key(member, score) for member, score in self._scores.items())
+        for start in range(0, len(keys), load):
+            block = keys[start:start + load]
+            self._blocks.append(block)
+            self._maxes.append(block[-1])
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, member):
+        return member in self._scores
+
+    def score(self, member):
+        return self._scores.get(member)
+
+    def _insert(self, key):
+        self._offsets = None
+        if not self._blocks:
+            self._blocks.append([key])
+            self._maxes.append(key)
+            return
+        index = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        block = self._blocks[index]
+        insort(block, key)
+        self._maxes[index] = block[-1]
+        if len(block) > 2 * self._load:
+            self._blocks[index:index + 1] = [block[:self._load], block[self._load:]]
+            self._maxes[index:index + 1] = [block[self._load - 1], block[-1]]
+
+    def _remove(self, key):
+        index = bisect_left(self._maxes, key)
+        block = self._blocks[index]
+        del block[bisect_left(block, key)]
+        if block:
+            self._maxes[index] = block[-1]
+        else:
+            del self._blocks[index]
+            del self._maxes[index]
+        self._offsets = None
+
+    def set(self, member, score):
+        previous = self._scores.get(member)
+        if previous == score:
+            return
+        if previous is not None:
+            self._remove(_key(member, previous))
+        self._scores[member] = score
+        self._insert(_key(member, score))
+
+    def add(self, member, delta):
+        self.set(member, self._scores.get(member, 0) + delta)
+
+    def _position(self, key):
+        """Number of keys sorting before ``key``"""
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(block) for block in self._blocks)]
+        index = bisect_left(self._maxes, key)
+        if index == len(self._blocks):
+            return len(self._scores)
+        return self._offsets[index] + bisect_left(self._blocks[index], key)
+
+    def _slice(self, start, stop):
+        if self._offsets is None:
+            self._offsets = [0, *accumulate(len(block) for block in self._blocks)]
+        start, stop = max(start, 0), min(stop, len(self._scores))
+        entries = []
+        index = bisect_right(self._offsets, start) - 1
+        position = start - self._offsets[index] if start < stop else 0
+        while len(entries) < stop - start:
+            for key in self._blocks[index][position:position + stop - start - len(entries)]:
+                entries.append(_decode(key))
+            index, position = index + 1, 0
+        return entries
+
+    def rank(self, member):
+        """1-based rank of ``member``, or None when it has no score"""
+        score = self._scores.get(member)
+        if score is None:
+            return None
+        # The smallest key with this score is the one with member 0
+        return self._position(_key(0, score)) + 1
+
+    def _ranked(self, entries):
+        ranked = []
+        for member, score in entries:
+            if ranked and ranked[-1][2] == score:
+                rank = ranked[-1][0]
+            else:
+                rank = self._position(_key(0, score)) + 1
+            ranked.append((rank, member, score))
+        return ranked
+
+    def top(self, limit, offset=0):
+        """[(rank, member, score)] for positions offset .. offset + limit"""
+        return self._ranked(self._slice(offset, offset + limit))
+
+    def around(self, member, neighbours):
+        """[(rank, member, score)] for ``member`` and up to ``neighbours`` entries either side"""
+        score = self._scores.get(member)
+        if score is None:
+            return []
+        position = self._position(_key(member, score))
+        return self._ranked(self._slice(position - neighbours, position + neighbours + 1))
@@ -0,0 +1,58 @@
+"""Thread-safe client-side rate limiting for outbound API calls."""
+import threading
+import time
+from collections import deque
+
+
+class RateLimiter:
+    """At most ``requests`` calls in any ``period`` seconds, shared by all threads.
+
+    A sliding-window log: the timestamps of the last ``requests`` calls are
+    kept and a caller waits until the oldest one leaves the window, so the
+    budget holds exactly for every window, not just on average. ``pause``
+    stops everyone, e.g. when the remote side answers 429 with Retry-After.
+    """
+
+    def __init__(self, requests, period):
+        if requests < 1 or period <= 0:
+            raise ValueError('RateLimiter needs at least one request per positive period')
+        self.requests = requests
+        self.period = period
+        self._calls = deque()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self._waits = 0
+        self._waited = 0.0
+
+    def acquire(self):
+        """Block until a call is allowed, then record it"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.period:
+                    self._calls.popleft()
+                wait = self._paused_until - now
+                if wait <= 0:
+                    if len(self._calls) < self.requests:
+                        self._calls.append(now)
+                        if waited:
+                            self._waits += 1
+                            self._waited += waited
+                        return waited
+                    wait = self._calls[0] + self.period - now
+            time.sleep(wait)
+            waited += wait
+
+    def pause(self, seconds):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'period': self.period,
+                'waits': self._waits,
+                'waited_seconds': round(self._waited, 3)
+            }
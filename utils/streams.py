@@ -0,0 +1,137 @@
+"""Compact encoding and downsampling for activity sample streams.
+
+Each channel is stored as one blob: values are quantised to integers at a
+fixed per-channel resolution, delta-encoded (consecutive GPS/HR samples
+differ very little), packed into the narrowest integer type that fits the
+deltas and zlib-compressed.
+"""
+import heapq
+import struct
+import zlib
+
+import numpy as np
+
+# Fixed-point resolution per channel (stored integer = round(value * scale))
+CHANNEL_SCALES = {
+    'time': 1,            # seconds from start
+    'lat': 10 ** 7,       # ~1 cm
+    'lng': 10 ** 7,
+    'altitude': 100,      # cm
+    'heartrate': 1,       # bpm
+    'cadence': 1,         # rpm / spm
+    'distance': 100,      # cm along the route
+}
+
+ENCODING_VERSION = 1
+_HEADER = struct.Struct('<BBIq')  # version, dtype code, sample count, first value
+_DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def encode_channel(channel, values):
+    """Encode a sequence of floats into a compressed delta blob"""
+    scale = CHANNEL_SCALES[channel]
+    quantised = np.rint(np.asarray(values, dtype=np.float64) * scale).astype(np.int64)
+    if quantised.size == 0:
+        return _HEADER.pack(ENCODING_VERSION, 0, 0, 0)
+
+    deltas = np.diff(quantised)
+    dtype_code = 0
+    if deltas.size:
+        low, high = deltas.min(), deltas.max()
+        for dtype_code, dtype in enumerate(_DTYPES):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                break
+    packed = deltas.astype(_DTYPES[dtype_code]).tobytes()
+    header = _HEADER.pack(ENCODING_VERSION, dtype_code, quantised.size, int(quantised[0]))
+    return header + zlib.compress(packed, 6)
+
+
+def decode_channel(channel, blob):
+    """Inverse of encode_channel; returns a float64 numpy array"""
+    version, dtype_code, count, first = _HEADER.unpack_from(blob)
+    if version != ENCODING_VERSION:
+        raise ValueError(f'Unsupported stream encoding version {version}')
+    if count == 0:
+        return np.empty(0, dtype=np.float64)
+
+    deltas = np.frombuffer(zlib.decompress(blob[_HEADER.size:]), dtype=_DTYPES[dtype_code])
+    quantised = np.empty(count, dtype=np.int64)
+    quantised[0] = first
+    np.cumsum(deltas, dtype=np.int64, out=quantised[1:])
+    quantised[1:] += first
+    return quantised / CHANNEL_SCALES[channel]
+
+
+def _segment_errors(x, y, start, end):
+    """Distance of every point strictly between start and end to the segment start-end"""
+    px, py = x[start + 1:end], y[start + 1:end]
+    ax, ay, bx, by = x[start], y[start], x[end], y[end]
+    dx, dy = bx - ax, by - ay
+    length_sq = dx * dx + dy * dy
+    if length_sq == 0:
+        return np.hypot(px - ax, py - ay)
+    t = np.clip(((px - ax) * dx + (py - ay) * dy) / length_sq, 0.0, 1.0)
+    return np.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+def simplify_indices(x, y, max_points):
+    """Pick at most max_points sample indices that best preserve the polyline.
+
+    Ramer-Douglas-Peucker driven by a point budget instead of a tolerance:
+    the segment with the largest deviation is split first, and each split
+    measures all of its points in one numpy pass. Every split re-measures
+    the segment it cuts, so the cost is O(n log max_points) when splits land
+    near the middle and O(n * max_points) in the worst case (each split
+    peeling one point off the end of a long segment).
+    """
+    n = len(x)
+    if n <= max_points or n < 3:
+        return np.arange(n)
+    max_points = max(max_points, 2)
+
+    keep = [0, n - 1]
+    heap = []
+
+    def push(start, end):
+        if end - start < 2:
+            return
+        errors = _segment_errors(x, y, start, end)
+        offset = int(np.argmax(errors))
+        heapq.heappush(heap, (-float(errors[offset]), start, end, start + 1 + offset))
+
+    push(0, n - 1)
+    while heap and len(keep) < max_points:
+        _, start, end, split = heapq.heappop(heap)
+        keep.append(split)
+        push(start, split)
+        push(split, end)
+
+    return np.sort(np.array(keep))
+
+
+def downsample(streams, max_points):
+    """Downsample a dict of equal-length channel arrays to at most max_points.
+
+    The route shape (lat/lng, with longitude scaled for latitude) decides
+    which samples survive when GPS is present; otherwise the first non-time
+    channel is simplified against time. All channels keep the same indices.
+    """
+    if not streams:
+        return {}
+    length = len(next(iter(streams.values())))
+
+    if 'lat' in streams and 'lng' in streams:
+        lat, lng = streams['lat'], streams['lng']
+        x = lng * np.cos(np.radians(np.nanmean(lat) if lat.size else 0.0))
+        y = lat
+    else:
+        values = [name for name in streams if name != 'time']
+        y = streams[values[0]] if values else np.arange(length, dtype=np.float64)
+        x = streams['time'] if 'time' in streams else np.arange(length, dtype=np.float64)
+        # Put both axes on a comparable scale so neither dominates the distance
+        x = (x - x.min()) / (np.ptp(x) or 1.0)
+        y = (y - y.min()) / (np.ptp(y) or 1.0)
+
+    indices = simplify_indices(x, y, max_points)
+    return {name: values[indices] for name, values in streams.items()}